@@ -11,6 +11,7 @@ from pygments.lexers import get_lexer_for_filename
 from pygments.util import ClassNotFound
 
 from app.rag.rag_system import RAGSystem
+from codemind_text import CodeChunker
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,8 @@ class CodeRAGSystem(RAGSystem):
             '.java', '.cpp', '.c', '.h', '.hpp',
             '.go', '.rs', '.rb', '.php', '.swift'
         }
+        # Code is split on definition boundaries, without overlap
+        self.code_chunker = CodeChunker()
     
     def analyze_code_file(self, file_path: str) -> Dict[str, Any]:
         """Analyze a code file and extract metadata"""
@@ -137,17 +140,19 @@ class CodeRAGSystem(RAGSystem):
                                 "relative_path": os.path.relpath(file_path, repo_path)
                             })
                             
-                            # Split content into chunks
-                            chunks = self.text_splitter.split_text(content)
+                            # Split content into chunks at definition boundaries
+                            chunks = self.code_chunker.split_text(content, file_ext)
                             
                             # Add to vector store
                             collection = self.get_collection(user_id, "code")
                             
-                            for i, chunk in enumerate(chunks):
+                            for i, (chunk, start_line, end_line) in enumerate(chunks):
                                 doc_id = f"{project_id}_{file}_{i}"
                                 chunk_metadata = {
                                     **metadata,
                                     "chunk_index": i,
+                                    "start_line": start_line,
+                                    "end_line": end_line,
                                     "content": chunk
                                 }
                                 
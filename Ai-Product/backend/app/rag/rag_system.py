@@ -7,7 +7,6 @@ import logging
 from typing import List, Dict, Any, Optional
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_community.document_loaders import (
@@ -19,6 +18,7 @@ from langchain_community.document_loaders import (
 import os
 
 from app.core.config import settings
+from codemind_text import StreamingTextSplitter
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +40,9 @@ class RAGSystem:
         )
         
         # Text splitter for chunking
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.text_splitter = StreamingTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
-            length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
         
@@ -11,6 +11,8 @@ interface Message {
     id: string
     title: string
     page?: number
+    start_line?: number
+    end_line?: number
     snippet: string
   }>
   agent?: string
@@ -199,6 +201,7 @@ function MessageBubble({ message }: { message: Message }) {
                       <div className="font-semibold text-gray-900">
                         {source.title}
                         {source.page && <span className="text-gray-600"> • Page {source.page}</span>}
+                        {source.start_line && <span className="text-gray-600"> • Lines {source.start_line}-{source.end_line}</span>}
                       </div>
                       <div className="text-gray-700 text-xs mt-1.5 leading-relaxed">
                         {source.snippet}
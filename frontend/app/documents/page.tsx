@@ -43,10 +43,24 @@ export default function DocumentsPage() {
         throw new Error('Upload failed')
       }
 
-      const data = await response.json()
+      // Ingestion runs as a background job; poll until it finishes
+      let job = await response.json()
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000))
+        const jobResponse = await fetch(`/api/ai/jobs/${job.id}`)
+        if (!jobResponse.ok) {
+          throw new Error('Failed to fetch job status')
+        }
+        job = await jobResponse.json()
+      }
+
+      if (job.status !== 'succeeded') {
+        throw new Error(job.error || 'Ingestion failed')
+      }
+
       setResult({
         status: 'success',
-        message: `Successfully uploaded! ${data.ingested} chunks indexed.`
+        message: `Successfully uploaded! ${job.result.ingested} chunks indexed.`
       })
       setFile(null)
     } catch (error) {
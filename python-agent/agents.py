@@ -1,5 +1,5 @@
 import os
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from abc import ABC, abstractmethod
 import logging
 import pandas as pd
@@ -10,6 +10,14 @@ from rag import get_rag_pipeline
 
 logger = logging.getLogger(__name__)
 
+# Framing the summary and compliance agents put around the RAG answer
+SUMMARY_PREFIX = "**Summary:**\n\n"
+COMPLIANCE_PREFIX = "**Compliance Assessment:**\n\n"
+COMPLIANCE_NOTE = (
+    "\n\n**Note:** This assessment is based on available documentation. For authoritative compliance "
+    "decisions, please consult with the legal department or relevant regulatory authority.\n"
+)
+
 
 class BaseAgent(ABC):
     """Base class for all agents"""
@@ -23,6 +31,46 @@ class BaseAgent(ABC):
     async def process(self, query: str, context: Dict[str, Any]) -> AgentResponse:
         """Process the query and return response"""
         pass
+    
+    async def stream(self, query: str, context: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process the query, yielding ("sources" | "token" | "done" | "error", data) events
+        
+        Agents that do not generate text incrementally send their whole
+        answer as one token.
+        """
+        response = await self.process(query, context)
+        yield "sources", {"sources": [source.model_dump() for source in response.sources]}
+        yield "token", {"text": response.answer}
+        yield "done", {
+            "agent": response.metadata.get("agent", "unknown"),
+            "confidence": response.confidence,
+            "fallback": response.metadata.get("fallback", False),
+            "cached": False
+        }
+    
+    @staticmethod
+    async def _framed(
+        events: AsyncIterator[Tuple[str, Dict[str, Any]]],
+        agent: str,
+        prefix: str = "",
+        suffix: str = ""
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Wrap a RAG answer stream in the agent's framing text"""
+        async for event, data in events:
+            if event == "token" and prefix:
+                yield "token", {"text": prefix}
+                prefix = ""
+            if event == "done":
+                if suffix:
+                    yield "token", {"text": suffix}
+                data = {
+                    "agent": agent,
+                    "confidence": data["confidence"] or 0.0,
+                    "fallback": data["fallback"],
+                    "cached": data["cached"]
+                }
+            yield event, data
 
 
 class DocumentAgent(BaseAgent):
@@ -44,8 +92,11 @@ class DocumentAgent(BaseAgent):
         """Process document query using RAG"""
         top_k = context.get("top_k", 4)
         filter = context.get("filter")
+        search_mode = context.get("search_mode", "semantic")
         
-        response = await self.rag_pipeline.query(query, top_k=top_k, filter=filter)
+        response = await self.rag_pipeline.query(
+            query, top_k=top_k, filter=filter, search_mode=search_mode
+        )
         
         return AgentResponse(
             answer=response.answer,
@@ -53,6 +104,17 @@ class DocumentAgent(BaseAgent):
             confidence=response.confidence or 0.0,
             metadata={"agent": "document", "fallback": response.fallback}
         )
+    
+    async def stream(self, query: str, context: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream the RAG answer as it is generated"""
+        events = self.rag_pipeline.stream_query(
+            query,
+            top_k=context.get("top_k", 4),
+            filter=context.get("filter"),
+            search_mode=context.get("search_mode", "semantic")
+        )
+        async for event in self._framed(events, "document"):
+            yield event
 
 
 class GISAgent(BaseAgent):
@@ -214,11 +276,12 @@ class SummaryAgent(BaseAgent):
         """Generate summary using RAG"""
         # Use higher top_k for summaries
         top_k = context.get("top_k", 6)
+        search_mode = context.get("search_mode", "semantic")
         
-        response = await self.rag_pipeline.query(query, top_k=top_k)
+        response = await self.rag_pipeline.query(query, top_k=top_k, search_mode=search_mode)
         
         # Enhance response with summary framing
-        enhanced_answer = f"**Summary:**\n\n{response.answer}"
+        enhanced_answer = f"{SUMMARY_PREFIX}{response.answer}"
         
         return AgentResponse(
             answer=enhanced_answer,
@@ -226,6 +289,16 @@ class SummaryAgent(BaseAgent):
             confidence=response.confidence or 0.0,
             metadata={"agent": "summary"}
         )
+    
+    async def stream(self, query: str, context: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream the summary as it is generated"""
+        events = self.rag_pipeline.stream_query(
+            query,
+            top_k=context.get("top_k", 6),
+            search_mode=context.get("search_mode", "semantic")
+        )
+        async for event in self._framed(events, "summary", prefix=SUMMARY_PREFIX):
+            yield event
 
 
 class ComplianceAgent(BaseAgent):
@@ -245,7 +318,8 @@ class ComplianceAgent(BaseAgent):
     
     async def process(self, query: str, context: Dict[str, Any]) -> AgentResponse:
         """Check compliance using RAG"""
-        response = await self.rag_pipeline.query(query, top_k=4)
+        search_mode = context.get("search_mode", "semantic")
+        response = await self.rag_pipeline.query(query, top_k=4, search_mode=search_mode)
         
         # Add compliance framing
         compliance_answer = self._format_compliance_response(response.answer)
@@ -257,14 +331,16 @@ class ComplianceAgent(BaseAgent):
             metadata={"agent": "compliance"}
         )
     
+    async def stream(self, query: str, context: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream the compliance assessment as it is generated"""
+        search_mode = context.get("search_mode", "semantic")
+        events = self.rag_pipeline.stream_query(query, top_k=4, search_mode=search_mode)
+        async for event in self._framed(events, "compliance", prefix=COMPLIANCE_PREFIX, suffix=COMPLIANCE_NOTE):
+            yield event
+    
     def _format_compliance_response(self, answer: str) -> str:
         """Format response with compliance framing"""
-        return f"""**Compliance Assessment:**
-
-{answer}
-
-**Note:** This assessment is based on available documentation. For authoritative compliance decisions, please consult with the legal department or relevant regulatory authority.
-"""
+        return f"{COMPLIANCE_PREFIX}{answer}{COMPLIANCE_NOTE}"
 
 
 class AgentOrchestrator:
@@ -293,34 +369,52 @@ class AgentOrchestrator:
         Returns:
             Agent response
         """
+        agent, context = self._select_agent(request)
+        return await agent.process(request.query, context)
+    
+    async def stream_query(
+        self,
+        request: QueryRequest
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Route query to the same agent as route_query, streaming its answer
+        
+        Args:
+            request: Query request
+            
+        Yields:
+            ("sources" | "token" | "done" | "error", data) events
+        """
+        agent, context = self._select_agent(request)
+        async for event in agent.stream(request.query, context):
+            yield event
+    
+    def _select_agent(self, request: QueryRequest) -> Tuple[BaseAgent, Dict[str, Any]]:
+        """Pick the agent for a request and build its context"""
         query = request.query
+        context = {
+            "top_k": request.top_k,
+            "filter": request.filters,
+            "search_mode": request.search_mode
+        }
         
         # If specific agents requested, try those first
         if request.agents:
             selected_agent = self._get_agent_by_name(request.agents[0])
             if selected_agent:
                 logger.info(f"Using requested agent: {request.agents[0]}")
-                context = {
-                    "top_k": request.top_k,
-                    "filter": request.filters
-                }
-                return await selected_agent.process(query, context)
+                return selected_agent, context
         
         # Otherwise, find best agent
         for agent in self.agents:
             if agent.can_handle(query):
                 agent_name = agent.__class__.__name__
                 logger.info(f"Routing to {agent_name}")
-                context = {
-                    "top_k": request.top_k,
-                    "filter": request.filters
-                }
-                return await agent.process(query, context)
+                return agent, context
         
         # Fallback to default document agent
         logger.info("Using default document agent")
-        context = {"top_k": request.top_k, "filter": request.filters}
-        return await self.default_agent.process(query, context)
+        return self.default_agent, context
     
     def _get_agent_by_name(self, name: str) -> Optional[BaseAgent]:
         """Get agent by name"""
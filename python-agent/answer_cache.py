@@ -0,0 +1,215 @@
+"""
+Answer Cache for CodeMind
+In-process cache of generated answers, invalidated whenever the index changes
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import logging
+
+from embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the question"""
+    return normalize_text(query).casefold().rstrip("?!. ")
+
+
+class AnswerCache:
+    """
+    LRU cache of answers keyed by query, filters, top_k, search mode and model
+
+    Every entry belongs to the index generation it was answered from. When
+    the generation moves (documents added or deleted), the whole cache is
+    dropped on the next lookup, so an answer never outlives the chunks it
+    was generated from.
+
+    With a similarity threshold, a query that misses is compared with the
+    embeddings of cached queries asked with the same filters, top_k, mode
+    and model; the closest one at or above the threshold is served, so
+    paraphrases of a cached question are answered without the LLM.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.0
+    ):
+        """
+        Args:
+            max_entries: Least recently used answers are evicted beyond this
+            ttl_seconds: Answers older than this are regenerated
+            similarity_threshold: Minimum cosine similarity for a paraphrase
+                hit (0 disables the similarity lookup)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        # key -> (scope, unit query vector or None, answer, created_at)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[np.ndarray], Any, float]]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.similarity_threshold > 0
+
+    @staticmethod
+    def _scope(filters: Optional[Dict[str, Any]], top_k: int, search_mode: str, model: str) -> str:
+        return json.dumps([filters or {}, top_k, search_mode, model], sort_keys=True, default=str)
+
+    @staticmethod
+    def _key(query: str, scope: str) -> str:
+        return hashlib.sha256(f"{normalize_query(query)}\0{scope}".encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]],
+        top_k: int,
+        search_mode: str,
+        model: str,
+        generation: int,
+        embed: Optional[Callable[[str], List[float]]] = None
+    ) -> Optional[Any]:
+        """
+        Return the cached answer for a query, or None on miss
+
+        Args:
+            query: User's question
+            filters: Metadata filters of the query
+            top_k: Number of documents retrieved
+            search_mode: Retrieval mode
+            model: LLM that generated the answer
+            generation: Current index generation
+            embed: Embeds the query for the similarity lookup (only called
+                on an exact miss, when a threshold is set)
+        """
+        scope = self._scope(filters, top_k, search_mode, model)
+        key = self._key(query, scope)
+
+        with self._lock:
+            self._sync(generation)
+            answer = self._fresh(key)
+            if answer is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return answer
+            has_candidates = self.semantic and embed is not None and any(
+                entry[0] == scope and entry[1] is not None for entry in self._entries.values()
+            )
+
+        if not has_candidates:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        vector = self._unit(embed(query))
+        with self._lock:
+            if self._generation != generation:
+                self.misses += 1
+                return None
+            best_key, best = None, self.similarity_threshold
+            for candidate, (entry_scope, entry_vector, _, _) in self._entries.items():
+                if entry_scope != scope or entry_vector is None:
+                    continue
+                similarity = float(np.dot(vector, entry_vector))
+                if similarity >= best:
+                    best_key, best = candidate, similarity
+
+            answer = self._fresh(best_key) if best_key is not None else None
+            if answer is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.similar_hits += 1
+            return answer
+
+    def put(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]],
+        top_k: int,
+        search_mode: str,
+        model: str,
+        generation: int,
+        answer: Any,
+        embed: Optional[Callable[[str], List[float]]] = None
+    ):
+        """Cache an answer generated from the given index generation"""
+        scope = self._scope(filters, top_k, search_mode, model)
+        key = self._key(query, scope)
+        vector = self._unit(embed(query)) if self.semantic and embed is not None else None
+
+        with self._lock:
+            self._sync(generation)
+            if generation != self._generation:
+                return
+
+            self._entries.pop(key, None)
+            self._entries[key] = (scope, vector, answer, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _sync(self, generation: int):
+        """Drop every answer when the index generation moves"""
+        if generation == self._generation:
+            return
+        if self._generation is not None and generation < self._generation:
+            # An answer started before the index changed finished after it
+            return
+        if self._entries:
+            logger.info(f"Index generation {self._generation} -> {generation}, dropping {len(self._entries)} cached answers")
+            self._entries.clear()
+            self.invalidations += 1
+        self._generation = generation
+
+    def _fresh(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[3] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        return entry[2]
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit-rate statistics"""
+        with self._lock:
+            total = self.hits + self.similar_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+                "generation": self._generation,
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round((self.hits + self.similar_hits) / total, 4) if total else 0.0
+            }
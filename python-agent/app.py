@@ -1,9 +1,13 @@
 import os
 import sys
+import hashlib
+import tempfile
+import subprocess
 from pathlib import Path
+from urllib.parse import urlsplit
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 from dotenv import load_dotenv
 import logging
@@ -15,12 +19,15 @@ import json
 sys.path.insert(0, str(Path(__file__).parent))
 
 from models import (
-    QueryRequest, QueryResponse, IngestResponse,
-    StatusResponse, DocumentMetadata
+    QueryRequest, QueryResponse,
+    StatusResponse, DocumentMetadata, JobStatus
 )
 from ingest import get_ingester
+from job_queue import get_job_queue
+from index_manifest import get_index_manifest
 from agents import get_orchestrator
 from vector_store import get_vector_store
+from rag import get_rag_pipeline
 from github_loader import GitHubLoader
 from conversation_manager import get_conversation_manager
 from code_formatter import get_code_formatter
@@ -57,9 +64,13 @@ app.add_middleware(
 stats = {
     "queries_today": 0,
     "documents_ingested": 0,
+    "duplicates_skipped": 0,
     "start_time": datetime.utcnow()
 }
 
+# Uploads larger than this are spooled to disk while their job waits
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_MB", "16")) * 1024 * 1024
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -80,12 +91,19 @@ async def startup_event():
         get_vector_store()
         get_ingester()
         get_orchestrator()
+        await get_job_queue().start()
         logger.info("All services initialized successfully")
     except Exception as e:
         logger.error(f"Error during startup: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background ingestion workers"""
+    await get_job_queue().stop()
+
+
 @app.get("/", tags=["Health"])
 async def root():
     """Root endpoint"""
@@ -107,6 +125,7 @@ async def get_status():
     try:
         vector_store = get_vector_store()
         vector_stats = vector_store.get_collection_stats()
+        answer_cache = get_rag_pipeline().answer_cache
         
         return StatusResponse(
             status="healthy",
@@ -114,8 +133,10 @@ async def get_status():
                 "documents": vector_stats.get("total_documents", 0),
                 "queries_today": stats["queries_today"],
                 "documents_ingested": stats["documents_ingested"],
+                "duplicates_skipped": stats["duplicates_skipped"],
                 "uptime_seconds": (datetime.utcnow() - stats["start_time"]).total_seconds(),
-                "use_mock_llm": os.getenv("USE_MOCK_LLM", "false").lower() == "true"
+                "use_mock_llm": os.getenv("USE_MOCK_LLM", "false").lower() == "true",
+                "answer_cache": answer_cache.get_stats() if answer_cache else None
             },
             version="1.0.0"
         )
@@ -127,18 +148,24 @@ async def get_status():
         )
 
 
-@app.post("/ingest", response_model=IngestResponse, tags=["Ingestion"])
+@app.post(
+    "/ingest",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Ingestion"]
+)
 async def ingest_document(
     file: UploadFile = File(...),
     metadata: Optional[str] = Form(None)
 ):
     """
-    Ingest a document into the knowledge base
+    Queue a document for ingestion into the knowledge base
     
     - **file**: PDF, DOCX, or TXT file
-    - **metadata**: Optional JSON metadata (source_name, uploaded_by, geo, ward, tags)
+    - **metadata**: Optional JSON metadata (source_name, uploaded_by, geo, ward, tags,
+      document_key: re-uploading with the same key replaces the earlier upload)
     
-    Returns ingestion status and document IDs
+    Returns the ingestion job; poll /jobs/{job_id} for progress and the result
     """
     try:
         # Parse metadata if provided
@@ -150,35 +177,63 @@ async def ingest_document(
             except Exception as e:
                 logger.warning(f"Error parsing metadata: {e}")
         
-        # Read file
-        contents = await file.read()
-        
-        # Create file-like object
-        from io import BytesIO
-        file_obj = BytesIO(contents)
+        # The request's upload is closed once we respond, so keep our own copy
+        filename = file.filename or "unknown.txt"
+        upload = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+        digest = hashlib.sha256(f"{filename}\0{metadata or ''}\0".encode("utf-8"))
+        while chunk := await file.read(1024 * 1024):
+            digest.update(chunk)
+            upload.write(chunk)
+        upload.seek(0)
         
-        # Ingest
-        ingester = get_ingester()
-        response = await ingester.ingest_file(
-            file=file_obj,
-            filename=file.filename or "unknown.txt",
-            metadata=doc_metadata
+        async def run(progress):
+            try:
+                progress.update(stage="ingesting")
+                response = await get_ingester().ingest_file(
+                    file=upload,
+                    filename=filename,
+                    metadata=doc_metadata,
+                    on_progress=lambda done: progress.update(chunks_done=done)
+                )
+                progress.update(chunks_total=response.ingested)
+                stats["documents_ingested"] += 1
+                stats["duplicates_skipped"] += response.metadata.get("duplicates_skipped", 0)
+                logger.info(f"Successfully ingested {filename}: {response.ingested} chunks")
+                return response.dict()
+            finally:
+                upload.close()
+        
+        job = get_job_queue().submit(
+            "file", run,
+            dedupe_key=f"file:{digest.hexdigest()}",
+            params={"filename": filename}
         )
-        
-        # Update stats
-        stats["documents_ingested"] += 1
-        
-        logger.info(f"Successfully ingested {file.filename}: {response.ingested} chunks")
-        return response
+        if job.get("deduplicated"):
+            upload.close()
+        return JobStatus(**job)
         
     except Exception as e:
-        logger.error(f"Error ingesting document: {e}")
+        logger.error(f"Error queueing document: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error ingesting document: {str(e)}"
         )
 
 
+@app.get("/jobs/{job_id}", response_model=JobStatus, tags=["Ingestion"])
+async def get_job(job_id: str):
+    """
+    Get the status of an ingestion job
+    
+    Reports the stage, chunks done/total, throughput, the result once the
+    job has succeeded, or the error if it failed
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(**job)
+
+
 @app.post("/query", response_model=QueryResponse, tags=["Query"])
 async def query_knowledge_base(
     request: QueryRequest,
@@ -252,6 +307,71 @@ async def query_knowledge_base(
         )
 
 
+@app.post("/query/stream", tags=["Query"])
+async def stream_query(
+    request: QueryRequest,
+    session_id: Optional[str] = None
+):
+    """
+    Query the knowledge base, streaming the answer as server-sent events
+    
+    Takes the same body as /query. Events, in order:
+    
+    - **sources**: `{"sources": [...]}` once retrieval is done, before generation starts
+    - **token**: `{"text": "..."}` for each piece of the answer as the LLM produces it
+      (a single token when LLM streaming is off in /settings/llm, or the answer was cached)
+    - **done**: `{"agent", "confidence", "fallback", "cached", "code_blocks", "has_code"}`
+    - **error**: `{"detail": "..."}` if generation fails part-way
+    """
+    conv_manager = get_conversation_manager()
+    if session_id:
+        conv_manager.add_message(
+            session_id=session_id,
+            role="user",
+            content=request.query
+        )
+    
+    async def events():
+        sources, parts = [], []
+        try:
+            async for event, data in get_orchestrator().stream_query(request):
+                if event == "sources":
+                    sources = data["sources"]
+                elif event == "token":
+                    parts.append(data["text"])
+                elif event == "done":
+                    stats["queries_today"] += 1
+                    answer = "".join(parts)
+                    formatted = get_code_formatter().format_response(answer)
+                    data = {**data, "code_blocks": formatted["code_blocks"], "has_code": formatted["has_code"]}
+                    
+                    if session_id:
+                        conv_manager.add_message(
+                            session_id=session_id,
+                            role="assistant",
+                            content=answer,
+                            sources=sources,
+                            agent_used=data["agent"]
+                        )
+                    logger.info(f"Streamed query processed by {data['agent']} agent")
+                
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            yield _sse("error", {"detail": f"Error processing query: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must pass tokens through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 @app.get("/conversations", tags=["Conversations"])
 async def get_conversations(limit: int = 50):
     """Get list of all conversations"""
@@ -499,110 +619,138 @@ async def global_exception_handler(request, exc):
     )
 
 
-if __name__ == "__main__":
-@app.post("/ingest/github", tags=["Ingestion"])
+@app.post(
+    "/ingest/github",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Ingestion"]
+)
 async def ingest_github_repo(
     repo_url: str = Form(...),
     branch: str = Form("main")
 ):
     """
-    Ingest an entire GitHub repository
+    Queue a sync of a GitHub repository branch into the index
     
     - **repo_url**: GitHub repository URL (e.g., https://github.com/user/repo)
     - **branch**: Branch name (default: main)
     
-    Returns ingestion statistics
+    Clones are cached; re-syncs fetch the new commits, re-embed the files
+    git reports as changed and delete the chunks of removed files. Returns
+    the ingestion job; poll /jobs/{job_id} for progress and statistics
     """
-    try:
-        loader = GitHubLoader()
-        
-        # Load documents from repository
-        documents = loader.load_from_url(repo_url, branch)
-        
-        if not documents:
-            return JSONResponse(
-                status_code=400,
-                content={"status": "error", "message": "No supported files found in repository"}
+    async def run(progress):
+        # Fetches into the clone cache and re-embeds only what changed since the last sync
+        progress.update(stage="syncing")
+        try:
+            result = await get_index_manifest().sync_repo(
+                repo_url,
+                branch,
+                GitHubLoader(),
+                get_ingester(),
+                on_progress=lambda done, total=None: progress.update(chunks_done=done, chunks_total=total)
             )
+        except subprocess.TimeoutExpired:
+            raise ValueError("Repository clone timeout. Repository may be too large.")
         
-        # Get file statistics
-        file_stats = loader.get_file_stats(documents)
-        
-        # Ingest into vector store
-        ingester = get_ingester()
-        result = await ingester.ingest_documents(documents)
-        
-        stats["documents_ingested"] += len(documents)
+        stats["documents_ingested"] += result["added"] + result["changed"]
+        stats["duplicates_skipped"] += result["duplicates_skipped"]
         
-        return {
-            "status": "ok",
-            "repo_url": repo_url,
-            "branch": branch,
-            "files_processed": len(documents),
-            "chunks_created": result["chunk_count"],
-            "file_stats": file_stats,
-            "ingested": len(result["ids"])
-        }
-        
-    except subprocess.TimeoutExpired:
-        raise HTTPException(
-            status_code=status.HTTP_408_REQUEST_TIMEOUT,
-            detail="Repository clone timeout. Repository may be too large."
-        )
-    except Exception as e:
-        logger.error(f"Error ingesting GitHub repo: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error ingesting repository: {str(e)}"
-        )
+        return {"status": "ok", "repo_url": repo_url, "branch": branch, **result}
+    
+    return _submit_job("github", run, f"github:{repo_url}@{branch}", {"repo_url": repo_url, "branch": branch})
 
 
-@app.post("/ingest/local", tags=["Ingestion"])
+@app.post(
+    "/ingest/local",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Ingestion"]
+)
 async def ingest_local_directory(
     directory_path: str = Form(...)
 ):
     """
-    Ingest files from a local directory
+    Queue a sync of a local directory into the index
     
     - **directory_path**: Absolute path to local directory
     
-    Returns ingestion statistics
+    Re-syncs only re-embed added or changed files and delete the chunks of
+    removed files. Returns the ingestion job; poll /jobs/{job_id} for progress and statistics
     """
-    try:
-        loader = GitHubLoader()
-        
-        # Load documents from local directory
-        documents = loader.load_from_local(directory_path)
-        
-        if not documents:
-            return JSONResponse(
-                status_code=400,
-                content={"status": "error", "message": "No supported files found in directory"}
-            )
-        
-        # Get file statistics
-        file_stats = loader.get_file_stats(documents)
+    if not os.path.isdir(directory_path):
+        raise HTTPException(status_code=400, detail=f"Directory not found: {directory_path}")
+    
+    async def run(progress):
+        # Only added and changed files are re-embedded; removed files are deleted
+        progress.update(stage="syncing")
+        result = await get_index_manifest().sync(
+            directory_path,
+            GitHubLoader(),
+            get_ingester(),
+            on_progress=lambda done, total=None: progress.update(chunks_done=done, chunks_total=total)
+        )
         
-        # Ingest into vector store
-        ingester = get_ingester()
-        result = await ingester.ingest_documents(documents)
+        stats["documents_ingested"] += result["added"] + result["changed"]
+        stats["duplicates_skipped"] += result["duplicates_skipped"]
         
-        stats["documents_ingested"] += len(documents)
+        return {"status": "ok", "directory": directory_path, **result}
+    
+    return _submit_job("local", run, f"local:{os.path.abspath(directory_path)}", {"directory": directory_path})
+
+
+@app.post(
+    "/ingest/url",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Ingestion"]
+)
+async def ingest_url(
+    url: str = Form(...),
+    source_name: Optional[str] = Form(None),
+    max_pages: Optional[int] = Form(None),
+    max_depth: Optional[int] = Form(None)
+):
+    """
+    Queue a crawl of a wiki or documentation site into the index
+    
+    - **url**: Start page; pages under its directory on the same host are crawled
+    - **source_name**: Source name (default: the URL)
+    - **max_pages** / **max_depth**: Crawl limits (default: CRAWL_MAX_PAGES / CRAWL_MAX_DEPTH)
+    
+    Re-crawls revalidate pages with conditional GET and only re-embed pages
+    whose content changed. Returns the ingestion job; poll /jobs/{job_id} for progress and statistics
+    """
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise HTTPException(status_code=400, detail=f"Not an http(s) URL: {url}")
+    
+    async def run(progress):
+        progress.update(stage="crawling")
+        result = await get_ingester().ingest_url(
+            url,
+            DocumentMetadata(source_name=source_name or url),
+            on_progress=lambda done: progress.update(chunks_done=done),
+            max_pages=max_pages,
+            max_depth=max_depth
+        )
         
-        return {
-            "status": "ok",
-            "directory": directory_path,
-            "files_processed": len(documents),
-            "chunks_created": result["chunk_count"],
-            "file_stats": file_stats,
-            "ingested": len(result["ids"])
-        }
+        pages = result.metadata["pages"]
+        stats["documents_ingested"] += pages["new"] + pages["changed"]
+        stats["duplicates_skipped"] += result.metadata["duplicates_skipped"]
         
+        return {"status": result.status, "url": url, "ingested": result.ingested, **result.metadata}
+    
+    return _submit_job("url", run, f"url:{url}", {"url": url})
+
+
+def _submit_job(kind: str, run, dedupe_key: str, params: dict) -> JobStatus:
+    try:
+        return JobStatus(**get_job_queue().submit(kind, run, dedupe_key=dedupe_key, params=params))
     except Exception as e:
-        logger.error(f"Error ingesting local directory: {e}")
+        logger.error(f"Error queueing {kind} ingestion: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error ingesting directory: {str(e)}"
+            detail=f"Error queueing ingestion: {str(e)}"
         )
 
 
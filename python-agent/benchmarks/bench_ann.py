@@ -0,0 +1,83 @@
+"""
+Benchmark: IVF-PQ recall@k and latency vs exact flat search
+
+Builds a flat index over synthetic clustered vectors, trains IVF-PQ on it and
+reports recall@k and per-query latency for a sweep of nprobe values, with and
+without the exact re-scoring pass.
+
+    python benchmarks/bench_ann.py --rows 200000 --dim 256 --nlist 1024 --m 32
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.documents import Document
+from flat_index import FlatVectorIndex
+
+
+def synthetic_vectors(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Gaussian clusters, roughly how embeddings of related chunks behave"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, rows)
+    return (centers[labels] + 0.5 * rng.normal(size=(rows, dim))).astype(np.float32)
+
+
+def timed_search(index: FlatVectorIndex, queries: np.ndarray, k: int):
+    results, start = [], time.perf_counter()
+    for query in queries:
+        results.append([doc.metadata["row"] for doc, _ in index.search(query.tolist(), k=k)])
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--m", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows + args.queries, args.dim, args.clusters, seed=0)
+    data, queries = vectors[:args.rows], vectors[args.rows:]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = FlatVectorIndex(directory)
+        for start in range(0, args.rows, 10_000):
+            end = min(start + 10_000, args.rows)
+            index.add(
+                [str(i) for i in range(start, end)],
+                data[start:end],
+                [Document(page_content="", metadata={"row": i}) for i in range(start, end)]
+            )
+
+        truth, exact_ms = timed_search(index, queries, args.k)
+        print(f"rows={args.rows} dim={args.dim} k={args.k}")
+        print(f"exact flat search: {exact_ms:.2f} ms/query")
+
+        start = time.perf_counter()
+        index.build_ann(nlist=args.nlist, m=args.m)
+        print(f"IVF-PQ build: {time.perf_counter() - start:.1f}s (m={args.m})\n")
+
+        print(f"{'nprobe':>7} {'rerank':>7} {'recall@k':>9} {'ms/query':>9} {'speedup':>8}")
+        for rerank in (0, 10):
+            index.rerank = rerank
+            for nprobe in args.nprobe:
+                index.nprobe = nprobe
+                found, ms = timed_search(index, queries, args.k)
+                recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+                print(f"{nprobe:>7} {rerank:>7} {recall:>9.3f} {ms:>9.2f} {exact_ms / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
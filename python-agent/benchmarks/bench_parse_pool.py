@@ -0,0 +1,94 @@
+"""
+Benchmark: PDF parsing throughput of the parse pool vs worker count
+
+Generates synthetic multi-page PDFs and parses them concurrently (as the
+ingest endpoint does for parallel uploads) through ParsePool, reporting
+files/sec and pages/sec for each worker count. Worker 0 is inline parsing on
+the calling threads, i.e. the behaviour before the pool.
+
+    python benchmarks/bench_parse_pool.py --files 32 --pages 40 --workers 0 1 2 4 8
+"""
+
+import sys
+import time
+import argparse
+from io import BytesIO
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from parse_pool import ParsePool
+
+WORDS = (
+    "water supply pothole repair ward complaint timeline inspection sanitation "
+    "drainage streetlight permit contractor budget schedule escalation officer"
+).split()
+
+
+def synthetic_pdf(pages: int, lines_per_page: int, seed: int) -> bytes:
+    """Build a PDF whose pages each hold lines_per_page lines of Helvetica text"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = []
+        for line in range(lines_per_page):
+            words = [WORDS[(seed * 7919 + page * 131 + line * 17 + i) % len(WORDS)] for i in range(12)]
+            lines.append(f"({' '.join(words)}) Tj 0 -14 Td")
+        stream = ("BT /F1 10 Tf 40 760 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="Files parsed at once")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    args = parser.parse_args()
+
+    pdfs = [synthetic_pdf(args.pages, args.lines, seed) for seed in range(args.files)]
+    total_mb = sum(len(pdf) for pdf in pdfs) / 1e6
+    print(f"files={args.files} pages/file={args.pages} size={total_mb:.1f} MB concurrency={args.concurrency}\n")
+    print(f"{'workers':>8} {'files/s':>9} {'pages/s':>9} {'speedup':>8}")
+
+    baseline = None
+    for workers in args.workers:
+        pool = ParsePool(workers=workers, timeout=600)
+
+        # Warm up the worker processes so start-up cost is not measured
+        list(pool.iter_pdf_pages(BytesIO(pdfs[0])))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as threads:
+            pages = sum(threads.map(lambda pdf: len(list(pool.iter_pdf_pages(BytesIO(pdf)))), pdfs))
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+
+        files_per_second = args.files / elapsed
+        baseline = baseline or files_per_second
+        print(f"{workers:>8} {files_per_second:>9.2f} {pages / elapsed:>9.1f} {files_per_second / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
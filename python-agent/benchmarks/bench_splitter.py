@@ -0,0 +1,134 @@
+"""
+Benchmark: RecursiveCharacterTextSplitter vs StreamingTextSplitter
+
+Splits synthetic inputs of several sizes with the ingest settings
+(chunk_size 1000, overlap 200) three ways: the recursive splitter on the
+whole text, the streaming splitter's offsets on the whole text, and the
+streaming splitter fed 64 KB pieces (as when reading a file). Inputs are
+application logs (one line per event, rare blank lines) and prose
+(paragraphs of sentences). Chunks are checked to be identical.
+
+With --memory each splitter is run again under tracemalloc to report the
+peak memory it allocates beyond the input text (the streaming run reads
+its pieces from a file, so it never holds the whole input).
+
+    python benchmarks/bench_splitter.py --sizes-mb 1 10 100 --memory
+"""
+
+import sys
+import time
+import tracemalloc
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from codemind_text import StreamingTextSplitter
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+PIECE_CHARS = 1 << 16
+
+WORDS = ("request handler timeout retry cache index vector query token worker "
+         "shard batch commit stream parser latency upstream service").split()
+
+
+def make_log(size: int, rnd: random.Random) -> str:
+    lines, total = [], 0
+    while total < size:
+        line = (f"2024-05-{rnd.randint(1, 28):02d}T12:{rnd.randint(0, 59):02d}:00Z "
+                f"{rnd.choice(['INFO', 'WARN', 'ERROR'])} {' '.join(rnd.choices(WORDS, k=rnd.randint(4, 14)))}")
+        if rnd.random() < 0.01:
+            line += "\n"
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def make_prose(size: int, rnd: random.Random) -> str:
+    paragraphs, total = [], 0
+    while total < size:
+        sentences = [" ".join(rnd.choices(WORDS, k=rnd.randint(6, 20))).capitalize() for _ in range(rnd.randint(2, 8))]
+        paragraph = ". ".join(sentences) + "."
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:size]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_mb(fn) -> float:
+    """Peak traced allocation of fn in MB (results are consumed, not kept)"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def read_pieces(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            piece = f.read(PIECE_CHARS)
+            if not piece:
+                return
+            yield piece
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--kinds", nargs="+", default=["log", "prose"], choices=["log", "prose"])
+    parser.add_argument("--memory", action="store_true", help="Also report peak memory (slow)")
+    args = parser.parse_args()
+
+    recursive = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function=len, separators=SEPARATORS
+    )
+    streaming = StreamingTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=SEPARATORS)
+
+    print(f"{'input':>12} {'chunks':>8} {'recursive':>10} {'offsets':>10} {'stream':>10} {'speedup':>8}")
+    for kind in args.kinds:
+        for size_mb in args.sizes_mb:
+            rnd = random.Random(0)
+            size = int(size_mb * 1_000_000)
+            text = make_log(size, rnd) if kind == "log" else make_prose(size, rnd)
+
+            chunks, baseline = timed(lambda: recursive.split_text(text))
+            offsets, offset_time = timed(lambda: streaming.split_offsets(text))
+            streamed, stream_time = timed(lambda: [
+                chunk for chunk, _, _ in streaming.split_stream(
+                    text[i:i + PIECE_CHARS] for i in range(0, len(text), PIECE_CHARS)
+                )
+            ])
+
+            if [text[start:end] for start, end in offsets] != chunks or streamed != chunks:
+                raise SystemExit(f"{kind} {size_mb} MB: chunks differ from the recursive splitter")
+
+            label = f"{kind} {size_mb:g}MB"
+            print(f"{label:>12} {len(chunks):>8} {baseline:>9.2f}s {offset_time:>9.2f}s "
+                  f"{stream_time:>9.2f}s {baseline / offset_time:>7.1f}x")
+            del chunks, offsets, streamed
+
+            if args.memory:
+                with tempfile.TemporaryDirectory(prefix="bench-splitter-") as temp_dir:
+                    path = Path(temp_dir) / "input.txt"
+                    path.write_text(text, encoding="utf-8")
+                    recursive_peak = peak_mb(lambda: recursive.split_text(text))
+                    offsets_peak = peak_mb(lambda: streaming.split_offsets(text))
+                    stream_peak = peak_mb(lambda: sum(1 for _ in streaming.split_stream(read_pieces(path))))
+                print(f"{'peak MB':>12} {'':>8} {recursive_peak:>9.1f}M {offsets_peak:>9.1f}M {stream_peak:>9.1f}M")
+            del text
+
+
+if __name__ == "__main__":
+    main()
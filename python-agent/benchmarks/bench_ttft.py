@@ -0,0 +1,155 @@
+"""
+Benchmark: time to first token, /query vs /query/stream
+
+Starts the API in-process (mock LLM, throwaway index seeded with synthetic
+documents) and asks the same questions three ways: /query, which returns
+once the whole answer is generated; /query/stream with LLM streaming on;
+and /query/stream with it off (the answer arrives as one token). The mock
+LLM sleeps --token-delay seconds per token to stand in for a real model.
+Reports median and p95 of time to the sources event, to the first token
+and to the end of the response. The answer cache is disabled so every
+request generates.
+
+    python benchmarks/bench_ttft.py --queries 20 --token-delay 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Worded to route to the document agent (the GIS agent does not call the LLM)
+QUESTIONS = [
+    "What does the policy say about road repair timelines?",
+    "How often is water quality tested?",
+    "Which SOP covers streetlight maintenance?",
+    "What guideline applies to road maintenance contractors?",
+]
+
+TOPICS = ("pothole repair", "water quality testing", "ward complaint tracking", "road maintenance SOP")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(count: int):
+    from langchain_core.documents import Document
+    from vector_store import get_vector_store
+
+    documents = [
+        Document(
+            page_content=f"Section {i}: {TOPICS[i % len(TOPICS)]} must follow the municipal standard. "
+                         f"Escalate after {i % 10 + 2} days without resolution.",
+            metadata={"source": f"policy_{i % 7}.pdf", "page": i % 30 + 1}
+        )
+        for i in range(count)
+    ]
+    get_vector_store().add_documents(documents)
+
+
+def timed_query(client, base: str, question: str) -> dict:
+    start = time.perf_counter()
+    response = client.post(f"{base}/query", json={"query": question, "search_mode": "hybrid"})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return {"sources": elapsed, "first_token": elapsed, "total": elapsed}
+
+
+def timed_stream(client, base: str, question: str) -> dict:
+    start = time.perf_counter()
+    marks = {}
+    event = None
+    with client.stream("POST", f"{base}/query/stream", json={"query": question, "search_mode": "hybrid"}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                if event == "error":
+                    raise RuntimeError(json.loads(line[len("data: "):])["detail"])
+                key = {"sources": "sources", "token": "first_token"}.get(event)
+                if key and key not in marks:
+                    marks[key] = time.perf_counter() - start
+    marks["total"] = time.perf_counter() - start
+    return marks
+
+
+def summarize(label: str, runs: list):
+    def stat(key, q):
+        values = sorted(run[key] for run in runs)
+        if q == 50:
+            return statistics.median(values) * 1000
+        return values[min(len(values) - 1, int(len(values) * q / 100))] * 1000
+
+    print(f"{label:>22} {stat('sources', 50):>9.1f} {stat('first_token', 50):>9.1f} {stat('first_token', 95):>9.1f} "
+          f"{stat('total', 50):>9.1f} {stat('total', 95):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20, help="Requests per mode")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Mock LLM seconds per token")
+    parser.add_argument("--documents", type=int, default=500, help="Synthetic chunks in the index")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bench-ttft-")
+    os.environ.update({
+        "USE_MOCK_LLM": "true",
+        "MOCK_LLM_TOKEN_DELAY": str(args.token_delay),
+        "ANSWER_CACHE_ENABLED": "false",
+        "CHROMA_DB_DIR": temp_dir,
+        "EMBEDDING_CACHE_ENABLED": "false",
+    })
+
+    import logging
+    import httpx
+    import uvicorn
+    from app import app
+    from llm_config import get_llm_settings
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    seed(args.documents)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}"
+    settings = get_llm_settings()
+    print(f"{'ms':>22} {'sources':>9} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>9} {'total p95':>9}")
+    try:
+        with httpx.Client(timeout=60) as client:
+            questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.queries)]
+            timed_query(client, base, questions[0])  # Warm up
+
+            summarize("/query", [timed_query(client, base, q) for q in questions])
+
+            settings.streaming = True
+            summarize("/query/stream", [timed_stream(client, base, q) for q in questions])
+
+            settings.streaming = False
+            summarize("/query/stream (off)", [timed_stream(client, base, q) for q in questions])
+    finally:
+        server.should_exit = True
+        thread.join()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Near-Duplicate Index for CodeMind
+SimHash fingerprints with banded LSH lookup, so repeated boilerplate is embedded once
+"""
+
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Sequence, Tuple
+from pathlib import Path
+import numpy as np
+from langchain_core.documents import Document
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Chunks are only deduplicated when these metadata fields agree. They cover
+# the fields MetadataIndex and the Chroma where-clause filter on, so a
+# search filtered on any of them never misses a chunk because it was linked
+# away; as source is included, duplicates are only linked within one file
+# or page. Filters on other fields can still miss linked duplicates.
+SCOPE_FIELDS = ("source", "repo_url", "branch", "source_name", "ward", "tags", "file_type")
+
+
+def simhash(text: str, min_tokens: int = 0) -> Optional[int]:
+    """
+    64-bit SimHash of the word shingles of a text
+
+    Returns:
+        Fingerprint, or None when the text has fewer than min_tokens words
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < max(min_tokens, 1):
+        return None
+
+    shingles = {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    }
+    digests = np.frombuffer(
+        b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles),
+        dtype=np.uint8
+    ).reshape(-1, 8)
+
+    # Bit i of the fingerprint is set when most shingle hashes have bit i set
+    bits = np.unpackbits(digests, axis=1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def _signed(value: int) -> int:
+    """Map an unsigned 64-bit value into SQLite's signed INTEGER range"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class DedupIndex:
+    """
+    Persistent near-duplicate detector for chunks
+
+    Each stored chunk is fingerprinted with SimHash. Chunks whose
+    fingerprints differ in at most max_distance bits are near-duplicates; by
+    the pigeonhole principle they agree exactly on at least one of
+    max_distance + 1 bands of the fingerprint, so candidates come from an
+    indexed band lookup instead of a scan. A duplicate is not embedded:
+    it is linked, under its own ID and with its own content and metadata,
+    to the canonical chunk that was stored first.
+
+    Only chunks with the same scope (the values of the scope fields, e.g.
+    repo_url and ward) are compared. When a canonical chunk is released,
+    its first linked duplicate is handed back to be embedded and stored in
+    its place, and the remaining links move over to it.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_distance: Optional[int] = None,
+        min_tokens: Optional[int] = None,
+        scope_fields: Sequence[str] = SCOPE_FIELDS
+    ):
+        """
+        Args:
+            db_path: Path to the SQLite index file
+            max_distance: Largest Hamming distance counted as a duplicate (DEDUP_MAX_DISTANCE)
+            min_tokens: Shorter chunks are never deduplicated (DEDUP_MIN_TOKENS)
+            scope_fields: Metadata fields that must agree for chunks to be duplicates
+        """
+        self.db_path = db_path
+        self.max_distance = max_distance if max_distance is not None else int(os.getenv("DEDUP_MAX_DISTANCE", "3"))
+        self.min_tokens = min_tokens if min_tokens is not None else int(os.getenv("DEDUP_MIN_TOKENS", "20"))
+        self.scope_fields = tuple(scope_fields)
+
+        # Band b covers bits [b * width, (b + 1) * width) counted from the low end
+        self.bands = self.max_distance + 1
+        self.band_width = 64 // self.bands
+
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite database with schema"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    id TEXT PRIMARY KEY,
+                    simhash INTEGER NOT NULL,
+                    scope TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS bands (
+                    band INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    id TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_bands_value ON bands(band, value)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_bands_id ON bands(id)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS links (
+                    id TEXT PRIMARY KEY,
+                    canonical_id TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_links_canonical ON links(canonical_id)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_width) - 1
+        return [_signed((fingerprint >> (band * self.band_width)) & mask) for band in range(self.bands)]
+
+    def _scope(self, metadata: Optional[Dict]) -> str:
+        metadata = metadata or {}
+        return json.dumps([metadata.get(field) for field in self.scope_fields], default=str)
+
+    def _find(self, conn: sqlite3.Connection, fingerprint: int, scope: str) -> Optional[str]:
+        """ID of a registered chunk of the same scope within max_distance, if any"""
+        for band, value in enumerate(self._band_values(fingerprint)):
+            rows = conn.execute(
+                'SELECT f.id, f.simhash FROM bands b JOIN fingerprints f ON f.id = b.id '
+                'WHERE b.band = ? AND b.value = ? AND f.scope = ?',
+                (band, value, scope)
+            ).fetchall()
+            for doc_id, other in rows:
+                if bin(fingerprint ^ (other & ((1 << 64) - 1))).count("1") <= self.max_distance:
+                    return doc_id
+        return None
+
+    def _register(self, conn: sqlite3.Connection, doc_id: str, fingerprint: int, scope: str):
+        conn.execute(
+            'INSERT OR REPLACE INTO fingerprints (id, simhash, scope) VALUES (?, ?, ?)',
+            (doc_id, _signed(fingerprint), scope)
+        )
+        conn.execute('DELETE FROM bands WHERE id = ?', (doc_id,))
+        conn.executemany(
+            'INSERT INTO bands (band, value, id) VALUES (?, ?, ?)',
+            [(band, value, doc_id) for band, value in enumerate(self._band_values(fingerprint))]
+        )
+
+    def claim(self, ids: List[str], documents: List[Document]) -> List[Optional[str]]:
+        """
+        Register a batch of chunks about to be stored, detecting near-duplicates
+
+        Args:
+            ids: IDs the chunks will be stored under
+            documents: The chunks
+
+        Returns:
+            Per chunk, the canonical chunk ID it duplicates (the chunk is
+            then linked to it), or None if it is new (its fingerprint is
+            then registered under its ID)
+        """
+        fingerprints = [simhash(doc.page_content, self.min_tokens) for doc in documents]
+        canonical: List[Optional[str]] = []
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                for doc_id, doc, fingerprint in zip(ids, documents, fingerprints):
+                    if fingerprint is None:
+                        canonical.append(None)
+                        continue
+
+                    # Earlier chunks of this batch are visible: same connection, same transaction
+                    scope = self._scope(doc.metadata)
+                    match = self._find(conn, fingerprint, scope)
+                    if match == doc_id:
+                        # A stored chunk written again (e.g. with new metadata)
+                        match = None
+                    canonical.append(match)
+                    if match is None:
+                        self._register(conn, doc_id, fingerprint, scope)
+                    else:
+                        conn.execute(
+                            'INSERT OR REPLACE INTO links (id, canonical_id, content, metadata, created_at) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            (doc_id, match, doc.page_content, json.dumps(doc.metadata or {}, default=str),
+                             datetime.now().isoformat())
+                        )
+                conn.commit()
+            finally:
+                conn.close()
+
+        return canonical
+
+    def release(self, ids: List[str], promote: bool = True) -> Tuple[List[str], List[Document]]:
+        """
+        Forget chunks that were deleted (or never stored)
+
+        Released IDs may be canonical chunks or linked duplicates. The first
+        remaining duplicate of each released canonical chunk is promoted: its
+        link is removed, its fingerprint registered and the other links
+        moved to it. The caller must embed and store the promoted chunks,
+        which are not in the vector store yet.
+
+        Args:
+            ids: IDs of the chunks to forget
+            promote: Promote duplicates of released canonical chunks; when
+                False their links are dropped as well
+
+        Returns:
+            IDs and documents of the promoted chunks
+        """
+        promoted_ids: List[str] = []
+        promoted: List[Document] = []
+        if not ids:
+            return promoted_ids, promoted
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                # Linked duplicates go first, so none of them is promoted
+                for i in range(0, len(ids), 500):
+                    batch = ids[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    conn.execute(f'DELETE FROM links WHERE id IN ({placeholders})', batch)
+
+                for i in range(0, len(ids), 500):
+                    batch = ids[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    scopes = dict(conn.execute(
+                        f'SELECT id, scope FROM fingerprints WHERE id IN ({placeholders})', batch
+                    ).fetchall())
+                    conn.execute(f'DELETE FROM fingerprints WHERE id IN ({placeholders})', batch)
+                    conn.execute(f'DELETE FROM bands WHERE id IN ({placeholders})', batch)
+
+                    for canonical_id in batch:
+                        if not promote:
+                            conn.execute('DELETE FROM links WHERE canonical_id = ?', (canonical_id,))
+                            continue
+
+                        row = conn.execute(
+                            'SELECT id, content, metadata FROM links WHERE canonical_id = ? ORDER BY rowid LIMIT 1',
+                            (canonical_id,)
+                        ).fetchone()
+                        if row is None:
+                            continue
+
+                        doc_id, content, metadata = row
+                        conn.execute('DELETE FROM links WHERE id = ?', (doc_id,))
+                        conn.execute('UPDATE links SET canonical_id = ? WHERE canonical_id = ?', (doc_id, canonical_id))
+                        fingerprint = simhash(content)
+                        if canonical_id in scopes and fingerprint is not None:
+                            self._register(conn, doc_id, fingerprint, scopes[canonical_id])
+                        promoted_ids.append(doc_id)
+                        promoted.append(Document(page_content=content, metadata=json.loads(metadata)))
+                conn.commit()
+            finally:
+                conn.close()
+
+        if promoted:
+            logger.info(f"Promoted {len(promoted)} linked duplicates of released chunks")
+        return promoted_ids, promoted
+
+    def duplicates_of(self, canonical_id: str) -> List[Dict]:
+        """Metadata of the chunks linked to a canonical chunk"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT metadata FROM links WHERE canonical_id = ? ORDER BY rowid', (canonical_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(metadata) for (metadata,) in rows]
+
+    def linked_ids(self, field: str, value: str) -> set:
+        """IDs of the linked duplicates whose metadata field equals value"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT id FROM links WHERE json_extract(metadata, ?) = ?', (f"$.{field}", value)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {doc_id for (doc_id,) in rows}
+
+    def reset(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('DELETE FROM fingerprints')
+                conn.execute('DELETE FROM bands')
+                conn.execute('DELETE FROM links')
+                conn.commit()
+            finally:
+                conn.close()
+
+    def count(self) -> int:
+        """Number of fingerprinted chunks"""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,153 @@
+"""
+Document Parsers for CodeMind
+Format-specific text extraction, kept free of heavy imports so parse workers start quickly
+"""
+
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+import logging
+
+# PDF parsing
+try:
+    from pypdf import PdfReader
+    HAS_PDF = True
+except ImportError:
+    HAS_PDF = False
+
+logger = logging.getLogger(__name__)
+
+# WordprocessingML namespace
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+DOCX_PART = re.compile(r"word/(header|footer)(\d*)\.xml")
+
+
+def pdf_page_count(file: BinaryIO) -> int:
+    """Number of pages in a PDF"""
+    if not HAS_PDF:
+        raise ImportError("pypdf not installed. Install with: pip install pypdf")
+    return len(PdfReader(file).pages)
+
+
+def iter_pdf_pages(
+    file: BinaryIO,
+    start: int = 0,
+    end: Optional[int] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) for non-empty PDF pages, parsing lazily
+
+    Args:
+        file: Seekable PDF stream
+        start: First page index (0-based)
+        end: Page index to stop before (default: last page)
+    """
+    if not HAS_PDF:
+        raise ImportError("pypdf not installed. Install with: pip install pypdf")
+
+    pdf_reader = PdfReader(file)
+    pages = pdf_reader.pages
+    for index in range(start, len(pages) if end is None else min(end, len(pages))):
+        text = pages[index].extract_text()
+        if text.strip():
+            yield index + 1, text
+
+
+def extract_docx(file: BinaryIO) -> str:
+    """
+    Extract text from DOCX straight from the buffer
+
+    The zip parts are streamed with iterparse instead of loading the object
+    model: headers first, then body paragraphs and tables in document order,
+    then footers. Table rows become " | "-separated lines.
+    """
+    try:
+        with zipfile.ZipFile(file) as archive:
+            names = set(archive.namelist())
+            if "word/document.xml" not in names:
+                raise ValueError("Not a DOCX file: word/document.xml is missing")
+
+            headers = _docx_parts(archive, names, "header")
+            footers = _docx_parts(archive, names, "footer")
+            with archive.open("word/document.xml") as part:
+                body = list(iter_docx_blocks(part))
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a DOCX file: {e}")
+
+    return "\n".join(headers + body + footers)
+
+
+def _docx_parts(archive: zipfile.ZipFile, names: set, kind: str) -> List[str]:
+    """Non-empty, de-duplicated text of header or footer parts"""
+    parts = sorted(
+        (int(match.group(2) or 0), name)
+        for name in names
+        for match in [DOCX_PART.fullmatch(name)]
+        if match and match.group(1) == kind
+    )
+
+    texts = []
+    for _, name in parts:
+        with archive.open(name) as part:
+            text = "\n".join(block for block in iter_docx_blocks(part) if block.strip())
+        # First-page, even and default variants usually repeat the same text
+        if text and text not in texts:
+            texts.append(text)
+    return texts
+
+
+def iter_docx_blocks(part: BinaryIO) -> Iterator[str]:
+    """
+    Yield top-level paragraphs and tables of a WordprocessingML part in order
+
+    Elements are cleared as soon as they are consumed, so memory stays
+    bounded by the largest table rather than the whole document.
+    """
+    # Stack of open tables -> rows -> cells (lists of text)
+    tables: List[List[List[str]]] = []
+    rows: List[List[str]] = []
+    cells: List[List[str]] = []
+
+    for event, elem in ET.iterparse(part, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == W + "tbl":
+                tables.append([])
+            elif tag == W + "tr":
+                rows.append([])
+            elif tag == W + "tc":
+                cells.append([])
+            continue
+
+        if tag == W + "p":
+            text = _paragraph_text(elem)
+            if cells:
+                cells[-1].append(text)
+            else:
+                yield text
+            elem.clear()
+        elif tag == W + "tc":
+            rows[-1].append(" ".join(t for t in cells.pop() if t))
+        elif tag == W + "tr":
+            tables[-1].append(rows.pop())
+        elif tag == W + "tbl":
+            text = "\n".join(" | ".join(row) for row in tables.pop())
+            if cells:
+                cells[-1].append(text)
+            else:
+                yield text
+            elem.clear()
+
+
+def _paragraph_text(paragraph: ET.Element) -> str:
+    parts = []
+    for elem in paragraph.iter():
+        if elem.tag == W + "t" and elem.text:
+            parts.append(elem.text)
+        elif elem.tag == W + "tab":
+            parts.append("\t")
+        elif elem.tag in (W + "br", W + "cr"):
+            parts.append("\n")
+    return "".join(parts)
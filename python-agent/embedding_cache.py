@@ -0,0 +1,278 @@
+"""
+Embedding Caches for CodeMind
+Persistent cache for document embeddings and in-process LRU cache for query vectors
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import List, Dict, Any, Optional, Callable
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize chunk text so cosmetic differences share a cache entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings:
+    """Wraps an embeddings model with a persistent SQLite cache keyed by (model, text hash)"""
+
+    def __init__(
+        self,
+        embeddings,
+        model_name: str,
+        db_path: str,
+        max_entries: int = 500_000
+    ):
+        """
+        Args:
+            embeddings: Underlying embeddings model (embed_documents / embed_query)
+            model_name: Embedding model name, part of every cache key
+            db_path: Path to the SQLite cache file
+            max_entries: Least recently used entries are evicted beyond this size
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite database with schema"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)')
+            conn.commit()
+        finally:
+            conn.close()
+
+        logger.info(f"Embedding cache initialized: {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Return embeddings for texts, only calling the model for cache misses"""
+        if not texts:
+            return []
+
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(set(keys))
+
+        # Embed each distinct missing key once
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Query embeddings are not persisted"""
+        return self.embeddings.embed_query(text)
+
+    def _lookup(self, keys: set) -> Dict[str, List[float]]:
+        """Fetch cached vectors and refresh their last access time"""
+        found: Dict[str, List[float]] = {}
+        key_list = list(keys)
+        conn = self._connect()
+
+        try:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(key_list), 500):
+                batch = key_list[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})',
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    'UPDATE embeddings SET last_access = ? WHERE key = ?',
+                    [(now, key) for key in found]
+                )
+                conn.commit()
+        finally:
+            conn.close()
+
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        """Insert new vectors and evict least recently used entries over the cap"""
+        now = time.time()
+        conn = self._connect()
+
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)',
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in vectors.items()
+                ]
+            )
+
+            count = conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    '''
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+                    )
+                    ''',
+                    (overflow,)
+                )
+                logger.info(f"Evicted {overflow} entries from embedding cache")
+
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss statistics"""
+        conn = self._connect()
+        try:
+            entries = conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+        finally:
+            conn.close()
+
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+class QueryEmbeddingCache:
+    """In-process LRU cache of query vectors with a TTL and a memory cap"""
+
+    def __init__(self, ttl_seconds: float = 3600, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            ttl_seconds: Entries older than this are re-embedded
+            max_bytes: Approximate memory budget for cached vectors
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return normalize_text(query).casefold()
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """Return the cached vector for a query, or None on miss/expiry"""
+        key = self._key(query)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, created_at, size = entry
+                if time.monotonic() - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector.tolist()
+
+                del self._entries[key]
+                self._bytes -= size
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, vector: List[float]):
+        """Cache a query vector, evicting least recently used entries over budget"""
+        key = self._key(query)
+        array = np.asarray(vector, dtype=np.float32)
+        size = array.nbytes + len(key)
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+
+            self._entries[key] = (array, time.monotonic(), size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_embed(self, query: str, embed: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached vector or embed the query and cache it"""
+        vector = self.get(query)
+        if vector is None:
+            vector = embed(query)
+            self.put(query, vector)
+        return vector
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit-rate and memory statistics"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
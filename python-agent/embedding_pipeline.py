@@ -0,0 +1,294 @@
+"""
+Embedding Pipeline for document ingestion
+Embeds chunks in batches off the event loop with bounded concurrency
+"""
+
+import os
+import time
+import hashlib
+import asyncio
+import logging
+from typing import List, Dict, Any, Iterable, AsyncIterable, AsyncIterator, Optional, Union, Callable
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_id(document: Document) -> str:
+    """
+    Deterministic ID of a chunk: a hash of its source identity and its content
+
+    The source identity is the repo URL and branch, the source name and
+    the file name, so files with the same name from different sources (or
+    different branches of one repository) never share IDs. The same chunk of the same source always gets the same ID, so
+    re-ingesting a file (or retrying a failed ingest) upserts onto the
+    chunks already stored instead of adding copies, and chunks an edit did
+    not touch keep their IDs.
+    """
+    metadata = document.metadata or {}
+    key = "\0".join([
+        str(metadata.get("repo_url", "")),
+        str(metadata.get("branch", "")),
+        str(metadata.get("source_name", "")),
+        str(metadata.get("source", "")),
+        document.page_content,
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class EmbeddingPipeline:
+    """Batched, concurrent embed -> upsert stage for the vector store"""
+
+    def __init__(
+        self,
+        vector_store,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None
+    ):
+        """
+        Args:
+            vector_store: VectorStore used for embedding and storage
+            batch_size: Chunks per embedding request (EMBED_BATCH_SIZE)
+            concurrency: Batches kept in flight at once (EMBED_CONCURRENCY)
+            max_retries: Retries per failed batch (EMBED_MAX_RETRIES)
+            retry_delay: Base delay in seconds for exponential backoff (EMBED_RETRY_DELAY)
+        """
+        self.vector_store = vector_store
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE", "64"))
+        self.concurrency = concurrency or int(os.getenv("EMBED_CONCURRENCY", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("EMBED_MAX_RETRIES", "3"))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv("EMBED_RETRY_DELAY", "1.0"))
+
+        # Embedding calls run concurrently, writes to the store are serialized
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    async def run(
+        self,
+        documents: Union[Iterable[Document], AsyncIterable[Document]],
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Embed and store documents
+
+        Documents may come from an async generator; it is only advanced when a
+        worker has room for another batch, so a slow embedder throttles the
+        parser and at most (concurrency + 1) batches are held in memory.
+
+        Chunk IDs come from chunk_id, so chunks the store already holds with
+        the same metadata (checked with its existing_ids) are not embedded
+        again; chunks whose metadata changed are stored again. A chunk
+        repeated within the run is stored once. When the store has a dedup
+        index, the remaining chunks are checked before they are embedded:
+        near-duplicates of chunks already stored are linked to them instead
+        of being embedded and stored again. They keep their own IDs in
+        chunk_ids, which is what callers should record per source: deleting
+        such an ID forgets the link.
+
+        Args:
+            documents: Chunked LangChain Document objects (sync or async iterable)
+            on_progress: Called with the number of chunks stored after each batch
+
+        Returns:
+            Dict with ids of the stored chunks (in input order, including
+            those already stored), chunk_ids (the ID of every input chunk,
+            in input order), chunk_count, already_stored,
+            duplicates_skipped, linked (input position -> canonical ID of
+            each skipped duplicate), batches, retries, elapsed_seconds and
+            chunks_per_second
+        """
+        start = time.perf_counter()
+        self._write_lock = asyncio.Lock()
+        dedup_index = getattr(self.vector_store, "dedup_index", None)
+        existing_ids = getattr(self.vector_store, "existing_ids", None)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        results: Dict[int, List[str]] = {}
+        stats = {"retries": 0, "stored": 0}
+        linked: Dict[int, str] = {}
+        claimed: List[str] = []
+        order: List[str] = []
+        chunk_ids: List[str] = []
+        seen: Dict[str, str] = {}
+        already_stored = 0
+
+        workers = [
+            asyncio.create_task(self._worker(queue, results, stats, on_progress))
+            for _ in range(self.concurrency)
+        ]
+
+        try:
+            batch_count = 0
+            position = 0
+            async for batch in self._batches(documents):
+                size = len(batch)
+                ids = [chunk_id(doc) for doc in batch]
+                chunk_ids.extend(ids)
+                existing = await asyncio.to_thread(existing_ids, ids, batch) if existing_ids else set()
+
+                # Only chunks new to both this run and the store are embedded
+                fresh = []
+                for offset, doc_id in enumerate(ids):
+                    if doc_id in seen:
+                        linked[position + offset] = seen[doc_id]
+                        continue
+                    seen[doc_id] = doc_id
+                    if doc_id in existing:
+                        already_stored += 1
+                    else:
+                        fresh.append(offset)
+
+                if dedup_index is not None and fresh:
+                    canonical = await asyncio.to_thread(
+                        dedup_index.claim, [ids[i] for i in fresh], [batch[i] for i in fresh]
+                    )
+                    for offset, match in zip(fresh, canonical):
+                        if match is None:
+                            claimed.append(ids[offset])
+                        else:
+                            linked[position + offset] = seen[ids[offset]] = match
+                    fresh = [offset for offset, match in zip(fresh, canonical) if match is None]
+
+                order.extend(doc_id for offset, doc_id in enumerate(ids) if position + offset not in linked)
+                batch, ids = [batch[i] for i in fresh], [ids[i] for i in fresh]
+                position += size
+
+                if batch:
+                    await self._put(queue, (batch_count, batch, ids), workers)
+                    batch_count += 1
+
+            for _ in workers:
+                await self._put(queue, None, workers)
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if claimed:
+                # Fingerprints of chunks that never made it into the store
+                stored = {doc_id for batch_ids in results.values() for doc_id in batch_ids}
+                dedup_index.release([doc_id for doc_id in claimed if doc_id not in stored], promote=False)
+            raise
+
+        elapsed = time.perf_counter() - start
+        chunks_per_second = stats["stored"] / elapsed if elapsed > 0 else 0.0
+
+        logger.info(
+            f"Embedded {stats['stored']} chunks in {batch_count} batches "
+            f"({chunks_per_second:.1f} chunks/s, {stats['retries']} retries, "
+            f"{already_stored} already stored, {len(linked)} duplicates skipped)"
+        )
+
+        return {
+            "ids": order,
+            "chunk_ids": chunk_ids,
+            "chunk_count": len(order),
+            "already_stored": already_stored,
+            "duplicates_skipped": len(linked),
+            "linked": linked,
+            "batches": batch_count,
+            "retries": stats["retries"],
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(chunks_per_second, 2)
+        }
+
+    async def _batches(
+        self,
+        documents: Union[Iterable[Document], AsyncIterable[Document]]
+    ) -> AsyncIterator[List[Document]]:
+        """Group documents into batches of batch_size"""
+        batch = []
+        async for doc in self._aiter(documents):
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    async def _aiter(
+        documents: Union[Iterable[Document], AsyncIterable[Document]]
+    ) -> AsyncIterator[Document]:
+        if hasattr(documents, "__aiter__"):
+            async for doc in documents:
+                yield doc
+        else:
+            for doc in documents:
+                yield doc
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, item, workers: List[asyncio.Task]):
+        """
+        Enqueue a batch (or an end-of-input sentinel), surfacing a failed
+        worker instead of blocking forever
+
+        Workers that exited cleanly took a sentinel; the put keeps waiting on
+        the rest. Once a worker has failed, or none is left to consume the
+        item, the first worker exception is raised.
+        """
+        put = asyncio.ensure_future(queue.put(item))
+        try:
+            while True:
+                for worker in workers:
+                    if worker.done() and not worker.cancelled() and worker.exception() is not None:
+                        raise worker.exception()
+
+                running = [worker for worker in workers if not worker.done()]
+                if not running:
+                    raise RuntimeError("Embedding workers exited before the input was consumed")
+
+                done, _ = await asyncio.wait([put, *running], return_when=asyncio.FIRST_COMPLETED)
+                if put in done:
+                    return
+        finally:
+            if not put.done():
+                put.cancel()
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        results: Dict[int, List[str]],
+        stats: Dict[str, int],
+        on_progress: Optional[Callable[[int], None]] = None
+    ):
+        """Consume batches until a None sentinel is received"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            index, batch, ids = item
+            embeddings = await self._embed_with_retry(batch, stats)
+
+            async with self._write_lock:
+                results[index] = await asyncio.to_thread(
+                    self.vector_store.add_embeddings, batch, embeddings, ids
+                )
+                stats["stored"] += len(batch)
+                if on_progress:
+                    on_progress(stats["stored"])
+
+    async def _embed_with_retry(
+        self,
+        batch: List[Document],
+        stats: Dict[str, int]
+    ) -> List[List[float]]:
+        """Embed one batch in a worker thread, retrying with exponential backoff"""
+        texts = [doc.page_content for doc in batch]
+        attempt = 0
+
+        while True:
+            try:
+                return await asyncio.to_thread(self.vector_store.embed_documents, texts)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"Embedding batch failed after {attempt + 1} attempts: {e}")
+                    raise
+
+                delay = self.retry_delay * (2 ** attempt)
+                logger.warning(f"Embedding batch failed ({e}), retrying in {delay:.1f}s")
+                attempt += 1
+                stats["retries"] += 1
+                await asyncio.sleep(delay)
@@ -0,0 +1,480 @@
+"""
+Flat Vector Index for CodeMind
+Memory-mapped, append-only vector matrix with a SQLite metadata sidecar
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import numpy as np
+from langchain_core.documents import Document
+import logging
+
+from ivf_index import IVFPQIndex
+from metadata_index import Bitmap, MetadataIndex
+
+# Cross-process write lock (POSIX only)
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+
+class FlatVectorIndex:
+    """
+    Exact cosine-similarity search over a memory-mapped float32/float16 matrix
+
+    Layout of the index directory:
+        index.json   - dimensions and dtype
+        vectors.bin  - append-only row-major matrix of L2-normalized vectors
+        metadata.db  - SQLite sidecar: ordinal -> id, text, metadata, tombstone,
+                       plus filter bitmaps (see metadata_index.py)
+        ivfpq/       - optional IVF-PQ build (see ivf_index.py)
+
+    The matrix is opened read-only with np.memmap, so every worker process
+    mapping the same file shares its pages through the OS page cache.
+    """
+
+    # Bytes of matrix materialized per scoring block
+    BLOCK_BYTES = 32 * 1024 * 1024
+
+    def __init__(
+        self,
+        directory: str,
+        dtype: str = "float32",
+        nprobe: int = 8,
+        rerank: int = 10
+    ):
+        """
+        Args:
+            directory: Index directory (created if missing)
+            dtype: Storage dtype for new indexes, float32 or float16
+            nprobe: IVF lists scanned per query when an ANN build exists
+            rerank: Exact re-scoring shortlist as a multiple of k (0 disables)
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported flat index dtype: {dtype}")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.bin"
+        self.db_path = str(self.directory / "metadata.db")
+        self.info_path = self.directory / "index.json"
+        self.ann_directory = self.directory / "ivfpq"
+        self.nprobe = nprobe
+        self.rerank = rerank
+
+        self.dimensions: Optional[int] = None
+        self.dtype = np.dtype(dtype)
+        self._load_info()
+
+        # Snapshot of committed state, refreshed when the generation changes
+        self._generation = -1
+        self._rows = 0
+        self._matrix: Optional[np.memmap] = None
+        self._live: Optional[np.ndarray] = None
+        self._universe = Bitmap()
+        self._ann: Optional[IVFPQIndex] = None
+        self._lock = threading.Lock()
+
+        self._init_database()
+        self.metadata_index = MetadataIndex(self._connect)
+        self._backfill_metadata_index()
+        logger.info(f"Flat vector index at {self.directory} ({self.dtype.name})")
+
+    def _load_info(self):
+        if self.info_path.exists():
+            info = json.loads(self.info_path.read_text())
+            self.dimensions = info["dimensions"]
+            self.dtype = np.dtype(info["dtype"])
+
+    def _init_database(self):
+        """Initialize SQLite sidecar with schema"""
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rows (
+                    ordinal INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    document TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    deleted INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS state (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rows_id ON rows(id)')
+            conn.execute("INSERT OR IGNORE INTO state (key, value) VALUES ('rows', 0)")
+            conn.execute("INSERT OR IGNORE INTO state (key, value) VALUES ('generation', 0)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _backfill_metadata_index(self):
+        """Build filter bitmaps for indexes created before they existed"""
+        with self._write_lock():
+            conn = self._connect()
+            try:
+                if conn.execute("SELECT 1 FROM state WHERE key = 'metadata_index'").fetchone():
+                    return
+
+                self.metadata_index.reset(conn)
+                cursor = conn.execute('SELECT ordinal, metadata FROM rows WHERE deleted = 0')
+                total = 0
+                while True:
+                    batch = cursor.fetchmany(10000)
+                    if not batch:
+                        break
+                    self.metadata_index.add(
+                        conn, [r[0] for r in batch], [json.loads(r[1]) for r in batch]
+                    )
+                    total += len(batch)
+                conn.execute("INSERT INTO state (key, value) VALUES ('metadata_index', 1)")
+                conn.commit()
+                if total:
+                    logger.info(f"Built metadata bitmaps for {total} existing rows")
+            finally:
+                conn.close()
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers across threads and worker processes"""
+        with self._lock:
+            if not HAS_FCNTL:
+                yield
+                return
+
+            with open(self.directory / "write.lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dimensions * self.dtype.itemsize
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[Document]
+    ):
+        """
+        Append vectors and their documents; re-added IDs replace older rows
+
+        Args:
+            ids: Document IDs
+            embeddings: One embedding per document
+            documents: LangChain Document objects
+        """
+        if not ids:
+            return
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+        with self._write_lock():
+            self._load_info()
+            if self.dimensions is None:
+                self.dimensions = matrix.shape[1]
+                self.info_path.write_text(json.dumps({
+                    "dimensions": self.dimensions,
+                    "dtype": self.dtype.name
+                }))
+            elif matrix.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match index ({self.dimensions})"
+                )
+
+            conn = self._connect()
+            try:
+                start = conn.execute("SELECT value FROM state WHERE key = 'rows'").fetchone()[0]
+
+                # Drop rows appended by a writer that died before committing
+                with open(self.vectors_path, "ab") as f:
+                    f.truncate(start * self.row_bytes)
+                    f.write(matrix.astype(self.dtype).tobytes())
+
+                self._tombstone(conn, ids)
+                conn.executemany(
+                    'INSERT INTO rows (ordinal, id, document, metadata) VALUES (?, ?, ?, ?)',
+                    [
+                        (start + i, doc_id, doc.page_content, json.dumps(doc.metadata or {}))
+                        for i, (doc_id, doc) in enumerate(zip(ids, documents))
+                    ]
+                )
+                self.metadata_index.add(
+                    conn,
+                    list(range(start, start + len(ids))),
+                    [doc.metadata or {} for doc in documents]
+                )
+                conn.execute("UPDATE state SET value = ? WHERE key = 'rows'", (start + len(ids),))
+                conn.execute("UPDATE state SET value = value + 1 WHERE key = 'generation'")
+                conn.commit()
+            finally:
+                conn.close()
+
+    def delete(self, ids: List[str]):
+        """Tombstone rows by document ID"""
+        if not ids:
+            return
+
+        with self._write_lock():
+            conn = self._connect()
+            try:
+                self._tombstone(conn, ids)
+                conn.execute("UPDATE state SET value = value + 1 WHERE key = 'generation'")
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _tombstone(self, conn: sqlite3.Connection, ids: List[str]):
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            conn.execute(
+                f'UPDATE rows SET deleted = 1 WHERE deleted = 0 AND id IN ({placeholders})',
+                batch
+            )
+
+    def _refresh(self):
+        """Remap the matrix and reload tombstones if another writer committed"""
+        conn = self._connect()
+        try:
+            state = dict(conn.execute('SELECT key, value FROM state').fetchall())
+            if state["generation"] == self._generation:
+                return
+
+            rows = state["rows"]
+            live = np.ones(rows, dtype=bool)
+            deleted = [r[0] for r in conn.execute('SELECT ordinal FROM rows WHERE deleted = 1')]
+            live[np.asarray(deleted, dtype=np.int64)] = False
+        finally:
+            conn.close()
+
+        self._load_info()
+        self._matrix = None
+        if rows > 0:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dimensions)
+            )
+        self._rows = rows
+        self._live = live
+        self._universe = Bitmap.from_ordinals(np.flatnonzero(live))
+        self.metadata_index.invalidate()
+        self._ann = IVFPQIndex.load(self.ann_directory)
+        self._generation = state["generation"]
+
+    def search(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Exact top-k search
+
+        Args:
+            embedding: Query vector
+            k: Number of results to return
+            filter: Optional metadata filter, e.g. {"ward": "Ward 12"} or
+                {"tags": {"$in": ["roads", "water"]}}; see MetadataIndex
+
+        Returns:
+            List of (document, cosine distance) tuples, closest first
+        """
+        with self._lock:
+            self._refresh()
+            matrix, live, ann = self._matrix, self._live, self._ann
+            universe = self._universe
+
+        if matrix is None:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        if filter:
+            # Only the rows selected by the bitmaps are scored
+            candidates = self.metadata_index.evaluate(filter, universe).to_array()
+            scores = self._score(matrix, query, candidates)
+            ordinals, similarities = self._top_k(scores, k, candidates)
+            distances = 1.0 - similarities
+        elif ann is not None:
+            ordinals, distances = self._search_ann(ann, matrix, live, query, k)
+        else:
+            scores = self._score(matrix, query)
+            scores[~live] = -np.inf
+            ordinals, similarities = self._top_k(scores, k)
+            distances = 1.0 - similarities
+
+        return self._fetch(ordinals, distances)
+
+    def _search_ann(
+        self,
+        ann: IVFPQIndex,
+        matrix: np.ndarray,
+        live: np.ndarray,
+        query: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """IVF-PQ over rows covered by the build, exact scan over rows appended since"""
+        ordinals, distances = ann.search(
+            query, k, live, nprobe=self.nprobe, matrix=matrix, rerank=self.rerank
+        )
+
+        if ann.rows < len(live):
+            tail = np.arange(ann.rows, len(live))
+            tail = tail[live[tail]]
+            tail_ordinals, tail_similarities = self._top_k(self._score(matrix, query, tail), k, tail)
+            ordinals = np.concatenate([ordinals, tail_ordinals])
+            distances = np.concatenate([distances, 1.0 - tail_similarities])
+            top = np.argsort(distances, kind="stable")[:k]
+            ordinals, distances = ordinals[top], distances[top]
+
+        return ordinals, distances
+
+    def build_ann(self, nlist: Optional[int] = None, m: int = 16, sample_size: int = 100_000):
+        """
+        Build (or rebuild) the IVF-PQ index over the current live rows
+
+        Rows appended while or after building are still found by an exact
+        scan of the tail until the next rebuild.
+        """
+        with self._lock:
+            self._refresh()
+            matrix, live = self._matrix, self._live
+
+        if matrix is None:
+            raise ValueError("Cannot build an ANN index over an empty flat index")
+
+        IVFPQIndex.train(matrix, live, nlist=nlist, m=m, sample_size=sample_size).save(self.ann_directory)
+
+        # Bump the generation so every worker loads the new build
+        with self._write_lock():
+            conn = self._connect()
+            try:
+                conn.execute("UPDATE state SET value = value + 1 WHERE key = 'generation'")
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _score(
+        self,
+        matrix: np.ndarray,
+        query: np.ndarray,
+        candidates: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Dot products in bounded blocks so float16 upcasts stay small"""
+        total = len(candidates) if candidates is not None else matrix.shape[0]
+        block = max(1024, self.BLOCK_BYTES // (self.dimensions * 4))
+        scores = np.empty(total, dtype=np.float32)
+
+        for start in range(0, total, block):
+            end = min(start + block, total)
+            rows = matrix[candidates[start:end]] if candidates is not None else matrix[start:end]
+            scores[start:end] = rows.astype(np.float32, copy=False) @ query
+
+        return scores
+
+    @staticmethod
+    def _top_k(
+        scores: np.ndarray,
+        k: int,
+        candidates: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k by partial sort, highest similarity first"""
+        valid = np.isfinite(scores)
+        k = min(k, int(valid.sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        ordinals = candidates[top] if candidates is not None else top
+        return ordinals, scores[top]
+
+    def _fetch(
+        self,
+        ordinals: np.ndarray,
+        distances: np.ndarray
+    ) -> List[Tuple[Document, float]]:
+        """Load documents for result ordinals from the sidecar"""
+        if len(ordinals) == 0:
+            return []
+
+        ordinal_list = [int(o) for o in ordinals]
+        placeholders = ",".join("?" * len(ordinal_list))
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f'SELECT ordinal, document, metadata FROM rows WHERE ordinal IN ({placeholders})',
+                ordinal_list
+            ).fetchall()
+        finally:
+            conn.close()
+
+        by_ordinal = {r[0]: r for r in rows}
+        results = []
+        for ordinal, distance in zip(ordinal_list, distances):
+            _, document, metadata = by_ordinal[ordinal]
+            doc = Document(page_content=document, metadata=json.loads(metadata))
+            results.append((doc, float(distance)))
+
+        return results
+
+    def count(self) -> int:
+        """Number of live rows"""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM rows WHERE deleted = 0').fetchone()[0]
+        finally:
+            conn.close()
+
+    def reset(self):
+        """Remove every row (use with caution!)"""
+        with self._write_lock():
+            conn = self._connect()
+            try:
+                conn.execute('DELETE FROM rows')
+                self.metadata_index.reset(conn)
+                conn.execute("UPDATE state SET value = 0 WHERE key = 'rows'")
+                conn.execute("UPDATE state SET value = value + 1 WHERE key = 'generation'")
+                conn.commit()
+            finally:
+                conn.close()
+
+            # Unlink rather than truncate: readers still mapping the old
+            # file keep a valid view until they refresh
+            if self.vectors_path.exists():
+                os.unlink(self.vectors_path)
+            shutil.rmtree(self.ann_directory, ignore_errors=True)
+
+    def drop(self):
+        """Delete the whole index directory"""
+        with self._lock:
+            self._matrix = None
+            self._ann = None
+            shutil.rmtree(self.directory, ignore_errors=True)
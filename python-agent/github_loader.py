@@ -4,13 +4,29 @@ Clones and processes code repositories for RAG indexing
 """
 
 import os
+import re
+import queue
+import asyncio
 import tempfile
 import shutil
-from typing import List, Dict, Optional
+import hashlib
+from typing import List, Dict, Optional, Iterator, Iterable, Set, Tuple
 from pathlib import Path
 import subprocess
 from langchain_core.documents import Document
 
+from repo_walker import RepoWalker
+
+# Paths in the first checkout batch; each later batch is twice as large, so
+# reading starts early and the index is rewritten only O(log n) times
+CHECKOUT_BATCH = 256
+
+# Files that decide what the walker keeps, checked out before anything else
+RULE_FILES = ('.gitignore', '.gitattributes')
+
+# Characters with a meaning in sparse-checkout patterns
+SPARSE_SPECIAL = re.compile(r'([*?\[\\])')
+
 class GitHubLoader:
     """Load and process code from GitHub repositories"""
     
@@ -25,12 +41,30 @@ class GitHubLoader:
         'dist', 'build', 'target', '.next', '.cache', 'coverage'
     }
     
-    def __init__(self, max_file_size: int = 500_000):  # 500KB max per file
+    # Lockfiles and build output that .gitignore usually does not cover
+    IGNORE_PATTERNS = (
+        'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'composer.lock',
+        'Pipfile.lock', 'poetry.lock', 'Cargo.lock', 'Gemfile.lock',
+        '*.min.js', '*.min.css', '*.bundle.js', '*_pb2.py', '*.pb.go', '*.generated.*'
+    )
+    
+    def __init__(self, max_file_size: int = 500_000, cache_dir: Optional[str] = None):  # 500KB max per file
         self.max_file_size = max_file_size
+        self.cache_dir = cache_dir or os.getenv("GIT_CACHE_DIR", "./git_cache")
+        self.walker = RepoWalker(
+            self.SUPPORTED_EXTENSIONS,
+            self.IGNORE_DIRS,
+            self.IGNORE_PATTERNS,
+            max_file_size=max_file_size
+        )
+        # Background checkouts of fresh clones, kept referenced until done
+        self._checkouts: Set[asyncio.Task] = set()
     
-    def load_from_url(self, repo_url: str, branch: str = "main") -> List[Document]:
+    async def load_from_url(self, repo_url: str, branch: str = "main") -> List[Document]:
         """
-        Clone repository and load documents
+        Clone (or update the cached clone of) a repository and load documents
+        
+        Files are read while the checkout is still writing the work tree.
         
         Args:
             repo_url: GitHub repo URL (https://github.com/user/repo)
@@ -39,80 +73,246 @@ class GitHubLoader:
         Returns:
             List of Document objects
         """
-        temp_dir = tempfile.mkdtemp()
+        clone_dir, _, checkout = await self.sync_clone(repo_url, branch)
+        files = checkout if checkout is not None else self.iter_files(clone_dir)
+        
+        # The checkout iterator blocks, so it is consumed off the event loop
+        documents = await asyncio.to_thread(lambda: [
+            self.make_document(file_path, clone_dir, repo_url, content.decode('utf-8', errors='ignore'), branch)
+            for file_path, _, content in self.read_files(files)
+        ])
+        print(f"Loaded {len(documents)} files from repository")
+        
+        return documents
+    
+    async def sync_clone(
+        self,
+        repo_url: str,
+        branch: str = "main"
+    ) -> Tuple[str, str, Optional[Iterator[Tuple[Path, os.stat_result]]]]:
+        """
+        Bring the cached clone of a repository branch up to date
+        
+        The first call makes a shallow partial clone under GIT_CACHE_DIR:
+        blobs larger than max_file_size are never downloaded, and a
+        sparse-checkout built from SUPPORTED_EXTENSIONS and IGNORE_DIRS keeps
+        everything else out of the work tree. The checkout then runs in the
+        background in growing batches, and the returned iterator yields the
+        indexable files of each batch as soon as it is written. Later calls
+        only fetch the new tip and reset the work tree to it, so the previous
+        commit stays available for diffing.
+        
+        Git runs as asyncio subprocesses; the event loop is never blocked.
+        
+        Args:
+            repo_url: Repository URL
+            branch: Branch name
+            
+        Returns:
+            (clone directory, HEAD commit, files) where files is a blocking
+            iterator of (path, stat) for a fresh clone, to be consumed off
+            the event loop, or None when an existing clone was updated
+        """
+        clone_dir = os.path.join(
+            self.cache_dir,
+            hashlib.sha1(f"{repo_url}@{branch}".encode("utf-8")).hexdigest()[:16]
+        )
         
+        if os.path.isdir(os.path.join(clone_dir, '.git')):
+            try:
+                print(f"Fetching {repo_url}...")
+                await self._git(clone_dir, 'fetch', '--depth', '1', '--no-tags', 'origin', branch)
+                commit = (await self._git(clone_dir, 'rev-parse', 'FETCH_HEAD')).strip()
+                await self._sparse_paths(clone_dir, commit)
+                await self._git(clone_dir, 'reset', '--hard', '--quiet', commit)
+                return clone_dir, commit, None
+            except subprocess.CalledProcessError as e:
+                # A broken cache entry is re-cloned rather than failing the sync
+                print(f"Cached clone of {repo_url} unusable, re-cloning: {e.stderr}")
+                shutil.rmtree(clone_dir, ignore_errors=True)
+        
+        # Clone (without a work tree) next to the cache entry and move it into place once complete
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".clone-")
         try:
-            # Clone repository
             print(f"Cloning {repo_url}...")
-            result = subprocess.run(
-                ['git', 'clone', '--depth', '1', '--branch', branch, repo_url, temp_dir],
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
-            
-            if result.returncode != 0:
-                raise Exception(f"Git clone failed: {result.stderr}")
-            
-            # Process files
-            documents = self._process_directory(temp_dir, repo_url)
-            print(f"Loaded {len(documents)} files from repository")
-            
-            return documents
+            try:
+                await self._git(
+                    None, 'clone', '--depth', '1', '--no-tags', '--no-checkout',
+                    f'--filter=blob:limit={self.max_file_size}', '--branch', branch, repo_url, temp_dir
+                )
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"Git clone failed: {e.stderr}")
             
+            shutil.rmtree(clone_dir, ignore_errors=True)
+            os.replace(temp_dir, clone_dir)
         finally:
-            # Cleanup
             if os.path.exists(temp_dir):
                 shutil.rmtree(temp_dir, ignore_errors=True)
+        
+        commit = (await self._git(clone_dir, 'rev-parse', 'HEAD')).strip()
+        paths = await self._sparse_paths(clone_dir, commit)
+        
+        batches: queue.Queue = queue.Queue()
+        task = asyncio.create_task(self._checkout(clone_dir, paths, batches))
+        self._checkouts.add(task)
+        task.add_done_callback(self._checkouts.discard)
+        
+        return clone_dir, commit, self.walker.filter_paths(clone_dir, _drain(batches))
     
-    def _process_directory(self, directory: str, repo_url: str) -> List[Document]:
-        """Process all files in directory recursively"""
-        documents = []
+    async def _sparse_paths(self, clone_dir: str, commit: str) -> List[str]:
+        """
+        Write the sparse-checkout patterns for a commit and list the paths they select
+        
+        Blobs the partial clone left out (over max_file_size) are excluded
+        by name, so neither a checkout nor a reset fetches them.
+        """
+        listing = await self._git(clone_dir, 'ls-tree', '-r', '-z', commit)
+        objects = await self._git(clone_dir, 'rev-list', '--objects', '--missing=print', commit)
+        missing = {line[1:] for line in objects.splitlines() if line.startswith('?')}
         
-        for root, dirs, files in os.walk(directory):
-            # Filter out ignored directories
-            dirs[:] = [d for d in dirs if d not in self.IGNORE_DIRS]
+        paths, oversized = [], []
+        for entry in listing.split('\0'):
+            if not entry:
+                continue
+            info, path = entry.split('\t', 1)
+            _, kind, oid = info.split()
+            if kind != 'blob' or not self._sparse_wanted(path):
+                continue
+            (oversized if oid in missing else paths).append(path)
+        
+        patterns = list(RULE_FILES)
+        patterns += [f'*{ext}' for ext in sorted(self.SUPPORTED_EXTENSIONS)]
+        patterns += [f'!**/{name}/**' for name in sorted(self.IGNORE_DIRS)]
+        patterns += ['!/' + SPARSE_SPECIAL.sub(r'\\\1', path) for path in oversized]
+        
+        await self._git(clone_dir, 'config', 'core.sparseCheckout', 'true')
+        sparse_file = Path(clone_dir) / '.git' / 'info' / 'sparse-checkout'
+        sparse_file.parent.mkdir(parents=True, exist_ok=True)
+        sparse_file.write_text('\n'.join(patterns) + '\n', encoding='utf-8')
+        
+        return paths
+    
+    def _sparse_wanted(self, path: str) -> bool:
+        """Whether a tree path matches the sparse-checkout patterns"""
+        parts = path.split('/')
+        if any(part in self.IGNORE_DIRS for part in parts[:-1]):
+            return False
+        return parts[-1] in RULE_FILES or os.path.splitext(parts[-1])[1] in self.SUPPORTED_EXTENSIONS
+    
+    async def _checkout(self, clone_dir: str, paths: List[str], batches: queue.Queue):
+        """Check out paths in growing batches, handing each finished batch to the reader"""
+        try:
+            rules = [path for path in paths if path.rsplit('/', 1)[-1] in RULE_FILES]
+            others = [path for path in paths if path.rsplit('/', 1)[-1] not in RULE_FILES]
+            if rules:
+                # The walker reads these to filter every later batch
+                await self._checkout_paths(clone_dir, rules)
             
-            for file in files:
-                file_path = Path(root) / file
-                
-                # Check extension
-                if file_path.suffix not in self.SUPPORTED_EXTENSIONS:
-                    continue
-                
-                # Check file size
-                try:
-                    if file_path.stat().st_size > self.max_file_size:
-                        continue
-                except:
-                    continue
-                
-                # Read file
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    # Create relative path
-                    rel_path = file_path.relative_to(directory)
-                    
-                    # Create document
-                    doc = Document(
-                        page_content=content,
-                        metadata={
-                            'source': str(rel_path),
-                            'file_type': file_path.suffix,
-                            'repo_url': repo_url,
-                            'file_name': file_path.name,
-                            'file_path': str(rel_path)
-                        }
-                    )
-                    documents.append(doc)
-                    
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-                    continue
+            start, size = 0, CHECKOUT_BATCH
+            while start < len(others):
+                batch = others[start:start + size]
+                await self._checkout_paths(clone_dir, batch)
+                batches.put(batch)
+                start, size = start + len(batch), size * 2
+            batches.put(None)
+        except BaseException as e:
+            batches.put(e)
+            raise
+    
+    async def _checkout_paths(self, clone_dir: str, paths: List[str]):
+        await self._git(
+            clone_dir, 'checkout', '--quiet', 'HEAD', '--pathspec-from-file=-', '--pathspec-file-nul',
+            input='\0'.join(paths)
+        )
+    
+    async def changed_paths(self, clone_dir: str, old_commit: str, new_commit: str) -> Optional[Dict[str, str]]:
+        """
+        Paths changed between two commits of a cached clone
         
-        return documents
+        Returns:
+            Map of path -> git status letter (A, M, D, T), or None when the
+            old commit is no longer in the clone
+        """
+        try:
+            await self._git(clone_dir, 'cat-file', '-e', f'{old_commit}^{{commit}}')
+        except subprocess.CalledProcessError:
+            return None
+        
+        output = await self._git(clone_dir, 'diff', '--name-status', '--no-renames', '-z', old_commit, new_commit)
+        fields = output.split('\0')
+        return {path: status[0] for status, path in zip(fields[0::2], fields[1::2]) if path}
+    
+    async def _git(self, clone_dir: Optional[str], *args: str, input: Optional[str] = None) -> str:
+        """Run git as an asyncio subprocess, raising CalledProcessError or TimeoutExpired"""
+        command = ['git', *(['-C', clone_dir] if clone_dir else []), *args]
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Paths handed to checkout are literal names, not globs
+            env={**os.environ, 'GIT_LITERAL_PATHSPECS': '1', 'GIT_TERMINAL_PROMPT': '0'}
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(input.encode('utf-8', errors='surrogateescape') if input is not None else None),
+                timeout=300
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(command, 300)
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, command, stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace')
+            )
+        return stdout.decode('utf-8', errors='surrogateescape')
+    
+    def _process_directory(self, directory: str, repo_url: str) -> List[Document]:
+        """Process all files in directory recursively"""
+        return [
+            self.make_document(file_path, directory, repo_url, content.decode('utf-8', errors='ignore'))
+            for file_path, _, content in self.read_files(self.iter_files(directory))
+        ]
+    
+    def iter_files(self, directory: str) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Yield (path, stat) for indexable files under directory, without reading them"""
+        return self.walker.iter_files(directory)
+    
+    def iter_paths(self, directory: str, paths: Iterable[str]) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Yield (path, stat) for the given relative paths that exist and would be indexed"""
+        return self.walker.filter_paths(directory, paths)
+    
+    def read_files(self, files: Iterable[Tuple[Path, os.stat_result]]) -> Iterator[Tuple[Path, os.stat_result, bytes]]:
+        """Read files concurrently, yielding (path, stat, content) as they arrive; binaries are skipped"""
+        return self.walker.read_files(files)
+    
+    def make_document(
+        self,
+        file_path: Path,
+        directory: str,
+        repo_url: str,
+        content: str,
+        branch: Optional[str] = None
+    ) -> Document:
+        """Create the Document for one file (branch is recorded for repository clones)"""
+        rel_path = file_path.relative_to(directory)
+        metadata = {
+            'source': str(rel_path),
+            'file_type': file_path.suffix,
+            'repo_url': repo_url,
+            'file_name': file_path.name,
+            'file_path': str(rel_path)
+        }
+        if branch:
+            metadata['branch'] = branch
+        return Document(page_content=content, metadata=metadata)
     
     def load_from_local(self, local_path: str) -> List[Document]:
         """
@@ -148,3 +348,22 @@ class GitHubLoader:
             'total_size_bytes': total_size,
             'total_size_mb': round(total_size / 1024 / 1024, 2)
         }
+
+
+def _drain(batches: queue.Queue) -> Iterator[str]:
+    """Yield the paths put on the queue by a background checkout (blocking)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        # Waiting here would stop the loop that runs the checkout
+        raise RuntimeError("Checkout files must be consumed off the event loop (e.g. in asyncio.to_thread)")
+    
+    while True:
+        batch = batches.get()
+        if batch is None:
+            return
+        if isinstance(batch, BaseException):
+            raise batch
+        yield from batch
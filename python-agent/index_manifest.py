@@ -0,0 +1,342 @@
+"""
+Index Manifest for CodeMind
+Tracks indexed files per root so directory and repository re-syncs only re-embed what changed
+"""
+
+import os
+import asyncio
+import json
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Callable, Set, Tuple
+from pathlib import Path
+from langchain_core.documents import Document
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IndexManifest:
+    """
+    Per-root manifest of (path, size, mtime, content hash) -> chunk IDs
+
+    A re-sync stats the tree and compares it against the manifest: files with
+    the same size and mtime are skipped without being read, files whose
+    content hash still matches only get their mtime refreshed, and only added
+    or changed files are re-chunked and embedded. Chunks of changed and
+    removed files are deleted from the vector store by ID. For repositories
+    the last indexed commit is kept too, so a re-sync only looks at the paths
+    git reports as changed since then.
+    """
+
+    def __init__(self, db_path: str = "./index_manifest.db"):
+        """
+        Args:
+            db_path: Path to the SQLite manifest database
+        """
+        self.db_path = db_path
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite database with schema"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    chunk_ids TEXT NOT NULL,
+                    indexed_at TEXT NOT NULL,
+                    PRIMARY KEY (root, path)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS commits (
+                    root TEXT PRIMARY KEY,
+                    commit_sha TEXT NOT NULL,
+                    synced_at TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def entries(self, root: str) -> Dict[str, Tuple[int, int, str]]:
+        """Map of relative path -> (size, mtime_ns, hash) for one root"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT path, size, mtime_ns, hash FROM files WHERE root = ?', (root,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in rows}
+
+    def chunk_ids(self, root: str, paths: List[str]) -> List[str]:
+        """Chunk IDs recorded for the given paths"""
+        ids = []
+        conn = self._connect()
+        try:
+            for i in range(0, len(paths), 500):
+                batch = paths[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for (chunk_ids,) in conn.execute(
+                    f'SELECT chunk_ids FROM files WHERE root = ? AND path IN ({placeholders})',
+                    (root, *batch)
+                ):
+                    ids.extend(json.loads(chunk_ids))
+        finally:
+            conn.close()
+        return ids
+
+    def record(self, root: str, files: List[Tuple[str, int, int, str, List[str]]]):
+        """Insert or replace (path, size, mtime_ns, hash, chunk_ids) rows"""
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        try:
+            conn.executemany(
+                '''
+                INSERT OR REPLACE INTO files (root, path, size, mtime_ns, hash, chunk_ids, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''',
+                [
+                    (root, path, size, mtime_ns, digest, json.dumps(ids), now)
+                    for path, size, mtime_ns, digest, ids in files
+                ]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def touch(self, root: str, files: List[Tuple[str, int, int]]):
+        """Update size and mtime of (path, size, mtime_ns) rows whose content is unchanged"""
+        conn = self._connect()
+        try:
+            conn.executemany(
+                'UPDATE files SET size = ?, mtime_ns = ? WHERE root = ? AND path = ?',
+                [(size, mtime_ns, root, path) for path, size, mtime_ns in files]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def remove(self, root: str, paths: List[str]):
+        """Forget the given paths"""
+        conn = self._connect()
+        try:
+            conn.executemany(
+                'DELETE FROM files WHERE root = ? AND path = ?',
+                [(root, path) for path in paths]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def last_commit(self, root: str) -> Optional[str]:
+        """Commit a repository root was last synced at"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT commit_sha FROM commits WHERE root = ?', (root,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def set_last_commit(self, root: str, commit: str):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO commits (root, commit_sha, synced_at) VALUES (?, ?, ?)',
+                (root, commit, datetime.now().isoformat())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def sync(
+        self,
+        directory: str,
+        loader,
+        ingester,
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Bring the index in line with a local directory
+
+        Args:
+            directory: Local directory to index
+            loader: GitHubLoader deciding which files are indexed
+            ingester: DocumentIngester used for chunking and embedding
+            on_progress: Called with the number of chunks stored so far
+
+        Returns:
+            Dict with added, changed, removed and unchanged file counts,
+            chunks_created, chunks_deleted and duplicates_skipped
+        """
+        root = os.path.abspath(directory)
+        return await self._sync(
+            root, root, loader.iter_files(root), loader, ingester, f"local://{directory}", on_progress
+        )
+
+    async def sync_repo(
+        self,
+        repo_url: str,
+        branch: str,
+        loader,
+        ingester,
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Bring the index in line with the tip of a repository branch
+
+        The loader's cached clone is fetched, and if the last synced commit is
+        still known only the paths `git diff --name-status` reports between
+        the two commits are examined; otherwise the whole tree is compared
+        against the manifest (for a fresh clone, as the checkout writes it).
+
+        Args:
+            repo_url: Repository URL
+            branch: Branch name
+            loader: GitHubLoader owning the clone cache
+            ingester: DocumentIngester used for chunking and embedding
+            on_progress: Called with the number of chunks stored so far
+
+        Returns:
+            Same counts as sync, plus commit and previous_commit
+        """
+        root = f"{repo_url}@{branch}"
+        clone_dir, commit, checkout = await loader.sync_clone(repo_url, branch)
+        previous = self.last_commit(root)
+
+        changes = None
+        if previous == commit:
+            changes = {}
+        elif previous and checkout is None:
+            changes = await loader.changed_paths(clone_dir, previous, commit)
+
+        if changes is None:
+            # A fresh clone is compared file by file while it is checked out
+            files = checkout if checkout is not None else loader.iter_files(clone_dir)
+            scope = None
+        else:
+            files, scope = loader.iter_paths(clone_dir, sorted(changes)), set(changes)
+
+        result = await self._sync(root, clone_dir, files, loader, ingester, repo_url, on_progress, scope, branch)
+        self.set_last_commit(root, commit)
+        return {**result, "commit": commit, "previous_commit": previous}
+
+    async def _sync(
+        self,
+        root: str,
+        directory: str,
+        files: Iterable[Tuple[Path, os.stat_result]],
+        loader,
+        ingester,
+        source_url: str,
+        on_progress: Optional[Callable[[int], None]] = None,
+        scope: Optional[Set[str]] = None,
+        branch: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Re-embed added or changed files and delete the chunks of removed ones
+
+        Args:
+            root: Manifest key
+            directory: Directory the relative paths are resolved against
+            files: (path, stat) of the indexable files to examine
+            source_url: repo_url metadata of the documents
+            scope: Relative paths files covers (None: the whole tree), so
+                manifest entries outside it are not treated as removed
+            branch: branch metadata of the documents; it is part of the
+                chunk IDs, so branches synced separately never share chunks
+        """
+        try:
+            known = self.entries(root)
+            seen = set()
+            counts = {"added": 0, "changed": 0, "unchanged": 0}
+            pending: Dict[str, Tuple[int, int, str]] = {}
+            touched: List[Tuple[str, int, int]] = []
+
+            def stat_changed() -> Iterator[Tuple[Path, os.stat_result]]:
+                for file_path, file_stat in files:
+                    path = str(file_path.relative_to(directory))
+                    entry = known.get(path)
+                    if entry and entry[:2] == (file_stat.st_size, file_stat.st_mtime_ns):
+                        seen.add(path)
+                        counts["unchanged"] += 1
+                        continue
+                    yield file_path, file_stat
+
+            def changed_documents() -> Iterator[Document]:
+                # Binary or unreadable files are never yielded, so they count as removed
+                for file_path, file_stat, data in loader.read_files(stat_changed()):
+                    path = str(file_path.relative_to(directory))
+                    seen.add(path)
+                    entry = known.get(path)
+
+                    digest = hashlib.sha256(data).hexdigest()
+                    if entry and entry[2] == digest:
+                        # Touched but not modified: keep the existing chunks
+                        counts["unchanged"] += 1
+                        touched.append((path, file_stat.st_size, file_stat.st_mtime_ns))
+                        continue
+
+                    counts["changed" if entry else "added"] += 1
+                    pending[path] = (file_stat.st_size, file_stat.st_mtime_ns, digest)
+                    content = data.decode('utf-8', errors='ignore')
+                    yield loader.make_document(file_path, directory, source_url, content, branch)
+
+            result = await ingester.ingest_documents(changed_documents(), on_progress=on_progress)
+
+            # New chunks are in place; now retire the ones they replace.
+            # Chunks an edit did not touch kept their IDs and stay.
+            removed = [path for path in known if path not in seen and (scope is None or path in scope)]
+            stale = [path for path in pending if path in known]
+            current = {doc_id for ids in result["source_ids"].values() for doc_id in ids}
+            stale_ids = [doc_id for doc_id in self.chunk_ids(root, stale + removed) if doc_id not in current]
+            if stale_ids:
+                # Deleting can promote linked duplicates, which embeds them
+                await asyncio.to_thread(ingester.vector_store.delete, stale_ids)
+
+            self.record(root, [
+                (path, size, mtime_ns, digest, result["source_ids"].get(path, []))
+                for path, (size, mtime_ns, digest) in pending.items()
+            ])
+            self.touch(root, touched)
+            self.remove(root, removed)
+
+            logger.info(
+                f"Synced {root}: {counts['added']} added, {counts['changed']} changed, "
+                f"{len(removed)} removed, {counts['unchanged']} unchanged"
+            )
+            return {
+                **counts,
+                "removed": len(removed),
+                "chunks_created": result["chunk_count"] - result.get("already_stored", 0),
+                "chunks_deleted": len(stale_ids),
+                "duplicates_skipped": result.get("duplicates_skipped", 0)
+            }
+        except Exception as e:
+            logger.error(f"Error syncing {root}: {e}")
+            raise
+
+
+# Singleton instance
+_index_manifest_instance: Optional[IndexManifest] = None
+
+
+def get_index_manifest() -> IndexManifest:
+    """Get or create index manifest singleton"""
+    global _index_manifest_instance
+    if _index_manifest_instance is None:
+        _index_manifest_instance = IndexManifest(os.getenv("MANIFEST_DB_PATH", "./index_manifest.db"))
+    return _index_manifest_instance
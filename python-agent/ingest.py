@@ -1,49 +1,46 @@
-import os
-import tempfile
+import re
+import asyncio
+from collections import deque
 from pathlib import Path
-from typing import List, BinaryIO, Dict, Any, Optional
+from typing import List, BinaryIO, Dict, Any, Optional, Iterable, Iterator, AsyncIterator, Tuple, Callable
 import logging
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+import hashlib
 import uuid
 
-# PDF parsing
-try:
-    from pypdf import PdfReader
-    HAS_PDF = True
-except ImportError:
-    HAS_PDF = False
-
-# DOCX parsing
-try:
-    from docx import Document as DocxDocument
-    HAS_DOCX = True
-except ImportError:
-    HAS_DOCX = False
-
 from vector_store import get_vector_store
+from embedding_pipeline import EmbeddingPipeline
+from parse_pool import get_parse_pool
+from codemind_text import CodeChunker, StreamingTextSplitter
+from web_crawler import WebCrawler
 from models import DocumentMetadata, IngestResponse
 
 logger = logging.getLogger(__name__)
 
+PAGE_MARKER = re.compile(r"\[Page (\d+)\]")
+
 
 class DocumentIngester:
     """Handles document ingestion, parsing, chunking, and storage"""
     
     def __init__(self):
         self.vector_store = get_vector_store()
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.embedding_pipeline = EmbeddingPipeline(self.vector_store)
+        self.parse_pool = get_parse_pool()
+        self.text_splitter = StreamingTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
-            length_function=len,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
+        # Repository files are split on definition boundaries instead
+        self.code_chunker = CodeChunker()
     
     async def ingest_file(
         self,
         file: BinaryIO,
         filename: str,
-        metadata: Optional[DocumentMetadata] = None
+        metadata: Optional[DocumentMetadata] = None,
+        on_progress: Optional[Callable[[int], None]] = None
     ) -> IngestResponse:
         """
         Ingest a file into the vector store
@@ -52,22 +49,34 @@ class DocumentIngester:
             file: File-like object
             filename: Original filename
             metadata: Optional metadata
+            on_progress: Called with the number of chunks stored so far
             
         Returns:
             IngestResponse with status and IDs
         """
         try:
-            # Extract text based on file type
-            text = self._extract_text(file, filename)
+            # Pages are parsed, chunked, embedded and stored as a stream, so
+            # early chunks are searchable while later pages are still parsing
+            progress = {"text_length": 0, "has_text": False}
+            documents = self._stream_chunks(file, filename, metadata, progress)
+            result = await self.embedding_pipeline.run(documents, on_progress=on_progress)
+            ids = result["ids"]
             
-            if not text.strip():
+            if not progress["has_text"]:
                 raise ValueError("No text extracted from document")
             
-            # Create document chunks
-            documents = self._create_chunks(text, filename, metadata)
-            
-            # Add to vector store
-            ids = self.vector_store.add_documents(documents)
+            # A re-upload under the same document_key replaces the document:
+            # chunks an edit removed are deleted
+            stale_ids = []
+            if metadata and metadata.document_key:
+                doc_id = self._base_metadata(filename, metadata)["doc_id"]
+                current = set(result["chunk_ids"])
+                stale_ids = [
+                    chunk for chunk in await asyncio.to_thread(self.vector_store.ids_for_document, doc_id)
+                    if chunk not in current
+                ]
+                if stale_ids:
+                    await asyncio.to_thread(self.vector_store.delete, stale_ids)
             
             return IngestResponse(
                 status="ok",
@@ -76,7 +85,11 @@ class DocumentIngester:
                 metadata={
                     "total_chunks": len(ids),
                     "source": filename,
-                    "text_length": len(text)
+                    "text_length": progress["text_length"],
+                    "already_stored": result["already_stored"],
+                    "chunks_deleted": len(stale_ids),
+                    "duplicates_skipped": result["duplicates_skipped"],
+                    "chunks_per_second": result["chunks_per_second"]
                 }
             )
             
@@ -84,14 +97,65 @@ class DocumentIngester:
             logger.error(f"Error ingesting file {filename}: {e}")
             raise
     
+    def _iter_segments(self, file: BinaryIO, filename: str) -> Iterator[str]:
+        """Yield text one PDF page at a time, or the whole text for other formats"""
+        if Path(filename).suffix.lower() == ".pdf":
+            for page_num, text in self.parse_pool.iter_pdf_pages(file, filename):
+                yield f"[Page {page_num}]\n{text}\n"
+        else:
+            yield self._extract_text(file, filename)
+    
+    def _iter_chunks(self, segments: Iterator[str], progress: Dict[str, Any]) -> Iterator[str]:
+        """
+        Split a stream of text segments into chunks
+        
+        Segments are fed to the streaming splitter as if joined with newlines
+        (as _extract_pdf joins pages), so chunks span page boundaries exactly
+        as if the text had been joined first, while only the text of the
+        chunks still open is held in memory.
+        """
+        def pieces():
+            for i, segment in enumerate(segments):
+                progress["text_length"] += len(segment)
+                progress["has_text"] = progress["has_text"] or bool(segment.strip())
+                if i:
+                    yield "\n"
+                yield segment
+        
+        for chunk, _, _ in self.text_splitter.split_stream(pieces()):
+            yield chunk
+    
+    async def _stream_chunks(
+        self,
+        file: BinaryIO,
+        filename: str,
+        metadata: Optional[DocumentMetadata],
+        progress: Dict[str, Any]
+    ) -> AsyncIterator[Document]:
+        """Chunk Documents produced off the event loop, one at a time on demand"""
+        chunks = self._iter_chunks(self._iter_segments(file, filename), progress)
+        base_metadata = self._base_metadata(filename, metadata)
+        done = object()
+        page = None
+        chunk_index = 0
+        
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, done)
+            if chunk is done:
+                return
+            
+            doc, page = self._chunk_document(chunk, chunk_index, base_metadata, page)
+            chunk_index += 1
+            yield doc
+    
     def _extract_text(self, file: BinaryIO, filename: str) -> str:
         """Extract text from various file formats"""
         ext = Path(filename).suffix.lower()
         
         if ext == ".pdf":
-            return self._extract_pdf(file)
+            return self._extract_pdf(file, filename)
         elif ext in [".docx", ".doc"]:
-            return self._extract_docx(file)
+            return self._extract_docx(file, filename)
         elif ext == ".txt":
             return self._extract_text_file(file)
         else:
@@ -101,43 +165,17 @@ class DocumentIngester:
             except:
                 raise ValueError(f"Unsupported file type: {ext}")
     
-    def _extract_pdf(self, file: BinaryIO) -> str:
+    def _extract_pdf(self, file: BinaryIO, filename: str = "document.pdf") -> str:
         """Extract text from PDF"""
-        if not HAS_PDF:
-            raise ImportError("pypdf not installed. Install with: pip install pypdf")
-        
-        try:
-            pdf_reader = PdfReader(file)
-            text_parts = []
-            
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                text = page.extract_text()
-                if text.strip():
-                    text_parts.append(f"[Page {page_num}]\n{text}\n")
-            
-            return "\n".join(text_parts)
-        except Exception as e:
-            logger.error(f"Error extracting PDF: {e}")
-            raise
+        return "\n".join(
+            f"[Page {page_num}]\n{text}\n"
+            for page_num, text in self.parse_pool.iter_pdf_pages(file, filename)
+        )
     
-    def _extract_docx(self, file: BinaryIO) -> str:
+    def _extract_docx(self, file: BinaryIO, filename: str = "document.docx") -> str:
         """Extract text from DOCX"""
-        if not HAS_DOCX:
-            raise ImportError("python-docx not installed. Install with: pip install python-docx")
-        
         try:
-            # Save to temp file (python-docx needs file path)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-                tmp.write(file.read())
-                tmp_path = tmp.name
-            
-            try:
-                doc = DocxDocument(tmp_path)
-                text_parts = [paragraph.text for paragraph in doc.paragraphs]
-                return "\n".join(text_parts)
-            finally:
-                os.unlink(tmp_path)
-                
+            return self.parse_pool.extract_docx(file, filename)
         except Exception as e:
             logger.error(f"Error extracting DOCX: {e}")
             raise
@@ -163,11 +201,33 @@ class DocumentIngester:
     ) -> List[Document]:
         """Split text into chunks and create Document objects"""
         chunks = self.text_splitter.split_text(text)
+        base_metadata = self._base_metadata(filename, metadata)
         
         documents = []
+        page = None
+        for i, chunk in enumerate(chunks):
+            doc, page = self._chunk_document(chunk, i, base_metadata, page)
+            doc.metadata["total_chunks"] = len(chunks)
+            documents.append(doc)
+        
+        return documents
+    
+    def _base_metadata(
+        self,
+        filename: str,
+        metadata: Optional[DocumentMetadata],
+        document_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Metadata shared by every chunk of one upload"""
+        # Only a document key (the caller's, or a page URL) makes a re-upload the same document
+        document_key = document_key or (metadata.document_key if metadata else None)
+        if document_key:
+            doc_id = hashlib.sha256(document_key.encode("utf-8")).hexdigest()[:32]
+        else:
+            doc_id = uuid.uuid4().hex
         base_metadata = {
             "source": filename,
-            "doc_id": str(uuid.uuid4()),
+            "doc_id": doc_id,
         }
         
         if metadata:
@@ -183,33 +243,244 @@ class DocumentIngester:
             if metadata.tags:
                 base_metadata["tags"] = ",".join(metadata.tags)
         
-        for i, chunk in enumerate(chunks):
-            chunk_metadata = base_metadata.copy()
-            chunk_metadata["chunk_id"] = i
-            chunk_metadata["total_chunks"] = len(chunks)
-            
-            # Try to extract page number from chunk if present
-            if "[Page " in chunk:
-                try:
-                    page_str = chunk.split("[Page ")[1].split("]")[0]
-                    chunk_metadata["page"] = int(page_str)
-                except:
-                    pass
-            
-            documents.append(Document(
-                page_content=chunk,
-                metadata=chunk_metadata
-            ))
+        return base_metadata
+    
+    def _chunk_document(
+        self,
+        chunk: str,
+        chunk_index: int,
+        base_metadata: Dict[str, Any],
+        page: Optional[int]
+    ) -> Tuple[Document, Optional[int]]:
+        """
+        Build the Document for one chunk
         
-        return documents
+        Args:
+            chunk: Chunk text
+            chunk_index: Position of the chunk in the file
+            base_metadata: Metadata shared by the file's chunks
+            page: Page the previous chunk ended on
+            
+        Returns:
+            (document, page this chunk ends on)
+        """
+        chunk_metadata = base_metadata.copy()
+        chunk_metadata["chunk_id"] = chunk_index
+        
+        # Chunks starting mid-page belong to the page the previous chunk ended on
+        markers = [int(m) for m in PAGE_MARKER.findall(chunk)]
+        if markers:
+            chunk_metadata["page"] = markers[0]
+            page = markers[-1]
+        elif page is not None:
+            chunk_metadata["page"] = page
+        
+        return Document(page_content=chunk, metadata=chunk_metadata), page
     
-    async def ingest_url(self, url: str, metadata: Optional[DocumentMetadata] = None) -> IngestResponse:
+    async def ingest_documents(
+        self,
+        documents: Iterable[Document],
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
         """
-        Ingest content from URL (future enhancement)
+        Chunk, embed and store already-loaded documents (e.g. repository files)
+        
+        Documents are consumed lazily and split in parallel on the parse
+        pool by the code chunker, which records start_line/end_line; chunks
+        flow straight into the batched embedding pipeline and are upserted
+        batch by batch, so only a bounded window of files and chunks is held
+        in memory at any time.
         
-        TODO: Implement web scraping with beautiful soup or similar
+        Args:
+            documents: Iterable of LangChain Documents, one per file
+            on_progress: Called with the number of chunks stored so far
+            
+        Returns:
+            Dict with ids, chunk_count, already_stored, duplicates_skipped,
+            source_ids (source -> IDs of its chunks, stored or linked),
+            files and chunks_per_second
+        """
+        try:
+            sources: List[str] = []
+            files = {"count": 0}
+            chunks = self._stream_document_chunks(documents, sources, files)
+            result = await self.embedding_pipeline.run(chunks, on_progress=on_progress)
+            
+            # Near-duplicates are recorded under their own IDs, so deleting the
+            # source later also forgets their links
+            source_ids: Dict[str, List[str]] = {}
+            for source, doc_id in zip(sources, result["chunk_ids"]):
+                source_ids.setdefault(source, []).append(doc_id)
+            source_ids = {source: list(dict.fromkeys(ids)) for source, ids in source_ids.items()}
+            
+            logger.info(
+                f"Ingested {files['count']} documents as {result['chunk_count']} chunks "
+                f"({result['duplicates_skipped']} near-duplicates skipped)"
+            )
+            return {
+                "ids": result["ids"],
+                "chunk_count": result["chunk_count"],
+                "already_stored": result["already_stored"],
+                "duplicates_skipped": result["duplicates_skipped"],
+                "source_ids": source_ids,
+                "files": files["count"],
+                "chunks_per_second": result["chunks_per_second"]
+            }
+        except Exception as e:
+            logger.error(f"Error ingesting documents: {e}")
+            raise
+    
+    async def _stream_document_chunks(
+        self,
+        documents: Iterable[Document],
+        sources: List[str],
+        files: Dict[str, int]
+    ) -> AsyncIterator[Document]:
+        """Yield chunk Documents for each input document, split off the event loop"""
+        in_flight = deque()
+        
+        def texts():
+            for doc in documents:
+                metadata = doc.metadata or {}
+                in_flight.append(metadata)
+                yield doc.page_content, metadata.get("file_type", "")
+        
+        chunk_lists = self.parse_pool.iter_split(self.code_chunker, texts())
+        done = object()
+        
+        while True:
+            chunks = await asyncio.to_thread(next, chunk_lists, done)
+            if chunks is done:
+                return
+            
+            metadata = in_flight.popleft()
+            files["count"] += 1
+            for i, (chunk, start_line, end_line) in enumerate(chunks):
+                chunk_metadata = dict(metadata)
+                chunk_metadata["chunk_id"] = i
+                chunk_metadata["total_chunks"] = len(chunks)
+                chunk_metadata["start_line"] = start_line
+                chunk_metadata["end_line"] = end_line
+                sources.append(str(metadata.get("source", "")))
+                yield Document(page_content=chunk, metadata=chunk_metadata)
+    
+    async def ingest_url(
+        self,
+        url: str,
+        metadata: Optional[DocumentMetadata] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        max_pages: Optional[int] = None,
+        max_depth: Optional[int] = None
+    ) -> IngestResponse:
+        """
+        Crawl a wiki or documentation site and ingest its pages
+        
+        Pages under the URL's directory are fetched concurrently by the web
+        crawler and chunked as they arrive, so embedding starts while the
+        crawl is still running. Pages already indexed are revalidated with
+        conditional GET; unchanged pages are not re-chunked, and chunks a
+        changed page no longer has are deleted.
+        
+        Args:
+            url: Start page
+            metadata: Optional metadata applied to every page
+            on_progress: Called with the number of chunks stored so far
+            max_pages: Most pages fetched (CRAWL_MAX_PAGES)
+            max_depth: Most links followed from the start page (CRAWL_MAX_DEPTH)
+            
+        Returns:
+            IngestResponse with the IDs of the chunks of new and changed pages
         """
-        raise NotImplementedError("URL ingestion not yet implemented")
+        try:
+            crawler = WebCrawler(max_pages=max_pages, max_depth=max_depth)
+            pages: List[Dict[str, Any]] = []
+            sources: List[str] = []
+            counts = {"new": 0, "changed": 0, "unchanged": 0, "not_modified": 0, "failed": 0}
+            documents = self._stream_page_chunks(crawler, url, metadata, pages, sources, counts)
+            result = await self.embedding_pipeline.run(documents, on_progress=on_progress)
+            
+            if not any(counts.values()) or counts["failed"] == sum(counts.values()):
+                raise ValueError(f"No pages could be fetched from {url}")
+            
+            # Near-duplicates are recorded under their own IDs, like stored chunks
+            page_ids: Dict[str, List[str]] = {}
+            for source, doc_id in zip(sources, result["chunk_ids"]):
+                page_ids.setdefault(source, []).append(doc_id)
+            page_ids = {source: list(dict.fromkeys(ids)) for source, ids in page_ids.items()}
+            
+            stale_ids = []
+            for page in pages:
+                current = page_ids.get(page["url"], [])
+                if page["status"] in ("new", "changed"):
+                    stale_ids.extend(doc_id for doc_id in page["chunk_ids"] if doc_id not in current)
+                    page["chunk_ids"] = current
+            if stale_ids:
+                await asyncio.to_thread(self.vector_store.delete, stale_ids)
+            
+            # Validators are only recorded once the chunks are stored, so a
+            # failed ingest is retried with full fetches
+            await asyncio.to_thread(crawler.cache.record, pages)
+            
+            ids = result["ids"]
+            logger.info(
+                f"Crawled {sum(counts.values())} pages from {url}: {counts['new']} new, "
+                f"{counts['changed']} changed, {counts['unchanged'] + counts['not_modified']} unchanged"
+            )
+            return IngestResponse(
+                status="ok",
+                ingested=len(ids),
+                ids=ids,
+                metadata={
+                    "total_chunks": len(ids),
+                    "source": url,
+                    "pages": counts,
+                    "chunks_deleted": len(stale_ids),
+                    "already_stored": result["already_stored"],
+                    "duplicates_skipped": result["duplicates_skipped"],
+                    "chunks_per_second": result["chunks_per_second"]
+                }
+            )
+            
+        except Exception as e:
+            logger.error(f"Error ingesting URL {url}: {e}")
+            raise
+    
+    async def _stream_page_chunks(
+        self,
+        crawler: WebCrawler,
+        url: str,
+        metadata: Optional[DocumentMetadata],
+        pages: List[Dict[str, Any]],
+        sources: List[str],
+        counts: Dict[str, int]
+    ) -> AsyncIterator[Document]:
+        """Yield chunk Documents of new and changed pages as the crawler fetches them"""
+        async for page in crawler.crawl(url):
+            counts[page["status"]] += 1
+            if page["status"] in ("failed", "not_modified"):
+                continue
+            
+            pages.append({
+                "url": page["url"],
+                "status": page["status"],
+                "etag": page["etag"],
+                "last_modified": page["last_modified"],
+                "content_hash": page["content_hash"],
+                "links": page["links"],
+                "chunk_ids": page["chunk_ids"],
+            })
+            if page["status"] == "unchanged":
+                continue
+            
+            chunks = await asyncio.to_thread(self.text_splitter.split_text, page["text"])
+            base_metadata = self._base_metadata(page["url"], metadata, document_key=page["url"])
+            base_metadata["title"] = page["title"]
+            base_metadata["file_type"] = "html"
+            for i, chunk in enumerate(chunks):
+                doc, _ = self._chunk_document(chunk, i, base_metadata, None)
+                doc.metadata["total_chunks"] = len(chunks)
+                sources.append(page["url"])
+                yield doc
 
 
 # Singleton instance
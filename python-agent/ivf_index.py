@@ -0,0 +1,313 @@
+"""
+IVF-PQ Index for CodeMind
+Approximate nearest-neighbour search over the flat vector index
+
+Vectors are partitioned with coarse k-means (the inverted file) and the
+residual to each vector's centroid is compressed with product quantization,
+so a 1536-dim float32 row (6 KB) is stored as m one-byte codes. Queries scan
+the nprobe closest partitions with asymmetric distance tables and optionally
+re-score the shortlist exactly against the memory-mapped matrix.
+
+Build or rebuild from the command line:
+    python ivf_index.py build --nlist 4096 --m 32
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import argparse
+from typing import Optional, Tuple
+from pathlib import Path
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows materialized at once while assigning or encoding
+BLOCK_ROWS = 16384
+
+# Residual samples used to train each PQ codebook
+PQ_TRAINING_ROWS = 256 * 64
+
+
+def nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (squared L2) for every row of data"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(data), dtype=np.int64)
+
+    for start in range(0, len(data), BLOCK_ROWS):
+        block = np.asarray(data[start:start + BLOCK_ROWS], dtype=np.float32)
+        distances = centroid_norms - 2.0 * (block @ centroids.T)
+        assignments[start:start + len(block)] = distances.argmin(axis=1)
+
+    return assignments
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are re-seeded from random rows"""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        assignments = nearest_centroids(data, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+
+    return centroids
+
+
+class IVFPQIndex:
+    """Inverted-file index with product-quantized residuals"""
+
+    def __init__(
+        self,
+        coarse: np.ndarray,
+        codebooks: np.ndarray,
+        codes: np.ndarray,
+        list_offsets: np.ndarray,
+        list_ordinals: np.ndarray,
+        rows: int
+    ):
+        """
+        Args:
+            coarse: (nlist, d) coarse centroids
+            codebooks: (m, ksub, d / m) PQ centroids per subspace (ksub <= 256)
+            codes: (n, m) uint8 residual codes, grouped by inverted list
+            list_offsets: (nlist + 1,) start of each list in codes
+            list_ordinals: (n,) flat index ordinal of each code row
+            rows: Flat index rows covered by this build
+        """
+        self.coarse = coarse
+        self.codebooks = codebooks
+        self.codes = codes
+        self.list_offsets = list_offsets
+        self.list_ordinals = list_ordinals
+        self.rows = rows
+
+    @property
+    def nlist(self) -> int:
+        return len(self.coarse)
+
+    @property
+    def m(self) -> int:
+        return len(self.codebooks)
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        live: np.ndarray,
+        nlist: Optional[int] = None,
+        m: int = 16,
+        sample_size: int = 100_000,
+        iterations: int = 20,
+        seed: int = 0
+    ) -> "IVFPQIndex":
+        """
+        Train centroids and codebooks on a sample, then encode every live row
+
+        Args:
+            matrix: (rows, d) flat index matrix of L2-normalized vectors
+            live: (rows,) mask of rows that are not tombstoned
+            nlist: Number of coarse partitions (default 4 * sqrt(rows))
+            m: Number of PQ subspaces; must divide the dimension
+            sample_size: Rows used for training
+            iterations: k-means iterations
+            seed: Random seed for sampling and initialization
+        """
+        rows, dimensions = matrix.shape
+        if dimensions % m != 0:
+            raise ValueError(f"PQ subspaces ({m}) must divide the dimension ({dimensions})")
+
+        ordinals = np.flatnonzero(live)
+        if len(ordinals) == 0:
+            raise ValueError("Cannot build an ANN index over an empty flat index")
+
+        nlist = nlist or max(1, int(4 * np.sqrt(len(ordinals))))
+        rng = np.random.default_rng(seed)
+        sample_ordinals = np.sort(rng.choice(ordinals, min(sample_size, len(ordinals)), replace=False))
+        sample = np.asarray(matrix[sample_ordinals], dtype=np.float32)
+
+        start = time.perf_counter()
+        coarse = kmeans(sample, nlist, iterations, seed)
+        residuals = sample - coarse[nearest_centroids(sample, coarse)]
+
+        # 256 centroids per subspace need far fewer samples than the coarse quantizer
+        dsub = dimensions // m
+        residuals = residuals[:PQ_TRAINING_ROWS]
+        codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub]), 256, iterations, seed + j)
+            for j in range(m)
+        ])
+        logger.info(f"Trained IVF-PQ (nlist={len(coarse)}, m={m}) in {time.perf_counter() - start:.1f}s")
+
+        assignments = np.empty(len(ordinals), dtype=np.int64)
+        codes = np.empty((len(ordinals), m), dtype=np.uint8)
+        for block_start in range(0, len(ordinals), BLOCK_ROWS):
+            block_ordinals = ordinals[block_start:block_start + BLOCK_ROWS]
+            block = np.asarray(matrix[block_ordinals], dtype=np.float32)
+            block_assignments = nearest_centroids(block, coarse)
+            block_residuals = block - coarse[block_assignments]
+
+            assignments[block_start:block_start + len(block)] = block_assignments
+            for j in range(m):
+                sub = np.ascontiguousarray(block_residuals[:, j * dsub:(j + 1) * dsub])
+                codes[block_start:block_start + len(block), j] = nearest_centroids(sub, codebooks[j])
+
+        order = np.argsort(assignments, kind="stable")
+        list_offsets = np.zeros(len(coarse) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=len(coarse)), out=list_offsets[1:])
+
+        return cls(
+            coarse=coarse,
+            codebooks=codebooks,
+            codes=codes[order],
+            list_offsets=list_offsets,
+            list_ordinals=ordinals[order],
+            rows=rows
+        )
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        live: np.ndarray,
+        nprobe: int = 8,
+        matrix: Optional[np.ndarray] = None,
+        rerank: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k for an L2-normalized query
+
+        Args:
+            query: (d,) normalized query vector
+            k: Number of results
+            live: Tombstone mask over flat index ordinals
+            nprobe: Inverted lists scanned
+            matrix: Flat matrix for exact re-scoring (None to skip)
+            rerank: Shortlist size as a multiple of k for exact re-scoring (0 to skip)
+
+        Returns:
+            (ordinals, cosine distances), closest first
+        """
+        nprobe = min(nprobe, self.nlist)
+        coarse_distances = ((self.coarse - query) ** 2).sum(axis=1)
+        probes = np.argpartition(coarse_distances, nprobe - 1)[:nprobe]
+
+        m, _, dsub = self.codebooks.shape
+        subspaces = np.arange(m)[None, :]
+        candidate_ordinals, candidate_distances = [], []
+
+        for probe in probes:
+            start, end = self.list_offsets[probe], self.list_offsets[probe + 1]
+            if start == end:
+                continue
+
+            residual = (query - self.coarse[probe]).reshape(m, 1, dsub)
+            tables = ((self.codebooks - residual) ** 2).sum(axis=2)
+            distances = tables[subspaces, self.codes[start:end]].sum(axis=1)
+
+            ordinals = self.list_ordinals[start:end]
+            alive = live[ordinals]
+            candidate_ordinals.append(ordinals[alive])
+            candidate_distances.append(distances[alive])
+
+        if not candidate_ordinals:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        ordinals = np.concatenate(candidate_ordinals)
+        distances = np.concatenate(candidate_distances)
+
+        shortlist = k * rerank if (rerank and matrix is not None) else k
+        if len(ordinals) > shortlist:
+            keep = np.argpartition(distances, shortlist - 1)[:shortlist]
+            ordinals, distances = ordinals[keep], distances[keep]
+
+        if rerank and matrix is not None:
+            sorted_ordinals = np.sort(ordinals)
+            similarities = np.asarray(matrix[sorted_ordinals], dtype=np.float32) @ query
+            ordinals, distances = sorted_ordinals, 1.0 - similarities
+        else:
+            # Squared L2 between unit vectors is twice the cosine distance
+            distances = distances / 2.0
+
+        top = np.argsort(distances, kind="stable")[:k]
+        return ordinals[top], distances[top].astype(np.float32)
+
+    def save(self, directory: Path):
+        """Write a new build next to older ones and switch CURRENT to it atomically"""
+        directory.mkdir(parents=True, exist_ok=True)
+        build_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        build_dir = directory / build_id
+        build_dir.mkdir()
+
+        for name in ("coarse", "codebooks", "codes", "list_offsets", "list_ordinals"):
+            np.save(build_dir / f"{name}.npy", getattr(self, name))
+        (build_dir / "meta.json").write_text(json.dumps({"rows": self.rows}))
+
+        current_tmp = directory / "CURRENT.tmp"
+        current_tmp.write_text(build_id)
+        os.replace(current_tmp, directory / "CURRENT")
+
+        # Older builds may still be mapped by other workers; keep the previous one
+        builds = sorted(p for p in directory.iterdir() if p.is_dir() and p.name != build_id)
+        for old in builds[:-1]:
+            shutil.rmtree(old, ignore_errors=True)
+
+        logger.info(f"Saved IVF-PQ build {build_id} covering {self.rows} rows")
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["IVFPQIndex"]:
+        """Memory-map the current build, or return None if none exists"""
+        current = directory / "CURRENT"
+        if not current.exists():
+            return None
+
+        build_dir = directory / current.read_text().strip()
+        arrays = {
+            name: np.load(build_dir / f"{name}.npy", mmap_mode="r")
+            for name in ("codes", "list_ordinals")
+        }
+        arrays.update({
+            name: np.load(build_dir / f"{name}.npy")
+            for name in ("coarse", "codebooks", "list_offsets")
+        })
+        meta = json.loads((build_dir / "meta.json").read_text())
+        return cls(rows=meta["rows"], **arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the IVF-PQ index for the flat vector backend")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Build or rebuild the ANN index")
+    build.add_argument(
+        "--dir",
+        default=os.getenv(
+            "FLAT_INDEX_DIR",
+            str(Path(os.getenv("CHROMA_DB_DIR", "./chroma_db")) / "flat_index")
+        ),
+        help="Flat index directory"
+    )
+    build.add_argument("--nlist", type=int, default=None, help="Coarse partitions (default 4*sqrt(n))")
+    build.add_argument("--m", type=int, default=16, help="PQ subspaces, must divide the dimension")
+    build.add_argument("--sample-size", type=int, default=100_000, help="Training sample rows")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from flat_index import FlatVectorIndex
+    FlatVectorIndex(args.dir).build_ann(nlist=args.nlist, m=args.m, sample_size=args.sample_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Ingestion Job Queue for CodeMind
+Runs ingestion jobs on a bounded local worker pool with job state persisted in SQLite
+"""
+
+import os
+import json
+import uuid
+import socket
+import asyncio
+import sqlite3
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobProgress:
+    """Handle passed to a running job for reporting its stage and chunk counts"""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+
+    def update(
+        self,
+        stage: Optional[str] = None,
+        chunks_done: Optional[int] = None,
+        chunks_total: Optional[int] = None
+    ):
+        self.queue._update(self.job_id, stage=stage, chunks_done=chunks_done, chunks_total=chunks_total)
+
+
+class JobQueue:
+    """
+    In-process job queue for ingestion work
+
+    Endpoints submit a coroutine factory and return the job ID at once;
+    INGEST_WORKERS asyncio workers run jobs in submission order. State lives
+    in SQLite so /jobs/{id} works from any worker process. An active job with
+    the same dedupe key is returned instead of starting duplicate work when a
+    client retries.
+    """
+
+    def __init__(self, db_path: str = "./jobs.db", workers: Optional[int] = None):
+        """
+        Args:
+            db_path: Path to the SQLite job database
+            workers: Jobs run at once (INGEST_WORKERS)
+        """
+        self.db_path = db_path
+        self.workers = workers or int(os.getenv("INGEST_WORKERS", "2"))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._pending: Dict[str, Callable[[JobProgress], Awaitable[Dict[str, Any]]]] = {}
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite database with schema"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    dedupe_key TEXT,
+                    owner TEXT NOT NULL,
+                    params TEXT,
+                    chunks_done INTEGER DEFAULT 0,
+                    chunks_total INTEGER,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            ''')
+            # At most one active job per dedupe key, across worker processes
+            conn.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_key ON jobs(dedupe_key)
+                WHERE status IN ('queued', 'running')
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at DESC)')
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._fail_orphaned_jobs()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _fail_orphaned_jobs(self):
+        """Mark jobs of processes on this host that no longer exist as failed"""
+        host = socket.gethostname()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f'SELECT id, owner FROM jobs WHERE status IN {ACTIVE_STATUSES}'
+            ).fetchall()
+            orphaned = [
+                row["id"] for row in rows
+                if row["owner"].rsplit(":", 1)[0] == host and not _process_alive(int(row["owner"].rsplit(":", 1)[1]))
+            ]
+            for job_id in orphaned:
+                conn.execute(
+                    '''
+                    UPDATE jobs SET status = 'failed', stage = 'failed', error = ?, finished_at = ?
+                    WHERE id = ?
+                    ''',
+                    ("Interrupted by a service restart; please resubmit", datetime.utcnow().isoformat(), job_id)
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+        if orphaned:
+            logger.warning(f"Marked {len(orphaned)} interrupted ingestion jobs as failed")
+
+    async def start(self):
+        """Start the worker tasks (call from the running event loop)"""
+        if self._tasks:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Ingestion job queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Cancel the worker tasks"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(
+        self,
+        kind: str,
+        run: Callable[[JobProgress], Awaitable[Dict[str, Any]]],
+        dedupe_key: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Enqueue a job
+
+        Args:
+            kind: Job type, e.g. "file", "github", "local"
+            run: Coroutine factory doing the work; receives a JobProgress
+            dedupe_key: Identity of the work (e.g. content hash or repo@branch)
+            params: JSON-serializable request parameters, for display
+
+        Returns:
+            Job record; for a duplicate submission, the existing active job
+            with "deduplicated" set
+        """
+        job_id = str(uuid.uuid4())
+        conn = self._connect()
+        try:
+            conn.execute(
+                '''
+                INSERT INTO jobs (id, kind, status, stage, dedupe_key, owner, params, created_at)
+                VALUES (?, ?, 'queued', 'queued', ?, ?, ?, ?)
+                ''',
+                (job_id, kind, dedupe_key, self.owner, json.dumps(params or {}), datetime.utcnow().isoformat())
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            row = conn.execute(
+                f'SELECT id FROM jobs WHERE dedupe_key = ? AND status IN {ACTIVE_STATUSES}',
+                (dedupe_key,)
+            ).fetchone()
+            if row is None:
+                raise
+            logger.info(f"Job for {dedupe_key} already active: {row['id']}")
+            return {**self.get(row["id"]), "deduplicated": True}
+        finally:
+            conn.close()
+
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._pending[job_id] = run
+        self._queue.put_nowait(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job record with progress and throughput, or None"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["params"] = json.loads(job["params"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job.pop("owner")
+        job.pop("dedupe_key")
+
+        job["chunks_per_second"] = None
+        if job["started_at"] and job["chunks_done"]:
+            end = datetime.fromisoformat(job["finished_at"]) if job["finished_at"] else datetime.utcnow()
+            elapsed = (end - datetime.fromisoformat(job["started_at"])).total_seconds()
+            if elapsed > 0:
+                job["chunks_per_second"] = round(job["chunks_done"] / elapsed, 2)
+        return job
+
+    def _update(self, job_id: str, **fields):
+        fields = {key: value for key, value in fields.items() if value is not None}
+        if not fields:
+            return
+
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def _worker(self):
+        """Run queued jobs one at a time"""
+        while True:
+            job_id = await self._queue.get()
+            run = self._pending.pop(job_id, None)
+            if run is None:
+                continue
+
+            self._update(job_id, status="running", stage="starting", started_at=datetime.utcnow().isoformat())
+            try:
+                result = await run(JobProgress(self, job_id))
+                self._update(
+                    job_id, status="succeeded", stage="done",
+                    result=json.dumps(result, default=str), finished_at=datetime.utcnow().isoformat()
+                )
+                logger.info(f"Job {job_id} succeeded")
+            except asyncio.CancelledError:
+                self._update(job_id, status="failed", stage="failed", error="Cancelled",
+                             finished_at=datetime.utcnow().isoformat())
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                self._update(job_id, status="failed", stage="failed", error=str(e),
+                             finished_at=datetime.utcnow().isoformat())
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+# Singleton instance
+_job_queue_instance: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get or create job queue singleton"""
+    global _job_queue_instance
+    if _job_queue_instance is None:
+        _job_queue_instance = JobQueue(os.getenv("JOBS_DB_PATH", "./jobs.db"))
+    return _job_queue_instance
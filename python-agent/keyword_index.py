@@ -0,0 +1,378 @@
+"""
+Keyword Index for CodeMind
+BM25 inverted index maintained alongside the vector store
+"""
+
+import re
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+from langchain_core.documents import Document
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+CAMEL_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms
+
+    Identifiers are kept whole and also split on snake_case and camelCase,
+    so "getUserById" matches both itself and "user".
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text):
+        terms.append(token.lower())
+        parts = [p.lower() for piece in token.split("_") for p in CAMEL_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so a tag matches literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class KeywordIndex:
+    """BM25 search over an inverted index persisted in SQLite"""
+
+    def __init__(self, db_path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            db_path: Path to the SQLite index file
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite database with schema"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS docs (
+                    id TEXT PRIMARY KEY,
+                    length INTEGER NOT NULL,
+                    document TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, id)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_postings_id ON postings(id)')
+            # Running BM25 collection statistics, so searches never scan docs
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    doc_count INTEGER NOT NULL,
+                    total_length INTEGER NOT NULL
+                )
+            ''')
+            # Computed once for indexes created before the totals existed
+            conn.execute('''
+                INSERT OR IGNORE INTO totals (id, doc_count, total_length)
+                SELECT 0, COUNT(*), COALESCE(SUM(length), 0) FROM docs
+            ''')
+            # Bumped by every write, so caches of query results can tell the index changed
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS generation (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    value INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add(self, ids: List[str], documents: List[Document]):
+        """Index documents, replacing any existing entries with the same IDs"""
+        if not ids:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                self._remove(conn, ids)
+                added, added_length = 0, 0
+                for doc_id, doc in zip(ids, documents):
+                    counts = Counter(tokenize(doc.page_content))
+                    length = sum(counts.values())
+                    conn.execute(
+                        'INSERT INTO docs (id, length, document, metadata) VALUES (?, ?, ?, ?)',
+                        (doc_id, length, doc.page_content, json.dumps(doc.metadata or {}))
+                    )
+                    conn.executemany(
+                        'INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)',
+                        [(term, doc_id, tf) for term, tf in counts.items()]
+                    )
+                    added += 1
+                    added_length += length
+                self._update_totals(conn, added, added_length)
+                self._bump(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def delete(self, ids: List[str]):
+        """Remove documents from the index"""
+        if not ids:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                self._remove(conn, ids)
+                self._bump(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _remove(self, conn: sqlite3.Connection, ids: List[str]):
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            removed, removed_length = conn.execute(
+                f'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE id IN ({placeholders})', batch
+            ).fetchone()
+            conn.execute(f'DELETE FROM postings WHERE id IN ({placeholders})', batch)
+            conn.execute(f'DELETE FROM docs WHERE id IN ({placeholders})', batch)
+            self._update_totals(conn, -removed, -removed_length)
+
+    @staticmethod
+    def _update_totals(conn: sqlite3.Connection, docs: int, length: int):
+        if docs or length:
+            conn.execute(
+                'UPDATE totals SET doc_count = doc_count + ?, total_length = total_length + ? WHERE id = 0',
+                (docs, length)
+            )
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection):
+        conn.execute('UPDATE generation SET value = value + 1 WHERE id = 0')
+
+    def generation(self) -> int:
+        """Counter incremented in the same transaction as every add, delete and reset"""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT value FROM generation WHERE id = 0').fetchone()[0]
+        finally:
+            conn.close()
+
+    def reset(self):
+        """Remove every document (use with caution!)"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('DELETE FROM postings')
+                conn.execute('DELETE FROM docs')
+                conn.execute('UPDATE totals SET doc_count = 0, total_length = 0 WHERE id = 0')
+                self._bump(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Rank documents by BM25
+
+        Args:
+            query: Search query
+            k: Number of results to return
+            filter: Optional metadata equality filter
+
+        Returns:
+            List of (document, score) tuples, best first. Scores are divided by
+            the query's BM25 upper bound, so they fall in [0, 1].
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        conn = self._connect()
+        try:
+            total_docs, total_length = conn.execute(
+                'SELECT doc_count, total_length FROM totals WHERE id = 0'
+            ).fetchone()
+            if total_docs == 0:
+                return []
+            avg_length = total_length / total_docs
+
+            allowed = self._filter_ids(conn, filter) if filter else None
+
+            scores: Dict[str, float] = {}
+            upper_bound = 0.0
+            for term in terms:
+                postings = conn.execute(
+                    'SELECT p.id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.id WHERE p.term = ?',
+                    (term,)
+                ).fetchall()
+                if not postings:
+                    continue
+
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                upper_bound += idf * (self.k1 + 1)
+
+                for doc_id, tf, length in postings:
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            if not scores:
+                return []
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            placeholders = ",".join("?" * len(top))
+            rows = conn.execute(
+                f'SELECT id, document, metadata FROM docs WHERE id IN ({placeholders})',
+                [doc_id for doc_id, _ in top]
+            ).fetchall()
+        finally:
+            conn.close()
+
+        by_id = {row[0]: row for row in rows}
+        return [
+            (
+                Document(page_content=by_id[doc_id][1], metadata=json.loads(by_id[doc_id][2])),
+                score / upper_bound
+            )
+            for doc_id, score in top
+        ]
+
+    def _filter_ids(self, conn: sqlite3.Connection, filter: Dict[str, Any]) -> set:
+        """
+        IDs of documents matching a Chroma-style filter
+
+        Supports the syntax MetadataIndex.evaluate does: equality, lists
+        and $eq/$ne/$in/$nin per field, and $and/$or clauses; tags match
+        per tag.
+        """
+        where, params = self._filter_sql(filter)
+        rows = conn.execute(f'SELECT id FROM docs WHERE {where}', params).fetchall()
+        return {row[0] for row in rows}
+
+    def _filter_sql(self, filter: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for key, condition in filter.items():
+            if key in ("$and", "$or"):
+                parts = [self._filter_sql(clause) for clause in condition]
+                if not parts:
+                    clauses.append("1" if key == "$and" else "0")
+                    continue
+                joiner = " AND " if key == "$and" else " OR "
+                clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+                params.extend(param for _, part_params in parts for param in part_params)
+            else:
+                sql, field_params = self._field_sql(key, condition)
+                clauses.append(sql)
+                params.extend(field_params)
+        return " AND ".join(clauses) or "1", params
+
+    def _field_sql(self, field: str, condition: Any) -> Tuple[str, List[Any]]:
+        if not isinstance(condition, dict):
+            condition = {"$in": condition} if isinstance(condition, list) else {"$eq": condition}
+
+        clauses, params = [], []
+        for operator, operand in condition.items():
+            if operator in ("$eq", "$ne"):
+                values = [operand]
+            elif operator in ("$in", "$nin"):
+                values = list(operand)
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+
+            sql, match_params = self._match_sql(field, values)
+            # Like MetadataIndex, negations also match documents without the field
+            clauses.append(f"NOT COALESCE({sql}, 0)" if operator in ("$ne", "$nin") else sql)
+            params.extend(match_params)
+        return "(" + " AND ".join(clauses) + ")", params
+
+    @staticmethod
+    def _match_sql(field: str, values: List[Any]) -> Tuple[str, List[Any]]:
+        if not values:
+            return "0", []
+        path = f'$."{field}"'
+        if field == "tags":
+            tags = "',' || REPLACE(json_extract(metadata, ?), ', ', ',') || ','"
+            return (
+                "(" + " OR ".join(f"{tags} LIKE ? ESCAPE '\\'" for _ in values) + ")",
+                [param for value in values for param in (path, f"%,{_escape_like(str(value))},%")]
+            )
+        placeholders = ",".join("?" * len(values))
+        return f"json_extract(metadata, ?) IN ({placeholders})", [path, *values]
+
+    def ids_matching(self, filter: Dict[str, Any]) -> set:
+        """IDs of every document matching a metadata filter"""
+        conn = self._connect()
+        try:
+            return self._filter_ids(conn, filter)
+        finally:
+            conn.close()
+
+    def existing(self, ids: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> set:
+        """
+        The subset of ids that are indexed
+
+        Args:
+            ids: Document IDs
+            metadatas: Optional metadata per ID; an ID only counts when it
+                is indexed with exactly this metadata
+        """
+        if not ids:
+            return set()
+
+        expected = None
+        if metadatas is not None:
+            expected = {doc_id: json.loads(json.dumps(metadata or {})) for doc_id, metadata in zip(ids, metadatas)}
+
+        conn = self._connect()
+        try:
+            found = set()
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f'SELECT id, metadata FROM docs WHERE id IN ({placeholders})', batch)
+                found.update(
+                    doc_id for doc_id, metadata in rows
+                    if expected is None or json.loads(metadata) == expected[doc_id]
+                )
+            return found
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        """Number of indexed documents"""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT doc_count FROM totals WHERE id = 0').fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,246 @@
+"""
+Metadata Index for CodeMind
+Compressed bitmaps of flat index ordinals per (field, value) for filter pre-evaluation
+"""
+
+import json
+import zlib
+import struct
+import sqlite3
+from typing import List, Dict, Any, Iterable, Optional, Callable
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ordinals per bitmap container (roaring-style 16-bit split)
+CONTAINER_BITS = 1 << 16
+
+
+class Bitmap:
+    """
+    Set of ordinals stored as 65536-bit containers keyed by the high bits
+
+    Containers for empty ranges are never created, and each container is a
+    Python int, so AND/OR/ANDNOT run at C speed. Chunks of one repo or file
+    are ingested together and get contiguous ordinals, which keeps most
+    containers dense or absent.
+    """
+
+    __slots__ = ("containers",)
+
+    def __init__(self, containers: Optional[Dict[int, int]] = None):
+        self.containers: Dict[int, int] = containers or {}
+
+    @classmethod
+    def from_ordinals(cls, ordinals: Iterable[int]) -> "Bitmap":
+        ordinals = np.unique(np.asarray(list(ordinals) if not isinstance(ordinals, np.ndarray) else ordinals, dtype=np.int64))
+        containers = {}
+        highs = ordinals >> 16
+        for high in np.unique(highs):
+            bits = np.zeros(CONTAINER_BITS, dtype=bool)
+            bits[ordinals[highs == high] & 0xFFFF] = True
+            containers[int(high)] = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+        return cls(containers)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        containers = dict(self.containers)
+        for high, bits in other.containers.items():
+            containers[high] = containers.get(high, 0) | bits
+        return Bitmap(containers)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        containers = {}
+        for high, bits in self.containers.items():
+            both = bits & other.containers.get(high, 0)
+            if both:
+                containers[high] = both
+        return Bitmap(containers)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        containers = {}
+        for high, bits in self.containers.items():
+            rest = bits & ~other.containers.get(high, 0)
+            if rest:
+                containers[high] = rest
+        return Bitmap(containers)
+
+    def __len__(self) -> int:
+        return sum(bin(bits).count("1") for bits in self.containers.values())
+
+    def to_array(self) -> np.ndarray:
+        """Sorted ordinals as an int64 array"""
+        parts = []
+        for high in sorted(self.containers):
+            raw = np.frombuffer(self.containers[high].to_bytes(CONTAINER_BITS // 8, "little"), dtype=np.uint8)
+            parts.append(np.flatnonzero(np.unpackbits(raw, bitorder="little")) + (high << 16))
+        return np.concatenate(parts).astype(np.int64) if parts else np.empty(0, dtype=np.int64)
+
+    def to_bytes(self) -> bytes:
+        """zlib-compressed serialization"""
+        out = bytearray()
+        for high, bits in sorted(self.containers.items()):
+            payload = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+            out += struct.pack("<II", high, len(payload)) + payload
+        return zlib.compress(bytes(out))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Bitmap":
+        raw = zlib.decompress(data)
+        containers, offset = {}, 0
+        while offset < len(raw):
+            high, length = struct.unpack_from("<II", raw, offset)
+            offset += 8
+            containers[high] = int.from_bytes(raw[offset:offset + length], "little")
+            offset += length
+        return cls(containers)
+
+
+class MetadataIndex:
+    """
+    Bitmap index over selected metadata fields of the flat vector index
+
+    Filters use Chroma-style syntax and are evaluated as set algebra:
+        {"ward": "Ward 12"}                         equality
+        {"tags": "roads", "file_type": ".py"}       implicit $and
+        {"repo_url": {"$in": [url_a, url_b]}}       $eq, $ne, $in, $nin
+        {"$or": [{"ward": "Ward 1"}, {"tags": "water"}]}
+    Comma-joined tags are indexed per tag. Other fields fall back to a scan
+    of the SQLite sidecar.
+    """
+
+    INDEXED_FIELDS = ("source", "ward", "tags", "file_type", "repo_url")
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        """
+        Args:
+            connect: Connection factory for the flat index sidecar database
+        """
+        self._connect = connect
+        self._cache: Dict[tuple, Bitmap] = {}
+        self._init_database()
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS bitmaps (
+                    field TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (field, value)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _values(field: str, value: Any) -> List[str]:
+        """Index keys for one metadata value"""
+        if field == "tags" and isinstance(value, str):
+            return [json.dumps(tag.strip()) for tag in value.split(",") if tag.strip()]
+        if isinstance(value, list):
+            return [json.dumps(v) for v in value]
+        return [json.dumps(value)]
+
+    def add(self, conn: sqlite3.Connection, ordinals: List[int], metadatas: List[Dict[str, Any]]):
+        """Record ordinals under their indexed values (inside the caller's transaction)"""
+        pending: Dict[tuple, List[int]] = {}
+        for ordinal, metadata in zip(ordinals, metadatas):
+            for field in self.INDEXED_FIELDS:
+                if field in metadata and metadata[field] is not None:
+                    for value in self._values(field, metadata[field]):
+                        pending.setdefault((field, value), []).append(ordinal)
+
+        for (field, value), ordinals in pending.items():
+            row = conn.execute(
+                'SELECT data FROM bitmaps WHERE field = ? AND value = ?', (field, value)
+            ).fetchone()
+            bitmap = Bitmap.from_ordinals(ordinals)
+            if row:
+                bitmap = Bitmap.from_bytes(row[0]) | bitmap
+            conn.execute(
+                'INSERT OR REPLACE INTO bitmaps (field, value, data) VALUES (?, ?, ?)',
+                (field, value, bitmap.to_bytes())
+            )
+
+    def reset(self, conn: sqlite3.Connection):
+        conn.execute('DELETE FROM bitmaps')
+
+    def invalidate(self):
+        """Drop cached bitmaps after another writer committed"""
+        self._cache.clear()
+
+    def _bitmap(self, field: str, value: str) -> Bitmap:
+        key = (field, value)
+        if key not in self._cache:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    'SELECT data FROM bitmaps WHERE field = ? AND value = ?', key
+                ).fetchone()
+            finally:
+                conn.close()
+            self._cache[key] = Bitmap.from_bytes(row[0]) if row else Bitmap()
+        return self._cache[key]
+
+    def evaluate(self, filter: Dict[str, Any], universe: Bitmap) -> Bitmap:
+        """
+        Evaluate a filter to the set of matching ordinals
+
+        Args:
+            filter: Chroma-style metadata filter
+            universe: All live ordinals (needed for $ne / $nin)
+        """
+        result = universe
+        for key, condition in filter.items():
+            if key == "$and":
+                for clause in condition:
+                    result = result & self.evaluate(clause, universe)
+            elif key == "$or":
+                matched = Bitmap()
+                for clause in condition:
+                    matched = matched | self.evaluate(clause, universe)
+                result = result & matched
+            else:
+                result = result & self._evaluate_field(key, condition, universe)
+        return result
+
+    def _evaluate_field(self, field: str, condition: Any, universe: Bitmap) -> Bitmap:
+        if not isinstance(condition, dict):
+            condition = {"$in": condition} if isinstance(condition, list) else {"$eq": condition}
+
+        result = universe
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                matched = self._match(field, [operand])
+            elif operator == "$in":
+                matched = self._match(field, operand)
+            elif operator == "$ne":
+                matched = universe - self._match(field, [operand])
+            elif operator == "$nin":
+                matched = universe - self._match(field, operand)
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            result = result & matched
+        return result
+
+    def _match(self, field: str, values: List[Any]) -> Bitmap:
+        matched = Bitmap()
+        if field in self.INDEXED_FIELDS:
+            for value in values:
+                matched = matched | self._bitmap(field, json.dumps(value))
+            return matched
+
+        # Unindexed field: scan the sidecar
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" * len(values))
+            rows = conn.execute(
+                f'SELECT ordinal FROM rows WHERE deleted = 0 AND json_extract(metadata, ?) IN ({placeholders})',
+                [f'$."{field}"', *values]
+            ).fetchall()
+        finally:
+            conn.close()
+        return Bitmap.from_ordinals([r[0] for r in rows])
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
 
@@ -11,6 +11,8 @@ class DocumentMetadata(BaseModel):
     ward: Optional[str] = None
     tags: Optional[List[str]] = []
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    # Stable caller-chosen key; a re-upload with the same key replaces the document
+    document_key: Optional[str] = None
 
 
 class IngestRequest(BaseModel):
@@ -26,6 +28,24 @@ class IngestResponse(BaseModel):
     metadata: Dict[str, Any] = {}
 
 
+class JobStatus(BaseModel):
+    """Status of an asynchronous ingestion job"""
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    stage: str
+    params: Dict[str, Any] = {}
+    chunks_done: int = 0
+    chunks_total: Optional[int] = None
+    chunks_per_second: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    deduplicated: bool = False
+
+
 class QueryRequest(BaseModel):
     """Request model for AI queries"""
     query: str = Field(..., min_length=1, description="User's natural language query")
@@ -38,7 +58,7 @@ class QueryRequest(BaseModel):
         default=None,
         description="Metadata filters: file_type, repo_url, source, tags, etc."
     )
-    search_mode: str = Field(
+    search_mode: Literal["semantic", "keyword", "hybrid"] = Field(
         default="hybrid",
         description="Search mode: 'semantic', 'keyword', or 'hybrid'"
     )
@@ -53,6 +73,8 @@ class Source(BaseModel):
     id: str
     title: str
     page: Optional[int] = None
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
     snippet: str
     score: Optional[float] = None
 
@@ -0,0 +1,289 @@
+"""
+Parse Pool for CodeMind
+Runs CPU-bound PDF/DOCX parsing in worker processes with timeouts and crash isolation
+"""
+
+import io
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Callable, Any
+import logging
+
+import document_parsers
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied at a time from the upload into shared memory
+COPY_BLOCK = 1024 * 1024
+
+
+class _SharedBuffer(io.RawIOBase):
+    """Read-only seekable stream over a shared memory block"""
+
+    def __init__(self, buffer: memoryview):
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        data = self._buffer[self._position:self._position + len(target)]
+        target[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._buffer)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+def _run_on_shared(name: str, size: int, parse: Callable[[BinaryIO], object]):
+    """Attach to the parent's shared memory block and parse it in place"""
+    # Workers share the parent's resource tracker, and the parent unlinks the block
+    block = shared_memory.SharedMemory(name=name)
+    view = block.buf[:size]
+    try:
+        return parse(io.BufferedReader(_SharedBuffer(view)))
+    finally:
+        view.release()
+        block.close()
+
+
+def _pdf_page_count(name: str, size: int) -> int:
+    return _run_on_shared(name, size, document_parsers.pdf_page_count)
+
+
+def _pdf_pages(name: str, size: int, start: int, end: int) -> List[Tuple[int, str]]:
+    return _run_on_shared(name, size, lambda f: list(document_parsers.iter_pdf_pages(f, start, end)))
+
+
+def _docx_text(name: str, size: int) -> str:
+    return _run_on_shared(name, size, document_parsers.extract_docx)
+
+
+def _split_texts(splitter, texts: List[Any]) -> List[list]:
+    return [splitter.split_text(*text) if isinstance(text, tuple) else splitter.split_text(text) for text in texts]
+
+
+class ParsePool:
+    """
+    Process pool for document parsing
+
+    Uploads are copied once into shared memory, and workers parse them in
+    place: a DOCX as one task, a PDF as windows of pages parsed in parallel and
+    yielded in order. Each file gets a parse-time budget. A file that exceeds
+    it, or a worker that crashes, restarts the pool instead of taking the
+    service down.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        page_window: Optional[int] = None
+    ):
+        """
+        Args:
+            workers: Worker processes; 0 parses inline (PARSE_WORKERS, default CPU count)
+            timeout: Seconds of parsing allowed per file (PARSE_TIMEOUT)
+            page_window: PDF pages per task (PARSE_PAGE_WINDOW)
+        """
+        self.workers = workers if workers is not None else int(
+            os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1))
+        )
+        self.timeout = timeout or float(os.getenv("PARSE_TIMEOUT", "120"))
+        self.page_window = page_window or int(os.getenv("PARSE_PAGE_WINDOW", "8"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the service process is multi-threaded, so forking is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        """Kill a broken or hung pool; the next task starts a fresh one"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _share(self, file: BinaryIO) -> Tuple[shared_memory.SharedMemory, int]:
+        """Copy a file into a new shared memory block"""
+        file.seek(0, io.SEEK_END)
+        size = file.tell()
+        file.seek(0)
+
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        offset = 0
+        while offset < size:
+            read = file.readinto(block.buf[offset:min(offset + COPY_BLOCK, size)])
+            if not read:
+                break
+            offset += read
+        return block, size
+
+    def _ordered(
+        self,
+        fn: Callable,
+        tasks: Iterable[tuple],
+        filename: str,
+        budget: Optional[List[float]] = None
+    ) -> Iterator:
+        """
+        Run tasks in the pool and yield results in order
+
+        Tasks are drawn lazily and at most two per worker are in flight.
+        After a crash the unfinished tasks are resubmitted once to a fresh
+        pool, so a file is not failed for another file's crash.
+
+        Args:
+            budget: Shared parse-time budget in seconds, decremented while
+                waiting (None gives each task its own PARSE_TIMEOUT)
+        """
+        executor = self._get_executor()
+        tasks = iter(tasks)
+        pending = deque()
+        exhausted = False
+        retried = False
+
+        try:
+            while not exhausted or pending:
+                while not exhausted and len(pending) < self.workers * 2:
+                    args = next(tasks, None)
+                    if args is None:
+                        exhausted = True
+                    else:
+                        pending.append((args, executor.submit(fn, *args)))
+                if not pending:
+                    break
+
+                started = time.monotonic()
+                try:
+                    timeout = self.timeout if budget is None else max(budget[0], 0.0)
+                    result = pending[0][1].result(timeout=timeout)
+                except BrokenProcessPool:
+                    self._restart(executor)
+                    if retried:
+                        raise ValueError(f"Parser crashed on {filename}")
+                    logger.warning(f"Parse worker crashed while parsing {filename}, retrying")
+                    retried = True
+                    executor = self._get_executor()
+                    pending = deque((args, executor.submit(fn, *args)) for args, _ in pending)
+                    continue
+                except FuturesTimeoutError:
+                    self._restart(executor)
+                    raise TimeoutError(f"Parsing {filename} exceeded {self.timeout:.0f}s")
+                finally:
+                    if budget is not None:
+                        budget[0] -= time.monotonic() - started
+
+                pending.popleft()
+                yield result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def iter_pdf_pages(self, file: BinaryIO, filename: str = "document.pdf") -> Iterator[Tuple[int, str]]:
+        """Yield (page number, text) for non-empty pages, parsed in parallel windows"""
+        if self.workers <= 0:
+            yield from document_parsers.iter_pdf_pages(file)
+            return
+
+        block, size = self._share(file)
+        budget = [self.timeout]
+        try:
+            page_count = next(self._ordered(_pdf_page_count, [(block.name, size)], filename, budget))
+            windows = [
+                (block.name, size, start, min(start + self.page_window, page_count))
+                for start in range(0, page_count, self.page_window)
+            ]
+            for pages in self._ordered(_pdf_pages, windows, filename, budget):
+                yield from pages
+        finally:
+            block.close()
+            block.unlink()
+
+    def extract_docx(self, file: BinaryIO, filename: str = "document.docx") -> str:
+        """Extract DOCX text in a worker process"""
+        if self.workers <= 0:
+            return document_parsers.extract_docx(file)
+
+        block, size = self._share(file)
+        try:
+            return next(self._ordered(_docx_text, [(block.name, size)], filename, [self.timeout]))
+        finally:
+            block.close()
+            block.unlink()
+
+    def iter_split(self, splitter, texts: Iterable[Any], batch_chars: int = 1_000_000) -> Iterator[list]:
+        """
+        Split texts into chunks in parallel, yielding one chunk list per text in order
+
+        Texts are sent to workers in batches of about batch_chars characters,
+        and the input is consumed lazily, so only a few batches are in memory.
+
+        Args:
+            splitter: Picklable text splitter with a split_text method
+            texts: Iterable of strings, or of argument tuples starting with
+                the text (e.g. (text, file_type) for CodeChunker)
+            batch_chars: Characters per worker task
+        """
+        if self.workers <= 0:
+            for text in texts:
+                yield _split_texts(splitter, [text])[0]
+            return
+
+        def batches():
+            batch, size = [], 0
+            for text in texts:
+                batch.append(text)
+                size += len(text[0] if isinstance(text, tuple) else text)
+                if size >= batch_chars:
+                    yield (splitter, batch)
+                    batch, size = [], 0
+            if batch:
+                yield (splitter, batch)
+
+        for chunk_lists in self._ordered(_split_texts, batches(), "document batch"):
+            yield from chunk_lists
+
+
+# Singleton instance
+_parse_pool_instance: Optional[ParsePool] = None
+
+
+def get_parse_pool() -> ParsePool:
+    """Get or create parse pool singleton"""
+    global _parse_pool_instance
+    if _parse_pool_instance is None:
+        _parse_pool_instance = ParsePool()
+    return _parse_pool_instance
@@ -1,15 +1,22 @@
 import os
-from typing import List, Optional, Dict, Any
+import re
+import asyncio
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from langchain_core.documents import Document
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 import logging
 
 from vector_store import get_vector_store
+from answer_cache import AnswerCache
+from llm_config import get_llm_settings
 from models import QueryRequest, QueryResponse, Source, AgentResponse
 
 logger = logging.getLogger(__name__)
 
+# A word and the whitespace after it; leading whitespace is its own token
+MOCK_TOKEN = re.compile(r"\S+\s*|\s+")
+
 
 class RAGPipeline:
     """Retrieval-Augmented Generation pipeline"""
@@ -18,6 +25,20 @@ class RAGPipeline:
         self.vector_store = get_vector_store()
         self.llm = self._initialize_llm()
         self.use_mock = os.getenv("USE_MOCK_LLM", "false").lower() == "true"
+        self.model_name = "mock" if isinstance(self.llm, MockLLM) else os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+        
+        # Answers are reused until the index changes
+        self.answer_cache = None
+        if os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true":
+            self.answer_cache = AnswerCache(
+                max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+                ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+                similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+            )
+        
+        # Built from LLMSettings for streamed answers, rebuilt when the settings change
+        self._stream_llm = None
+        self._stream_llm_key = None
     
     def _initialize_llm(self):
         """Initialize LLM"""
@@ -43,26 +64,36 @@ class RAGPipeline:
         self,
         query: str,
         top_k: int = 4,
-        filter: Optional[Dict[str, Any]] = None
+        filter: Optional[Dict[str, Any]] = None,
+        search_mode: str = "semantic"
     ) -> QueryResponse:
         """
         Execute RAG query pipeline
         
+        Answers are cached per (query, filter, top_k, search_mode, model)
+        and index generation, so a repeated question is served without
+        retrieval or an LLM call until documents are added or deleted.
+        
         Args:
             query: User's natural language query
             top_k: Number of documents to retrieve
             filter: Optional metadata filter
+            search_mode: 'semantic', 'keyword' (BM25, no embedding call) or 'hybrid'
             
         Returns:
             QueryResponse with answer and sources
         """
         try:
+            # Read before retrieval, so an answer is never cached under a newer index
+            generation = self._index_generation()
+            cache_args = (query, filter, top_k, search_mode, self.model_name)
+            if generation is not None:
+                cached = self.answer_cache.get(*cache_args, generation, embed=self.vector_store.embed_query)
+                if cached is not None:
+                    return cached.model_copy(deep=True)
+            
             # Retrieve relevant documents
-            docs_with_scores = self.vector_store.similarity_search_with_score(
-                query=query,
-                k=top_k,
-                filter=filter
-            )
+            docs_with_scores = self._retrieve(query, top_k, filter, search_mode)
             
             if not docs_with_scores:
                 return self._fallback_response(
@@ -80,17 +111,19 @@ class RAGPipeline:
             # Create source citations
             sources = self._create_sources(docs, scores)
             
-            # Calculate confidence (based on retrieval scores)
-            confidence = self._calculate_confidence(scores)
-            
-            return QueryResponse(
+            response = QueryResponse(
                 answer=answer,
                 sources=sources,
                 agent_used="document",
-                confidence=confidence,
+                confidence=self._confidence(scores, search_mode),
                 fallback=self.use_mock,
                 raw_llm_output=answer
             )
+            if generation is not None:
+                self.answer_cache.put(
+                    *cache_args, generation, response.model_copy(deep=True), embed=self.vector_store.embed_query
+                )
+            return response
             
         except Exception as e:
             logger.error(f"Error in RAG pipeline: {e}")
@@ -99,13 +132,182 @@ class RAGPipeline:
                 f"An error occurred while processing your query: {str(e)}"
             )
     
+    async def stream_query(
+        self,
+        query: str,
+        top_k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        search_mode: str = "semantic"
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Execute the RAG pipeline, streaming the answer as it is generated
+        
+        Args:
+            query: User's natural language query
+            top_k: Number of documents to retrieve
+            filter: Optional metadata filter
+            search_mode: 'semantic', 'keyword' (BM25, no embedding call) or 'hybrid'
+            
+        Yields:
+            (event, data) pairs: "sources" with the citations, as soon as
+            retrieval is done; "token" with each piece of answer text; and
+            "done" with agent_used, confidence, fallback and cached. With
+            LLMSettings.streaming off, and for cached answers, the answer
+            arrives as a single token. An "error" event ends a stream that
+            fails after tokens were sent.
+        """
+        started = False
+        try:
+            streaming = self._streaming_llm()
+            llm, model_name = streaming if streaming else (self.llm, self.model_name)
+            
+            generation = self._index_generation()
+            cache_args = (query, filter, top_k, search_mode, model_name)
+            if generation is not None:
+                cached = self.answer_cache.get(*cache_args, generation, embed=self.vector_store.embed_query)
+                if cached is not None:
+                    for event in self._replay(cached, cached=True):
+                        yield event
+                    return
+            
+            docs_with_scores = self._retrieve(query, top_k, filter, search_mode)
+            if not docs_with_scores:
+                for event in self._replay(self._fallback_response(
+                    query,
+                    "No relevant documents found in the knowledge base."
+                )):
+                    yield event
+                return
+            
+            docs = [doc for doc, score in docs_with_scores]
+            scores = [score for doc, score in docs_with_scores]
+            sources = self._create_sources(docs, scores)
+            
+            # Citations go out before the LLM is called
+            started = True
+            yield "sources", {"sources": [source.model_dump() for source in sources]}
+            
+            parts = []
+            if streaming:
+                async for token in self._stream_answer(query, docs, llm):
+                    parts.append(token)
+                    yield "token", {"text": token}
+            else:
+                parts.append(await self._generate_answer(query, docs))
+                yield "token", {"text": parts[0]}
+            
+            answer = "".join(parts)
+            response = QueryResponse(
+                answer=answer,
+                sources=sources,
+                agent_used="document",
+                confidence=self._confidence(scores, search_mode),
+                fallback=self.use_mock,
+                raw_llm_output=answer
+            )
+            if generation is not None:
+                self.answer_cache.put(
+                    *cache_args, generation, response.model_copy(deep=True), embed=self.vector_store.embed_query
+                )
+            yield "done", self._done(response, cached=False)
+            
+        except Exception as e:
+            logger.error(f"Error in RAG pipeline: {e}")
+            if started:
+                yield "error", {"detail": f"An error occurred while generating the answer: {str(e)}"}
+                return
+            for event in self._replay(self._fallback_response(
+                query,
+                f"An error occurred while processing your query: {str(e)}"
+            )):
+                yield event
+    
+    def _replay(self, response: QueryResponse, cached: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+        """Stream events of a complete response"""
+        return [
+            ("sources", {"sources": [source.model_dump() for source in response.sources]}),
+            ("token", {"text": response.answer}),
+            ("done", self._done(response, cached)),
+        ]
+    
+    @staticmethod
+    def _done(response: QueryResponse, cached: bool) -> Dict[str, Any]:
+        return {
+            "agent_used": response.agent_used,
+            "confidence": response.confidence,
+            "fallback": response.fallback,
+            "cached": cached
+        }
+    
+    def _streaming_llm(self) -> Optional[Tuple[Any, str]]:
+        """(LLM, model name) for token streaming, or None when LLMSettings.streaming is off"""
+        settings = get_llm_settings()
+        if not settings.streaming:
+            return None
+        if isinstance(self.llm, MockLLM):
+            return self.llm, self.model_name
+        
+        key = tuple(sorted(settings.to_dict().items()))
+        if key != self._stream_llm_key:
+            self._stream_llm = settings.get_llm()
+            self._stream_llm_key = key
+        model_name = "mock" if isinstance(self._stream_llm, MockLLM) else settings.model
+        return self._stream_llm, model_name
+    
+    async def _stream_answer(self, query: str, docs: List[Document], llm) -> AsyncIterator[str]:
+        """Yield answer text as the LLM generates it"""
+        context = self._format_context(docs)
+        if isinstance(llm, MockLLM):
+            async for token in llm.astream(query, context):
+                yield token
+            return
+        
+        async for chunk in llm.astream(self._prompt_messages(query, context)):
+            if chunk.content:
+                yield chunk.content
+    
+    def _index_generation(self) -> Optional[int]:
+        """Current index generation, or None when answers should not be cached"""
+        if self.answer_cache is None:
+            return None
+        try:
+            generation = self.vector_store.index_generation()
+        except Exception as e:
+            logger.warning(f"Answer cache disabled for this query: {e}")
+            return None
+        return generation if isinstance(generation, int) else None
+    
+    def _retrieve(
+        self,
+        query: str,
+        top_k: int,
+        filter: Optional[Dict[str, Any]],
+        search_mode: str
+    ) -> List[tuple]:
+        """Retrieve (document, score) pairs using the requested search mode"""
+        if search_mode == "keyword":
+            return self.vector_store.keyword_search_with_score(query=query, k=top_k, filter=filter)
+        if search_mode == "hybrid":
+            return self.vector_store.hybrid_search_with_score(query=query, k=top_k, filter=filter)
+        if search_mode == "semantic":
+            return self.vector_store.similarity_search_with_score(query=query, k=top_k, filter=filter)
+        raise ValueError(f"Unsupported search mode: {search_mode}")
+    
     async def _generate_answer(self, query: str, docs: List[Document]) -> str:
         """Generate answer using LLM and retrieved documents"""
         
         # Prepare context from documents
         context = self._format_context(docs)
         
-        # Create prompt
+        # Generate response
+        if isinstance(self.llm, MockLLM):
+            return await self.llm.agenerate(query, context)
+        else:
+            response = await self.llm.ainvoke(self._prompt_messages(query, context))
+            return response.content
+    
+    def _prompt_messages(self, query: str, context: str):
+        """Chat messages asking the LLM to answer from the document context"""
         prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are a helpful AI assistant for government officers managing a smart city.
 Use the following document excerpts to answer the user's question accurately and concisely.
@@ -122,14 +324,7 @@ Context from documents:
 {context}"""),
             ("human", "{query}")
         ])
-        
-        # Generate response
-        if isinstance(self.llm, MockLLM):
-            return self.llm.generate(query, context)
-        else:
-            messages = prompt_template.format_messages(query=query, context=context)
-            response = await self.llm.ainvoke(messages)
-            return response.content
+        return prompt_template.format_messages(query=query, context=context)
     
     def _format_context(self, docs: List[Document]) -> str:
         """Format documents into context string"""
@@ -138,6 +333,8 @@ Context from documents:
             source = doc.metadata.get("source", "Unknown")
             page = doc.metadata.get("page", "")
             page_str = f" (Page {page})" if page else ""
+            if doc.metadata.get("start_line"):
+                page_str += f" (Lines {doc.metadata['start_line']}-{doc.metadata.get('end_line')})"
             
             context_parts.append(
                 f"[Source {i}: {source}{page_str}]\n{doc.page_content}\n"
@@ -158,12 +355,20 @@ Context from documents:
                 id=doc.metadata.get("doc_id", "unknown"),
                 title=doc.metadata.get("source", "Unknown Document"),
                 page=doc.metadata.get("page"),
+                start_line=doc.metadata.get("start_line"),
+                end_line=doc.metadata.get("end_line"),
                 snippet=snippet,
                 score=float(score) if score else None
             ))
         
         return sources
     
+    def _confidence(self, scores: List[float], search_mode: str) -> float:
+        """Confidence of an answer (based on retrieval scores)"""
+        if search_mode == "semantic":
+            return self._calculate_confidence(scores)
+        return round(sum(scores) / len(scores), 2)
+    
     def _calculate_confidence(self, scores: List[float]) -> float:
         """Calculate confidence score from retrieval scores"""
         if not scores:
@@ -189,6 +394,27 @@ Context from documents:
 class MockLLM:
     """Mock LLM for development without API key"""
     
+    def __init__(self, token_delay: Optional[float] = None):
+        """
+        Args:
+            token_delay: Seconds spent per generated token (MOCK_LLM_TOKEN_DELAY),
+                to simulate generation latency in benchmarks
+        """
+        self.token_delay = (
+            token_delay if token_delay is not None else float(os.getenv("MOCK_LLM_TOKEN_DELAY", "0"))
+        )
+    
+    async def astream(self, query: str, context: str) -> AsyncIterator[str]:
+        """Generate the mock response a word at a time"""
+        for token in MOCK_TOKEN.findall(self.generate(query, context)):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
+    
+    async def agenerate(self, query: str, context: str) -> str:
+        """Generate the whole mock response, taking as long as streaming it would"""
+        return "".join([token async for token in self.astream(query, context)])
+    
     def generate(self, query: str, context: str) -> str:
         """Generate mock response based on query keywords"""
         query_lower = query.lower()
@@ -0,0 +1,347 @@
+"""
+Repository Walker for CodeMind
+Finds indexable files with os.scandir, honouring .gitignore and .gitattributes, and reads them on a thread pool
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Git treats a file as binary if a NUL byte appears in its first 8000 bytes
+SNIFF_BYTES = 8000
+
+# Files handed to a reader thread per task
+READ_BATCH = 16
+
+# .gitattributes settings that mark a file as not worth indexing
+SKIP_ATTRIBUTES = {
+    "binary": True,
+    "text": False,
+    "diff": False,
+    "linguist-generated": True,
+    "linguist-vendored": True,
+}
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob (without leading ! or trailing /) to a regex"""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex, i = "", 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            regex += "[" + ("^" + body[1:] if body.startswith("!") else body) + "]"
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+
+    # Patterns without a slash match at any depth below their directory
+    return regex if anchored else "(?:.*/)?" + regex
+
+
+class _Rule:
+    __slots__ = ("base", "pattern", "regex", "negate", "dir_only", "attributes")
+
+    def __init__(self, base: str, pattern: str, negate: bool = False, dir_only: bool = False,
+                 attributes: Optional[Dict[str, object]] = None):
+        self.base = base
+        self.pattern = pattern
+        self.regex = re.compile(f"(?:{pattern})\\Z")
+        self.negate = negate
+        self.dir_only = dir_only
+        self.attributes = attributes
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not path.startswith(self.base + "/"):
+                return False
+            path = path[len(self.base) + 1:]
+        return self.regex.match(path) is not None
+
+
+def parse_gitignore(lines: Iterable[str], base: str = "") -> List[_Rule]:
+    """Rules of a .gitignore in directory base (relative to the root)"""
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if line:
+            rules.append(_Rule(base, _glob_to_regex(line), negate=negate, dir_only=dir_only))
+    return rules
+
+
+def parse_gitattributes(lines: Iterable[str], base: str = "") -> List[_Rule]:
+    """Rules of a .gitattributes in directory base, with their attribute settings"""
+    rules = []
+    for line in lines:
+        parts = line.split()
+        if not parts or parts[0].startswith("#") or parts[0].startswith("!"):
+            continue
+
+        attributes: Dict[str, object] = {}
+        for item in parts[1:]:
+            if item == "binary":
+                # Built-in macro for -diff -merge -text
+                attributes.update({"binary": True, "diff": False, "text": False})
+            elif item.startswith("-"):
+                attributes[item[1:]] = False
+            elif item.startswith("!"):
+                attributes[item[1:]] = None
+            elif "=" in item:
+                name, value = item.split("=", 1)
+                attributes[name] = value.lower() not in ("false", "0")
+            else:
+                attributes[item] = True
+        rules.append(_Rule(base, _glob_to_regex(parts[0].rstrip("/")), attributes=attributes))
+    return rules
+
+
+def is_binary(data: bytes) -> bool:
+    """Sniff content the way git does: a NUL byte near the start means binary"""
+    return b"\0" in data[:SNIFF_BYTES]
+
+
+class RepoWalker:
+    """
+    Walks a source tree for indexable files
+
+    Directories are listed with os.scandir, so type checks come from the
+    directory entry and each file is stat'ed once. Ignored directories,
+    .gitignore rules (including nested files and negations) and
+    .gitattributes marking files binary, generated or vendored are applied
+    during the walk. File contents are read on a thread pool and yielded as
+    they arrive; files that sniff as binary are dropped.
+    """
+
+    def __init__(
+        self,
+        extensions: Set[str],
+        ignore_dirs: Set[str],
+        ignore_patterns: Iterable[str] = (),
+        max_file_size: int = 500_000,
+        workers: Optional[int] = None
+    ):
+        """
+        Args:
+            extensions: File suffixes to index
+            ignore_dirs: Directory names never descended into
+            ignore_patterns: gitignore-style patterns applied below every root
+                (lockfiles, minified bundles), overridable by .gitignore
+            max_file_size: Larger files are skipped
+            workers: Reader threads (READ_WORKERS)
+        """
+        self.extensions = extensions
+        self.ignore_dirs = ignore_dirs
+        self.default_rules = self._merge(parse_gitignore(ignore_patterns))
+        self.max_file_size = max_file_size
+        self.workers = workers or int(os.getenv("READ_WORKERS", "8"))
+
+    def _read_rules(self, directory: str, base: str) -> Tuple[List[_Rule], List[_Rule]]:
+        """(.gitignore rules, .gitattributes rules) defined in one directory"""
+        rules = []
+        for name, parse in ((".gitignore", parse_gitignore), (".gitattributes", parse_gitattributes)):
+            try:
+                with open(os.path.join(directory, name), "r", encoding="utf-8", errors="ignore") as f:
+                    rules.append(parse(f, base))
+            except OSError:
+                rules.append([])
+        return rules[0], rules[1]
+
+    @staticmethod
+    def _merge(rules: List[_Rule]) -> List[_Rule]:
+        """Fold runs of ignore rules with the same base and flags into one regex"""
+        merged: List[_Rule] = []
+        for rule in rules:
+            last = merged[-1] if merged else None
+            if last and (last.base, last.negate, last.dir_only) == (rule.base, rule.negate, rule.dir_only):
+                merged[-1] = _Rule(rule.base, f"(?:{last.pattern})|(?:{rule.pattern})", rule.negate, rule.dir_only)
+            else:
+                merged.append(rule)
+        return merged
+
+    @staticmethod
+    def _ignored(rules: List[_Rule], path: str, is_dir: bool) -> bool:
+        # The last matching rule wins, deeper files after shallower ones
+        for rule in reversed(rules):
+            if rule.matches(path, is_dir):
+                return not rule.negate
+        return False
+
+    @staticmethod
+    def _skipped_by_attributes(rules: List[_Rule], path: str) -> bool:
+        if not rules:
+            return False
+        settings: Dict[str, object] = {}
+        for rule in rules:
+            if rule.matches(path, False):
+                settings.update(rule.attributes)
+        return any(settings.get(name) is value for name, value in SKIP_ATTRIBUTES.items())
+
+    def _wanted(self, name: str, size: int) -> bool:
+        return os.path.splitext(name)[1] in self.extensions and size <= self.max_file_size
+
+    def iter_files(self, root: str) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Yield (path, stat) for every indexable file under root, without reading it"""
+        ignore, attributes = self._read_rules(root, "")
+        stack = [(root, "", self._merge(self.default_rules + ignore), attributes)]
+
+        while stack:
+            directory, base, ignore_rules, attribute_rules = stack.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError as e:
+                logger.warning(f"Cannot list {directory}: {e}")
+                continue
+
+            subdirs = []
+            for entry in entries:
+                path = f"{base}/{entry.name}" if base else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self.ignore_dirs and not self._ignored(ignore_rules, path, True):
+                            subdirs.append((entry.path, path))
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if os.path.splitext(entry.name)[1] not in self.extensions:
+                        continue
+                    if self._ignored(ignore_rules, path, False) or self._skipped_by_attributes(attribute_rules, path):
+                        continue
+                    file_stat = entry.stat()
+                except OSError:
+                    continue
+
+                if file_stat.st_size <= self.max_file_size:
+                    yield Path(entry.path), file_stat
+
+            # Depth-first, in name order
+            for subdir, path in reversed(subdirs):
+                ignore, attributes = self._read_rules(subdir, path)
+                if ignore:
+                    ignore = self._merge(ignore_rules + ignore)
+                stack.append((subdir, path, ignore or ignore_rules, attribute_rules + attributes))
+
+    def filter_paths(self, root: str, paths: Iterable[str]) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Yield (path, stat) for the given relative paths that exist and would be indexed"""
+        rules_cache: Dict[str, Tuple[List[_Rule], List[_Rule]]] = {}
+
+        def rules_for(base: str) -> Tuple[List[_Rule], List[_Rule]]:
+            if base not in rules_cache:
+                ignore, attributes = self._read_rules(os.path.join(root, base), base)
+                if base:
+                    parent_ignore, parent_attributes = rules_for(base.rpartition("/")[0])
+                    ignore, attributes = parent_ignore + ignore, parent_attributes + attributes
+                else:
+                    ignore = self.default_rules + ignore
+                rules_cache[base] = (self._merge(ignore), attributes)
+            return rules_cache[base]
+
+        for path in paths:
+            path = path.replace(os.sep, "/")
+            parts = path.split("/")
+            if any(part in self.ignore_dirs for part in parts[:-1]):
+                continue
+            if os.path.splitext(parts[-1])[1] not in self.extensions:
+                continue
+
+            # A file under an ignored directory is ignored whatever its own rules say
+            ancestors = ["/".join(parts[:i]) for i in range(1, len(parts))]
+            if any(self._ignored(rules_for(a.rpartition("/")[0])[0], a, True) for a in ancestors):
+                continue
+            ignore_rules, attribute_rules = rules_for("/".join(parts[:-1]))
+            if self._ignored(ignore_rules, path, False) or self._skipped_by_attributes(attribute_rules, path):
+                continue
+
+            file_path = Path(root) / path
+            try:
+                file_stat = file_path.stat()
+            except OSError:
+                continue
+            if self._wanted(parts[-1], file_stat.st_size):
+                yield file_path, file_stat
+
+    def read_files(
+        self,
+        files: Iterable[Tuple[Path, os.stat_result]]
+    ) -> Iterator[Tuple[Path, os.stat_result, bytes]]:
+        """
+        Read files on the thread pool, yielding (path, stat, content) as reads finish
+
+        Files go to the threads in small batches, at most two batches per
+        thread in flight, so a slow walk and a slow consumer both keep memory
+        bounded. Binary and unreadable files are skipped.
+        """
+        def batches():
+            batch = []
+            for item in files:
+                batch.append(item)
+                if len(batch) >= READ_BATCH:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        tasks = batches()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="repo-read") as executor:
+            pending = set()
+            exhausted = False
+            while not exhausted or pending:
+                while not exhausted and len(pending) < self.workers * 2:
+                    batch = next(tasks, None)
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        pending.add(executor.submit(_read_batch, batch))
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+
+def _read_batch(batch: List[Tuple[Path, os.stat_result]]) -> List[Tuple[Path, os.stat_result, bytes]]:
+    results = []
+    for file_path, file_stat in batch:
+        try:
+            with open(file_path, "rb") as f:
+                head = f.read(SNIFF_BYTES)
+                if not is_binary(head):
+                    results.append((file_path, file_stat, head + f.read()))
+        except OSError as e:
+            logger.warning(f"Error reading {file_path}: {e}")
+    return results
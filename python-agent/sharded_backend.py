@@ -0,0 +1,250 @@
+"""
+Sharded Vector Backend for CodeMind
+Routes documents to per-repo or per-source shards and fans searches out in parallel
+"""
+
+import heapq
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from pathlib import Path
+from langchain_core.documents import Document
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shard for documents without a routing key
+DEFAULT_SHARD_KEY = "_default"
+
+
+class ShardedBackend:
+    """
+    Vector backend made of independent shards behind a routing table
+
+    Each shard is a full backend (a Chroma collection or a flat index
+    directory) created on demand by the factory. The routing table maps shard
+    keys (a repo URL or source path) to shard names and document IDs to
+    shards, so deletes and searches only touch the shards involved and a
+    removed repo is dropped as a whole instead of deleted row by row.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Any],
+        routing_db_path: str,
+        shard_by: str = "repo_url",
+        max_workers: int = 8
+    ):
+        """
+        Args:
+            factory: Builds (or opens) the backend for a shard name
+            routing_db_path: Path to the SQLite routing table
+            shard_by: Metadata field holding the shard key
+            max_workers: Threads used for fan-out searches
+        """
+        self.factory = factory
+        self.routing_db_path = routing_db_path
+        self.shard_by = shard_by
+        self._shards: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard-search")
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite routing table with schema"""
+        Path(self.routing_db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS shards (
+                    name TEXT PRIMARY KEY,
+                    key TEXT UNIQUE NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS routes (
+                    id TEXT PRIMARY KEY,
+                    shard TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_routes_shard ON routes(shard)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.routing_db_path, timeout=30)
+
+    @staticmethod
+    def shard_name(key: str) -> str:
+        """Stable shard name that is safe as a collection or directory name"""
+        return "shard_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def _shard_key(self, document: Document) -> str:
+        value = (document.metadata or {}).get(self.shard_by)
+        return str(value) if value else DEFAULT_SHARD_KEY
+
+    def _backend(self, name: str):
+        with self._lock:
+            if name not in self._shards:
+                self._shards[name] = self.factory(name)
+            return self._shards[name]
+
+    def list_shards(self) -> Dict[str, str]:
+        """Map of shard key -> shard name"""
+        conn = self._connect()
+        try:
+            return dict(conn.execute('SELECT key, name FROM shards').fetchall())
+        finally:
+            conn.close()
+
+    def add(self, ids: List[str], embeddings: List[List[float]], documents: List[Document]):
+        if not ids:
+            return
+
+        groups: Dict[str, Tuple[str, list]] = {}
+        for doc_id, embedding, doc in zip(ids, embeddings, documents):
+            key = self._shard_key(doc)
+            name = self.shard_name(key)
+            groups.setdefault(name, (key, []))[1].append((doc_id, embedding, doc))
+
+        conn = self._connect()
+        try:
+            # An ID moving to another shard must not stay behind in the old one
+            target = {doc_id: name for name, (_, rows) in groups.items() for doc_id, _, _ in rows}
+            moved: Dict[str, List[str]] = {}
+            for doc_id, shard in self._routes(conn, ids):
+                if shard != target[doc_id]:
+                    moved.setdefault(shard, []).append(doc_id)
+
+            now = datetime.now().isoformat()
+            for name, (key, rows) in groups.items():
+                conn.execute(
+                    'INSERT OR IGNORE INTO shards (name, key, created_at) VALUES (?, ?, ?)',
+                    (name, key, now)
+                )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO routes (id, shard) VALUES (?, ?)',
+                    [(doc_id, name) for doc_id, _, _ in rows]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+        for name, shard_ids in moved.items():
+            self._backend(name).delete(shard_ids)
+        for name, (_, rows) in groups.items():
+            shard_ids, shard_embeddings, shard_docs = map(list, zip(*rows))
+            self._backend(name).add(shard_ids, shard_embeddings, shard_docs)
+
+    def _target_shards(self, filter: Optional[Dict[str, Any]]) -> List[str]:
+        """Shards a filter can match; a condition on the shard key prunes the rest"""
+        condition = (filter or {}).get(self.shard_by)
+        if isinstance(condition, dict) and "$eq" in condition:
+            keys = [condition["$eq"]]
+        elif isinstance(condition, dict) and "$in" in condition:
+            keys = list(condition["$in"])
+        elif condition is not None and not isinstance(condition, (dict, list)):
+            keys = [condition]
+        else:
+            return list(self.list_shards().values())
+
+        known = set(self.list_shards().values())
+        return [name for name in (self.shard_name(str(key)) for key in keys) if name in known]
+
+    def search(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Search the shards a filter touches concurrently and merge their top-k
+
+        Returns:
+            List of (document, distance) tuples, closest first
+        """
+        shards = self._target_shards(filter)
+        if not shards:
+            return []
+
+        futures = [
+            self._executor.submit(self._backend(name).search, embedding, k, filter)
+            for name in shards
+        ]
+
+        # Each shard returns its own top-k already sorted; merge lazily by distance
+        merged = heapq.merge(*(future.result() for future in futures), key=lambda item: item[1])
+        return [result for _, result in zip(range(k), merged)]
+
+    @staticmethod
+    def _routes(conn: sqlite3.Connection, ids: List[str]) -> List[Tuple[str, str]]:
+        """(id, shard) pairs for IDs already routed"""
+        routes = []
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            routes.extend(conn.execute(
+                f'SELECT id, shard FROM routes WHERE id IN ({placeholders})', batch
+            ).fetchall())
+        return routes
+
+    def delete(self, ids: List[str]):
+        if not ids:
+            return
+
+        conn = self._connect()
+        try:
+            by_shard: Dict[str, List[str]] = {}
+            for doc_id, shard in self._routes(conn, ids):
+                by_shard.setdefault(shard, []).append(doc_id)
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                conn.execute(f'DELETE FROM routes WHERE id IN ({placeholders})', batch)
+            conn.commit()
+        finally:
+            conn.close()
+
+        for name, shard_ids in by_shard.items():
+            self._backend(name).delete(shard_ids)
+
+    def drop_shard(self, key: str) -> List[str]:
+        """
+        Remove a whole shard (e.g. a deleted repo) without touching the others
+
+        Args:
+            key: Shard key, such as the repo URL
+
+        Returns:
+            IDs of the documents that were in the shard
+        """
+        name = self.shard_name(key)
+        conn = self._connect()
+        try:
+            ids = [row[0] for row in conn.execute('SELECT id FROM routes WHERE shard = ?', (name,))]
+            conn.execute('DELETE FROM routes WHERE shard = ?', (name,))
+            conn.execute('DELETE FROM shards WHERE name = ?', (name,))
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._backend(name).drop()
+        with self._lock:
+            self._shards.pop(name, None)
+
+        logger.info(f"Dropped shard {name} ({key}) with {len(ids)} documents")
+        return ids
+
+    def count(self) -> int:
+        return sum(self._backend(name).count() for name in self.list_shards().values())
+
+    def reset(self):
+        for key in list(self.list_shards()):
+            self.drop_shard(key)
@@ -87,3 +87,30 @@ def test_extract_days():
     assert agent._extract_days("past 7 days") == 7
     assert agent._extract_days("complaints in the last 14 days") == 14
     assert agent._extract_days("all complaints") is None
+
+
+@pytest.mark.asyncio
+async def test_compliance_stream_matches_framed_answer():
+    """Test streamed compliance answers carry the same framing as process()"""
+    from models import QueryResponse
+    
+    answer = "Permits are mandatory for roadside stalls."
+    
+    async def stream_query(query, top_k=4, filter=None, search_mode="semantic"):
+        yield "sources", {"sources": []}
+        for token in ("Permits are ", "mandatory for ", "roadside stalls."):
+            yield "token", {"text": token}
+        yield "done", {"agent_used": "document", "confidence": 0.9, "fallback": False, "cached": False}
+    
+    agent = ComplianceAgent()
+    agent.rag_pipeline = Mock()
+    agent.rag_pipeline.stream_query = stream_query
+    agent.rag_pipeline.query = AsyncMock(return_value=QueryResponse(
+        answer=answer, sources=[], agent_used="document", confidence=0.9
+    ))
+    
+    events = [event async for event in agent.stream("Is this compliant?", {})]
+    processed = await agent.process("Is this compliant?", {})
+    
+    assert "".join(data["text"] for name, data in events if name == "token") == processed.answer
+    assert events[-1] == ("done", {"agent": "compliance", "confidence": 0.9, "fallback": False, "cached": False})
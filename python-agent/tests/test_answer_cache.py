@@ -0,0 +1,78 @@
+"""
+Tests for the answer cache
+"""
+from answer_cache import AnswerCache, normalize_query
+
+
+def lookup(cache, query, generation=1, **kwargs):
+    return cache.get(query, kwargs.get("filters"), kwargs.get("top_k", 4), "hybrid", "mock", generation,
+                     embed=kwargs.get("embed"))
+
+
+def store(cache, query, answer, generation=1, **kwargs):
+    cache.put(query, kwargs.get("filters"), kwargs.get("top_k", 4), "hybrid", "mock", generation, answer,
+              embed=kwargs.get("embed"))
+
+
+def test_normalize_query():
+    assert normalize_query("  Pothole   REPAIR timeline? ") == "pothole repair timeline"
+
+
+def test_exact_hits_are_scoped_by_filters_and_top_k():
+    """Test answers are only shared by queries with the same parameters"""
+    cache = AnswerCache()
+    store(cache, "Pothole repair timeline?", "7 days", filters={"ward": "1"})
+
+    assert lookup(cache, "pothole repair timeline", filters={"ward": "1"}) == "7 days"
+    assert lookup(cache, "pothole repair timeline", filters={"ward": "2"}) is None
+    assert lookup(cache, "pothole repair timeline", filters={"ward": "1"}, top_k=8) is None
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_index_change_drops_answers():
+    """Test a new generation invalidates everything, and late puts from the old one are ignored"""
+    cache = AnswerCache()
+    store(cache, "q", "old answer", generation=1)
+
+    assert lookup(cache, "q", generation=2) is None
+    store(cache, "q", "late answer", generation=1)
+    assert lookup(cache, "q", generation=2) is None
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_similarity_lookup_serves_paraphrases():
+    """Test a query close enough to a cached one is served from it"""
+    vectors = {
+        "pothole repair timeline": [1.0, 0.0, 0.0],
+        "how long do pothole repairs take": [0.96, 0.28, 0.0],
+        "water quality standards": [0.0, 0.0, 1.0],
+    }
+    calls = []
+
+    def embed(query):
+        calls.append(query)
+        return vectors[query]
+
+    cache = AnswerCache(similarity_threshold=0.9)
+    store(cache, "pothole repair timeline", "7 days", embed=embed)
+
+    assert lookup(cache, "how long do pothole repairs take", embed=embed) == "7 days"
+    assert lookup(cache, "water quality standards", embed=embed) is None
+    assert lookup(cache, "how long do pothole repairs take", top_k=2, embed=embed) is None
+    # Exact hits and lookups without candidates in scope never embed
+    assert lookup(cache, "pothole repair timeline", embed=embed) == "7 days"
+    assert len(calls) == 3
+    assert cache.get_stats()["similar_hits"] == 1
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = AnswerCache(max_entries=2, ttl_seconds=10)
+    for query in ("a", "b", "c"):
+        store(cache, query, query.upper())
+    assert lookup(cache, "a") is None
+    assert lookup(cache, "c") == "C"
+
+    import answer_cache
+    now = answer_cache.time.monotonic()
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now + 11)
+    assert lookup(cache, "c") is None
@@ -0,0 +1,92 @@
+"""
+Tests for the definition-aware code chunker
+"""
+import textwrap
+
+from codemind_text import CodeChunker
+
+
+def function(name, lines=12):
+    body = "".join(f"    value_{i} = compute_{i}(request, '{name}')\n" for i in range(lines))
+    return f"# Handler for {name}\ndef {name}(request):\n{body}    return value_0\n"
+
+
+def assert_lines_match(text, chunks):
+    lines = text.splitlines()
+    for chunk, start, end in chunks:
+        assert chunk == "\n".join(lines[start - 1:end])
+
+
+def test_python_functions_are_not_cut():
+    """Test every chunk boundary falls between top-level definitions"""
+    source = "import os\n\n\n" + "\n\n".join(function(f"handler_{n}") for n in range(12))
+    chunker = CodeChunker(chunk_size=1200)
+
+    chunks = chunker.split_text(source, ".py")
+
+    assert_lines_match(source, chunks)
+    for chunk, _, _ in chunks:
+        assert chunk.count("def ") == chunk.count("    return value_0")
+    # Comments stay with the function below them
+    assert all(chunk.startswith("# Handler for") for chunk, _, _ in chunks[1:])
+
+
+def test_line_numbers_ignore_non_newline_breaks():
+    """Test form feeds and other str.splitlines breaks do not shift line numbers"""
+    source = '"""Module\x0cdocstring\u2028with breaks"""\n\n\n' + "\n\n".join(
+        function(f"handler_{n}") for n in range(6)
+    )
+    chunker = CodeChunker(chunk_size=800)
+
+    chunks = chunker.split_text(source, ".py")
+
+    lines = source.split("\n")
+    for chunk, start, end in chunks:
+        assert chunk == "\n".join(lines[start - 1:end])
+        assert chunk.count("def ") == chunk.count("    return value_0")
+
+
+def test_oversized_class_is_split_into_methods():
+    """Test a class that does not fit is chunked at method boundaries"""
+    methods = "\n".join(textwrap.indent(function(f"method_{n}"), "    ") for n in range(6))
+    source = f"class Service:\n    \"\"\"Service docstring\"\"\"\n\n{methods}"
+    chunker = CodeChunker(chunk_size=1000)
+
+    chunks = chunker.split_text(source, ".py")
+
+    assert len(chunks) > 1
+    assert_lines_match(source, chunks)
+    assert chunks[0][0].startswith("class Service:")
+    for chunk, _, _ in chunks[1:]:
+        assert chunk.lstrip().startswith("# Handler for")
+
+
+def test_brace_language_splits_on_blocks():
+    """Test JavaScript is split at top-level blocks, ignoring braces in strings"""
+    blocks = [
+        f"function handler{n}(req) {{\n"
+        + "".join(f"  const v{i} = compute('{{', req, {i});\n" for i in range(15))
+        + "  return v0;\n}\n"
+        for n in range(6)
+    ]
+    source = "\n".join(blocks)
+    chunker = CodeChunker(chunk_size=800)
+
+    chunks = chunker.split_text(source, ".js")
+
+    assert_lines_match(source, chunks)
+    for chunk, _, _ in chunks:
+        assert chunk.startswith("function handler") and chunk.endswith("}")
+
+
+def test_fewer_chunks_than_prose_splitter():
+    """Test code yields fewer chunks than the overlapping prose splitter"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    source = "\n\n".join(function(f"handler_{n}") for n in range(40))
+    prose = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_text(source)
+
+    chunks = CodeChunker(chunk_size=1500).split_text(source, ".py")
+
+    assert len(chunks) < len(prose)
+    assert chunks[-1][2] == len(source.splitlines())
@@ -0,0 +1,129 @@
+"""
+Tests for the near-duplicate index
+"""
+import pytest
+from langchain_core.documents import Document
+
+from dedup_index import DedupIndex, simhash
+from embedding_pipeline import EmbeddingPipeline
+
+
+# A chunk-sized block of boilerplate, about 200 words
+LICENSE = "\n".join(
+    f"# Section {n}: the licensor grants permission to use copy modify merge and distribute part {n * 3}"
+    for n in range(12)
+)
+
+
+def doc(text, page=1, source="a.py"):
+    return Document(page_content=text, metadata={"source": source, "page": page})
+
+
+def test_simhash_is_close_for_near_duplicates():
+    """Test a small edit moves few fingerprint bits and unrelated text moves many"""
+    edited = LICENSE.replace("part 6", "part 7")
+    unrelated = " ".join(f"token_{i} value_{i * 7}" for i in range(40))
+
+    assert bin(simhash(LICENSE) ^ simhash(edited)).count("1") <= 3
+    assert bin(simhash(LICENSE) ^ simhash(unrelated)).count("1") > 3
+    assert simhash("too short", min_tokens=20) is None
+
+
+def test_claim_links_duplicates_to_canonical(tmp_path):
+    """Test duplicates within a batch and across instances resolve to the first chunk"""
+    index = DedupIndex(str(tmp_path / "dedup.db"), max_distance=3, min_tokens=20)
+
+    canonical = index.claim(["a", "b", "c"], [doc(LICENSE), doc(LICENSE, 2), doc("x = 1")])
+    assert canonical == [None, "a", None]
+    assert index.count() == 1
+
+    reopened = DedupIndex(str(tmp_path / "dedup.db"), max_distance=3, min_tokens=20)
+    assert reopened.claim(["d"], [doc(LICENSE, 4)]) == ["a"]
+    assert [m["page"] for m in reopened.duplicates_of("a")] == [2, 4]
+
+
+def test_claim_only_links_within_scope(tmp_path):
+    """Test chunks that differ in a filterable field are never linked"""
+    index = DedupIndex(str(tmp_path / "dedup.db"), max_distance=3, min_tokens=20)
+    docs = [Document(page_content=LICENSE, metadata={"source": "sop.txt", "ward": ward})
+            for ward in ("Ward 1", "Ward 2", "Ward 1")]
+
+    assert index.claim(["a", "b", "c"], docs) == [None, None, "a"]
+    # Files are a scope too: the same header in another file is kept
+    assert index.claim(["d"], [Document(page_content=LICENSE, metadata={"source": "other.txt", "ward": "Ward 1"})]) == [None]
+
+
+def test_release_promotes_first_duplicate(tmp_path):
+    """Test a released canonical chunk hands its links to its first duplicate"""
+    index = DedupIndex(str(tmp_path / "dedup.db"), max_distance=3, min_tokens=20)
+    index.claim(["a", "b", "c"], [doc(LICENSE), doc(LICENSE, 2), doc(LICENSE, 3)])
+
+    promoted_ids, promoted = index.release(["a"])
+
+    assert promoted_ids == ["b"]
+    assert promoted[0].page_content == LICENSE and promoted[0].metadata == {"source": "a.py", "page": 2}
+    assert index.duplicates_of("a") == []
+    assert [m["page"] for m in index.duplicates_of("b")] == [3]
+    assert index.claim(["d"], [doc(LICENSE, 4)]) == ["b"]
+
+
+def test_release_forgets_linked_duplicates(tmp_path):
+    """Test released duplicates are not promoted and promote=False drops the links"""
+    index = DedupIndex(str(tmp_path / "dedup.db"), max_distance=3, min_tokens=20)
+    index.claim(["a", "b", "c"], [doc(LICENSE), doc(LICENSE, 2), doc(LICENSE, 3)])
+
+    assert index.release(["a", "b"]) == (["c"], [doc(LICENSE, 3)])
+    assert index.release(["c"], promote=False) == ([], [])
+    assert index.count() == 0
+    assert index.claim(["e"], [doc(LICENSE)]) == [None]
+
+
+class DedupStore:
+    def __init__(self, db_path):
+        self.dedup_index = DedupIndex(db_path, max_distance=3, min_tokens=20)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+    def add_embeddings(self, documents, embeddings, ids=None):
+        return ids
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_duplicates(tmp_path):
+    """Test duplicate chunks are neither embedded nor stored"""
+    store = DedupStore(str(tmp_path / "dedup.db"))
+    # Only whitespace differs, so the IDs differ but the fingerprints do not
+    docs = [doc(LICENSE + "\n" * n, n) for n in range(5)] + [doc(f"unique chunk {n}") for n in range(3)]
+
+    result = await EmbeddingPipeline(store, batch_size=3, concurrency=2, max_retries=0).run(docs)
+
+    assert result["chunk_count"] == 4
+    assert result["duplicates_skipped"] == 4
+    assert set(result["linked"]) == {1, 2, 3, 4}
+    assert set(result["linked"].values()) == {result["ids"][0]}
+    assert len(result["chunk_ids"]) == len(docs)
+    assert len(store.embedded) == 4
+
+
+@pytest.mark.asyncio
+async def test_deleted_canonical_chunk_promotes_its_duplicate(tmp_path, monkeypatch):
+    """Test deleting a stored chunk stores its linked duplicate, which stays searchable"""
+    from vector_store import VectorStore
+
+    monkeypatch.setenv("DEDUP_ENABLED", "true")
+    store = VectorStore(persist_directory=str(tmp_path / "index"), backend="flat")
+    docs = [doc(LICENSE, 1), doc(LICENSE + "\n", 2)]
+
+    result = await EmbeddingPipeline(store, max_retries=0).run(docs)
+    canonical, duplicate = result["chunk_ids"]
+    assert result["linked"] == {1: canonical}
+    assert store.existing_ids([canonical, duplicate]) == {canonical}
+
+    store.delete([canonical])
+
+    assert store.existing_ids([canonical, duplicate]) == {duplicate}
+    results = store.keyword_search_with_score("licensor permission", k=5, filter={"page": 2})
+    assert [doc.metadata["page"] for doc, _ in results] == [2]
@@ -0,0 +1,56 @@
+"""
+Tests for format-specific text extraction
+"""
+import tempfile
+from io import BytesIO
+
+import pytest
+from docx import Document as DocxDocument
+
+from document_parsers import extract_docx
+
+
+def make_docx():
+    doc = DocxDocument()
+    doc.sections[0].header.paragraphs[0].text = "Road Maintenance SOP"
+    doc.sections[0].footer.paragraphs[0].text = "Page footer - internal"
+    doc.add_paragraph("Introduction to pothole repairs.")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Step"
+    table.cell(0, 1).text = "Deadline"
+    table.cell(1, 0).text = "Repair pothole"
+    table.cell(1, 1).text = "7 business days"
+    doc.add_paragraph("Escalate to the ward officer if late.")
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_extract_docx_keeps_tables_headers_and_order(monkeypatch):
+    """Test headers, body paragraphs, tables and footers come out in order"""
+    buffer = make_docx()
+
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError("temporary file created")
+
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", no_temp_files)
+    monkeypatch.setattr(tempfile, "mkstemp", no_temp_files)
+
+    lines = [line for line in extract_docx(buffer).split("\n") if line]
+
+    assert lines == [
+        "Road Maintenance SOP",
+        "Introduction to pothole repairs.",
+        "Step | Deadline",
+        "Repair pothole | 7 business days",
+        "Escalate to the ward officer if late.",
+        "Page footer - internal",
+    ]
+
+
+def test_extract_docx_rejects_non_zip():
+    """Test a file that is not a DOCX package raises a clear error"""
+    with pytest.raises(ValueError, match="Not a DOCX file"):
+        extract_docx(BytesIO(b"plain text pretending to be docx"))
@@ -0,0 +1,100 @@
+"""
+Tests for the embedding caches
+"""
+import pytest
+
+from embedding_cache import CachedEmbeddings, QueryEmbeddingCache
+
+
+class CountingEmbeddings:
+    """Embeddings stub that records which texts were embedded"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embedding_cache.db")
+
+
+def test_cache_hits_skip_model_calls(cache_path):
+    """Test repeated and whitespace-variant chunks are served from cache"""
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, "test-model", cache_path)
+
+    first = cache.embed_documents(["def foo():\n    return 1", "hello world"])
+    second = cache.embed_documents(["def foo():  \n    return 1", "hello world", "new chunk"])
+
+    assert model.embedded == ["def foo():\n    return 1", "hello world", "new chunk"]
+    assert second[1] == first[1]
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["entries"] == 3
+
+
+def test_cache_persists_across_instances(cache_path):
+    """Test a fresh process reuses vectors written by a previous one"""
+    CachedEmbeddings(CountingEmbeddings(), "test-model", cache_path).embed_documents(["chunk"])
+
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, "test-model", cache_path)
+    assert cache.embed_documents(["chunk"]) == [[5.0, 1.0]]
+    assert model.embedded == []
+
+    # A different embedding model must not share entries
+    other = CachedEmbeddings(model, "other-model", cache_path)
+    other.embed_documents(["chunk"])
+    assert model.embedded == ["chunk"]
+
+
+def test_cache_evicts_least_recently_used(cache_path):
+    """Test the cache never grows past max_entries"""
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, "test-model", cache_path, max_entries=2)
+
+    cache.embed_documents(["a"])
+    cache.embed_documents(["b"])
+    cache.embed_documents(["a"])
+    cache.embed_documents(["c"])
+
+    assert cache.get_stats()["entries"] == 2
+    model.embedded.clear()
+    cache.embed_documents(["a", "b"])
+    assert model.embedded == ["b"]
+
+
+def test_query_cache_normalizes_and_expires():
+    """Test normalized query keys share entries and expire after the TTL"""
+    model = CountingEmbeddings()
+    cache = QueryEmbeddingCache(ttl_seconds=60)
+
+    cache.get_or_embed("Pothole repair  timeline?", model.embed_query)
+    cache.get_or_embed("pothole repair timeline?", model.embed_query)
+    assert cache.get_stats()["hits"] == 1
+
+    cache.ttl_seconds = 0
+    assert cache.get("pothole repair timeline?") is None
+
+
+def test_query_cache_respects_memory_cap():
+    """Test least recently used vectors are evicted over the memory budget"""
+    cache = QueryEmbeddingCache(max_bytes=3 * (8 + 1))
+
+    for query in ["a", "b", "c"]:
+        cache.put(query, [0.0, 1.0])
+    cache.get("a")
+    cache.put("d", [0.0, 1.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get_stats()["evictions"] == 1
@@ -0,0 +1,138 @@
+"""
+Tests for the batched embedding pipeline
+"""
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from embedding_pipeline import EmbeddingPipeline, chunk_id
+
+
+class FakeStore:
+    """In-memory stand-in for VectorStore that fails the first N embed calls"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.embed_calls = []
+        self.stored = []
+
+    def embed_documents(self, texts):
+        self.embed_calls.append(len(texts))
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("rate limited")
+        return [[float(len(text))] for text in texts]
+
+    def add_embeddings(self, documents, embeddings, ids=None):
+        self.stored.extend(doc.page_content for doc in documents)
+        return ids
+
+
+def make_docs(n):
+    return [Document(page_content=f"chunk-{i}", metadata={"source": "test"}) for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_and_preserves_order():
+    """Test chunks are split into batches and IDs come back in input order"""
+    store = FakeStore()
+    pipeline = EmbeddingPipeline(store, batch_size=4, concurrency=3, max_retries=0)
+
+    result = await pipeline.run(make_docs(10))
+
+    assert sorted(store.embed_calls) == [2, 4, 4]
+    assert result["batches"] == 3
+    assert result["chunk_count"] == 10
+    assert result["ids"] == [chunk_id(doc) for doc in make_docs(10)]
+    assert result["chunks_per_second"] > 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_retries_failed_batches():
+    """Test failed batches are retried before giving up"""
+    store = FakeStore(failures=2)
+    pipeline = EmbeddingPipeline(store, batch_size=8, concurrency=1, max_retries=3, retry_delay=0)
+
+    result = await pipeline.run(make_docs(5))
+
+    assert result["retries"] == 2
+    assert result["chunk_count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_pipeline_raises_after_max_retries():
+    """Test a batch that keeps failing surfaces the error"""
+    store = FakeStore(failures=10)
+    pipeline = EmbeddingPipeline(store, batch_size=8, concurrency=2, max_retries=1, retry_delay=0)
+
+    with pytest.raises(RuntimeError, match="rate limited"):
+        await pipeline.run(make_docs(5))
+
+    assert store.stored == []
+
+
+@pytest.mark.asyncio
+async def test_pipeline_raises_when_workers_die_with_full_queue():
+    """Test the end-of-input sentinels do not block once every worker has failed"""
+    store = FakeStore(failures=100)
+    pipeline = EmbeddingPipeline(store, batch_size=1, concurrency=2, max_retries=0)
+
+    with pytest.raises(RuntimeError, match="rate limited"):
+        await asyncio.wait_for(pipeline.run(make_docs(4)), timeout=10)
+
+    assert store.stored == []
+
+
+@pytest.mark.asyncio
+async def test_pipeline_consumes_async_stream_with_backpressure():
+    """Test an async source is stored incrementally and never runs far ahead"""
+    store = FakeStore()
+    produced = []
+    ahead = []
+
+    async def source():
+        for doc in make_docs(40):
+            produced.append(doc)
+            ahead.append(len(produced) - len(store.stored))
+            yield doc
+
+    pipeline = EmbeddingPipeline(store, batch_size=4, concurrency=2, max_retries=0)
+    result = await pipeline.run(source())
+
+    assert result["ids"] == [chunk_id(doc) for doc in make_docs(40)]
+    # Batch being built + queue + one batch per worker
+    assert max(ahead) <= 4 * (1 + 2 + 2)
+
+
+class StoredSet(FakeStore):
+    """FakeStore that remembers which IDs it holds"""
+
+    def __init__(self):
+        super().__init__()
+        self.ids = set()
+
+    def existing_ids(self, ids, documents=None):
+        return self.ids & set(ids)
+
+    def add_embeddings(self, documents, embeddings, ids=None):
+        self.ids.update(ids)
+        return super().add_embeddings(documents, embeddings, ids)
+
+
+@pytest.mark.asyncio
+async def test_reingest_is_a_no_op():
+    """Test chunk IDs are deterministic and stored chunks are not embedded again"""
+    store = StoredSet()
+    pipeline = EmbeddingPipeline(store, batch_size=4, concurrency=2, max_retries=0)
+
+    first = await pipeline.run(make_docs(6) + make_docs(2))
+    second = await pipeline.run(make_docs(6))
+
+    assert first["chunk_count"] == 6
+    assert first["linked"] == {6: first["ids"][0], 7: first["ids"][1]}
+    assert second["ids"] == first["ids"]
+    assert second["already_stored"] == 6
+    assert store.embed_calls == [4, 2]
+    assert chunk_id(Document(page_content="x", metadata={"source": "a"})) != \
+        chunk_id(Document(page_content="x", metadata={"source": "b"}))
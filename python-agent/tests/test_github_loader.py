@@ -0,0 +1,110 @@
+"""
+Tests for partial, non-blocking repository clones
+"""
+import asyncio
+import subprocess
+import threading
+
+import pytest
+
+import github_loader
+from github_loader import GitHubLoader
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """A bare repository served over file:// with partial clone enabled"""
+    work = tmp_path / "work"
+    files = {
+        ".gitignore": "generated/\n",
+        "README.md": "# Demo\n",
+        "generated/out.py": "# ignored by .gitignore\n",
+        "node_modules/lib/index.js": "module.exports = 1\n",
+        "assets/logo.png": "\x89PNG" + "x" * 2000,
+        "data/huge.json": "[" + "1," * 5000 + "1]\n",
+        **{f"src/mod_{n}.py": f"def handler_{n}():\n    return {n}\n" for n in range(30)},
+    }
+    for name, content in files.items():
+        path = work / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    git(tmp_path, "init", "--quiet", "-b", "main", str(work))
+    git(work, "-c", "user.name=t", "-c", "user.email=t@t", "add", "-A")
+    git(work, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "--quiet", "-m", "initial")
+    bare = tmp_path / "remote.git"
+    git(tmp_path, "clone", "--quiet", "--bare", str(work), str(bare))
+    git(bare, "config", "uploadpack.allowFilter", "true")
+    return f"file://{bare}"
+
+
+@pytest.mark.asyncio
+async def test_partial_clone_skips_large_and_unindexed_blobs(tmp_path, remote):
+    """Test oversized blobs are never fetched and only indexable paths are checked out"""
+    loader = GitHubLoader(max_file_size=5000, cache_dir=str(tmp_path / "cache"))
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticking = asyncio.create_task(ticker())
+    documents = await loader.load_from_url(remote, "main")
+    ticking.cancel()
+
+    sources = sorted(doc.metadata["source"] for doc in documents)
+    assert sources == ["README.md"] + sorted(f"src/mod_{n}.py" for n in range(30))
+    assert ticks > 10
+
+    clone_dir = next((tmp_path / "cache").iterdir())
+    assert not (clone_dir / "assets" / "logo.png").exists()
+    assert not (clone_dir / "node_modules").exists()
+    assert not (clone_dir / "data" / "huge.json").exists()
+    missing = [line for line in git(clone_dir, "rev-list", "--objects", "--missing=print", "HEAD").splitlines()
+               if line.startswith("?")]
+    assert len(missing) == 1
+
+    # A re-sync resets to the fetched tip without fetching the oversized blob
+    _, _, checkout = await loader.sync_clone(remote, "main")
+    assert checkout is None
+    assert not (clone_dir / "data" / "huge.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_files_are_read_while_checkout_continues(tmp_path, remote, monkeypatch):
+    """Test the first batches reach the reader before later batches are checked out"""
+    monkeypatch.setattr(github_loader, "CHECKOUT_BATCH", 2)
+    loader = GitHubLoader(cache_dir=str(tmp_path / "cache"))
+    first_read = threading.Event()
+    checkout_paths = loader._checkout_paths
+    calls = []
+
+    async def gated_checkout(clone_dir, paths):
+        calls.append(len(paths))
+        if len(calls) == 3:
+            # Rules, then the first batch; the reader must get that batch now
+            await asyncio.wait_for(asyncio.to_thread(first_read.wait, 10), 10)
+            assert first_read.is_set()
+        await checkout_paths(clone_dir, paths)
+
+    monkeypatch.setattr(loader, "_checkout_paths", gated_checkout)
+    _, _, checkout = await loader.sync_clone(remote, "main")
+
+    def consume():
+        paths = []
+        for file_path, _ in checkout:
+            paths.append(file_path.name)
+            first_read.set()
+        return paths
+
+    paths = await asyncio.to_thread(consume)
+
+    assert len(paths) == 32
+    assert calls[:3] == [1, 2, 4]
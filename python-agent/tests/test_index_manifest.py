@@ -0,0 +1,209 @@
+"""
+Tests for incremental directory and repository re-indexing
+"""
+import os
+import asyncio
+import subprocess
+
+import pytest
+
+from github_loader import GitHubLoader
+from index_manifest import IndexManifest
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+
+
+class FakeIngester:
+    """Records ingested sources and hands out one chunk ID per file"""
+
+    def __init__(self):
+        self.vector_store = FakeVectorStore()
+        self.ingested = []
+        self.counter = 0
+
+    async def ingest_documents(self, documents, on_progress=None):
+        # Like DocumentIngester, consume the documents off the event loop
+        source_ids = {}
+        for doc in await asyncio.to_thread(list, documents):
+            self.counter += 1
+            self.ingested.append(doc.metadata["source"])
+            source_ids[doc.metadata["source"]] = [f"chunk-{self.counter}"]
+        return {"source_ids": source_ids, "chunk_count": len(source_ids)}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    for name in ("a.py", "b.py", "pkg/c.py"):
+        (root / name).write_text(f"# {name}\nprint('{name}')\n")
+    return root
+
+
+@pytest.mark.asyncio
+async def test_resync_only_touches_changed_files(tmp_path, tree):
+    """Test a re-sync re-embeds changed and added files and deletes removed ones"""
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+    ingester = FakeIngester()
+
+    first = await manifest.sync(str(tree), GitHubLoader(), ingester)
+    assert first["added"] == 3
+    assert sorted(ingester.ingested) == ["a.py", "b.py", os.path.join("pkg", "c.py")]
+
+    retired = manifest.chunk_ids(str(tree), ["a.py", os.path.join("pkg", "c.py")])
+    assert len(retired) == 2
+    ingester.ingested.clear()
+    (tree / "a.py").write_text("# a.py\nprint('changed')\n")
+    (tree / "pkg" / "c.py").unlink()
+    (tree / "d.py").write_text("print('new')\n")
+
+    second = await manifest.sync(str(tree), GitHubLoader(), ingester)
+
+    assert sorted(ingester.ingested) == ["a.py", "d.py"]
+    assert (second["added"], second["changed"], second["removed"], second["unchanged"]) == (1, 1, 1, 1)
+    # Old chunks of a.py and pkg/c.py are gone; b.py's are kept
+    assert sorted(ingester.vector_store.deleted) == sorted(retired)
+    assert set(manifest.entries(str(tree))) == {"a.py", "b.py", "d.py"}
+
+
+@pytest.mark.asyncio
+async def test_touched_file_with_same_content_is_not_reembedded(tmp_path, tree):
+    """Test an mtime-only change is detected by content hash and skipped"""
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+    ingester = FakeIngester()
+    await manifest.sync(str(tree), GitHubLoader(), ingester)
+
+    ingester.ingested.clear()
+    stat = (tree / "b.py").stat()
+    os.utime(tree / "b.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    result = await manifest.sync(str(tree), GitHubLoader(), ingester)
+
+    assert ingester.ingested == []
+    assert result["unchanged"] == 3
+    assert ingester.vector_store.deleted == []
+    assert manifest.entries(str(tree))["b.py"][1] == stat.st_mtime_ns + 5_000_000_000
+
+
+def git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """Bare repository with one commit, plus a work tree for pushing more"""
+    bare = tmp_path / "remote.git"
+    work = tmp_path / "work"
+    git(tmp_path, "init", "--quiet", "--bare", "--initial-branch=main", str(bare))
+    git(tmp_path, "clone", "--quiet", str(bare), str(work))
+    git(work, "checkout", "--quiet", "-b", "main")
+    (work / "src").mkdir()
+    for name in ("app.py", "util.py", "README.md"):
+        (work / ("src" if name.endswith(".py") else ".") / name).write_text(f"# {name}\n")
+    git(work, "add", ".")
+    git(work, "commit", "--quiet", "-m", "initial")
+    git(work, "push", "--quiet", "origin", "main")
+    return f"file://{bare}", work
+
+
+@pytest.mark.asyncio
+async def test_repo_resync_uses_git_diff(tmp_path, remote):
+    """Test a repo re-sync fetches into the cached clone and re-embeds only changed paths"""
+    url, work = remote
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+    loader = GitHubLoader(cache_dir=str(tmp_path / "cache"))
+    ingester = FakeIngester()
+
+    first = await manifest.sync_repo(url, "main", loader, ingester)
+    assert first["added"] == 3 and first["previous_commit"] is None
+
+    (work / "src" / "app.py").write_text("# app.py\nprint('v2')\n")
+    (work / "src" / "util.py").unlink()
+    (work / "docs.md").write_text("# docs\n")
+    git(work, "add", "-A")
+    git(work, "commit", "--quiet", "-m", "second")
+    git(work, "push", "--quiet", "origin", "main")
+
+    ingester.ingested.clear()
+    loader.iter_files = lambda directory: pytest.fail("full tree walk on a diff sync")
+
+    second = await manifest.sync_repo(url, "main", loader, ingester)
+
+    assert second["previous_commit"] == first["commit"]
+    assert second["commit"] == git(work, "rev-parse", "HEAD").strip()
+    assert sorted(ingester.ingested) == ["docs.md", os.path.join("src", "app.py")]
+    assert (second["added"], second["changed"], second["removed"]) == (1, 1, 1)
+    assert set(manifest.entries(f"{url}@main")) == {"README.md", "docs.md", os.path.join("src", "app.py")}
+
+    # Nothing new upstream: no files examined at all
+    ingester.ingested.clear()
+    third = await manifest.sync_repo(url, "main", loader, ingester)
+    assert ingester.ingested == [] and third["unchanged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_branches_of_one_repo_do_not_share_chunks(tmp_path, remote, monkeypatch):
+    """Test removing a file on one branch leaves the other branch's chunks in place"""
+    from ingest import DocumentIngester
+    from embedding_pipeline import EmbeddingPipeline
+    from vector_store import VectorStore
+
+    url, work = remote
+    git(work, "push", "--quiet", "origin", "main:dev")
+    monkeypatch.setenv("DEDUP_ENABLED", "false")
+    ingester = DocumentIngester()
+    ingester.vector_store = VectorStore(persist_directory=str(tmp_path / "index"), backend="flat")
+    ingester.embedding_pipeline = EmbeddingPipeline(ingester.vector_store)
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+    loader = GitHubLoader(cache_dir=str(tmp_path / "cache"))
+
+    await manifest.sync_repo(url, "main", loader, ingester)
+    await manifest.sync_repo(url, "dev", loader, ingester)
+    util = os.path.join("src", "util.py")
+    main_ids = manifest.chunk_ids(f"{url}@main", [util])
+    assert set(main_ids).isdisjoint(manifest.chunk_ids(f"{url}@dev", [util]))
+
+    git(work, "checkout", "--quiet", "-b", "dev")
+    (work / "src" / "util.py").unlink()
+    git(work, "commit", "--quiet", "-am", "drop util")
+    git(work, "push", "--quiet", "origin", "dev")
+    result = await manifest.sync_repo(url, "dev", loader, ingester)
+
+    assert result["removed"] == 1
+    assert ingester.vector_store.existing_ids(main_ids) == set(main_ids)
+
+
+@pytest.mark.asyncio
+async def test_same_header_in_two_files_stays_searchable_per_file(tmp_path, monkeypatch):
+    """Test near-duplicates are never linked across files, so source filters find both"""
+    from ingest import DocumentIngester
+    from embedding_pipeline import EmbeddingPipeline
+    from vector_store import VectorStore
+
+    monkeypatch.setenv("DEDUP_ENABLED", "true")
+    ingester = DocumentIngester()
+    ingester.vector_store = VectorStore(persist_directory=str(tmp_path / "index"), backend="flat")
+    ingester.embedding_pipeline = EmbeddingPipeline(ingester.vector_store)
+
+    root = tmp_path / "repo"
+    root.mkdir()
+    header = "".join(f"# Licensed under the terms of clause {n} of the shared source agreement\n" for n in range(6))
+    for name in ("a.py", "b.py"):
+        (root / name).write_text(header)
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+
+    first = await manifest.sync(str(root), GitHubLoader(), ingester)
+    assert first["duplicates_skipped"] == 0
+
+    for name in ("a.py", "b.py"):
+        results = ingester.vector_store.keyword_search_with_score("licensed clause", k=5, filter={"source": name})
+        assert [doc.metadata["source"] for doc, _ in results] == [name]
@@ -75,3 +75,108 @@ def test_extract_text_unsupported_format(ingester):
     
     with pytest.raises(ValueError, match="Unsupported file type"):
         ingester._extract_text(fake_file, "file.exe")
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_streams_pages(ingester, make_pdf):
+    """Test PDF pages are chunked as a stream with page numbers preserved"""
+    pages = [f"Page {n} covers pothole repair schedules for ward {n}. " * 6 for n in range(1, 31)]
+    
+    response = await ingester.ingest_file(BytesIO(make_pdf(pages)), "manual.pdf", None)
+    
+    assert response.status == "ok"
+    assert response.ingested > 1
+    
+    progress = {"text_length": 0, "has_text": False}
+    docs = [doc async for doc in ingester._stream_chunks(BytesIO(make_pdf(pages)), "manual.pdf", None, progress)]
+    chunk_pages = [doc.metadata.get("page") for doc in docs]
+    assert len(docs) == response.ingested
+    assert chunk_pages == sorted(chunk_pages)
+    assert chunk_pages[0] == 1
+    assert "[Page 30]" in docs[-1].page_content
+
+
+def test_chunks_emitted_before_all_pages_parsed(ingester):
+    """Test the splitter yields chunks after reading only the first page"""
+    consumed = []
+    
+    def pages():
+        for n in range(5):
+            consumed.append(n)
+            yield f"[Page {n + 1}]\n" + "Water testing is required daily. " * 100
+    
+    progress = {"text_length": 0, "has_text": False}
+    chunks = ingester._iter_chunks(pages(), progress)
+    first = next(chunks)
+    
+    assert first.startswith("[Page 1]")
+    assert consumed == [0]
+    
+    rest = list(chunks)
+    assert consumed == [0, 1, 2, 3, 4]
+    assert rest[-1].rstrip().endswith("daily.")
+
+
+@pytest.mark.asyncio
+async def test_ingest_documents_streams_files(ingester):
+    """Test repository files are chunked, stored and grouped by source"""
+    from langchain_core.documents import Document
+    
+    def files():
+        for n in range(5):
+            yield Document(
+                page_content="".join(
+                    f"def handler_{n}_{i}(request):\n    return process(request, {i})\n"
+                    for i in range(40 * (n + 1))
+                ),
+                metadata={"source": f"src/module_{n}.py", "file_type": ".py"}
+            )
+    
+    result = await ingester.ingest_documents(files())
+    
+    assert result["files"] == 5
+    assert result["chunk_count"] == len(result["ids"])
+    assert set(result["source_ids"]) == {f"src/module_{n}.py" for n in range(5)}
+    assert len(result["source_ids"]["src/module_4.py"]) > len(result["source_ids"]["src/module_0.py"])
+    assert sum(len(ids) for ids in result["source_ids"].values()) == result["chunk_count"]
+
+
+@pytest.mark.asyncio
+async def test_reupload_replaces_document_chunks(ingester):
+    """Test re-uploading an edited file under its document key deletes its old chunks only"""
+    def upload(text, source_name, document_key=None):
+        metadata = DocumentMetadata(source_name=source_name, document_key=document_key)
+        return ingester.ingest_file(BytesIO(text.encode()), "handbook.txt", metadata)
+
+    original = await upload("Streetlights are inspected every Monday by the night crew.", "Roads team", "roads/handbook")
+    other = await upload("Streetlights are inspected every Monday by the night crew.", "Parks team")
+    assert set(other.ids).isdisjoint(original.ids)
+
+    edited = await upload("Streetlights are inspected every Friday by the day crew.", "Roads team", "roads/handbook")
+
+    assert edited.metadata["chunks_deleted"] == len(original.ids)
+    stored = ingester.vector_store.existing_ids(original.ids + other.ids + edited.ids)
+    assert stored == set(other.ids + edited.ids)
+
+
+@pytest.mark.asyncio
+async def test_uploads_sharing_a_filename_are_kept(ingester):
+    """Test an upload without a document key never replaces another file of the same name"""
+    first = await ingester.ingest_file(BytesIO(b"Q1 budget covers drainage works in Ward 4."), "report.txt")
+    second = await ingester.ingest_file(BytesIO(b"Q2 budget covers road resurfacing in Ward 9."), "report.txt")
+
+    assert second.metadata["chunks_deleted"] == 0
+    assert ingester.vector_store.existing_ids(first.ids + second.ids) == set(first.ids + second.ids)
+
+
+@pytest.mark.asyncio
+async def test_reupload_updates_metadata_of_stored_chunks(ingester):
+    """Test re-uploading unchanged text with new metadata rewrites the stored chunks"""
+    text = b"Ward offices open at nine and close at five on weekdays."
+    first = await ingester.ingest_file(BytesIO(text), "hours.txt", DocumentMetadata(source_name="Ops", ward="Ward 1"))
+    second = await ingester.ingest_file(BytesIO(text), "hours.txt", DocumentMetadata(source_name="Ops", ward="Ward 2"))
+
+    assert second.ids == first.ids
+    assert second.metadata["already_stored"] == 0
+    results = ingester.vector_store.keyword_search_with_score("ward offices", k=5, filter={"ward": "Ward 2"})
+    assert [doc.metadata["ward"] for doc, _ in results] == ["Ward 2"]
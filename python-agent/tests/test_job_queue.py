@@ -0,0 +1,114 @@
+"""
+Tests for the ingestion job queue
+"""
+import asyncio
+import socket
+import sqlite3
+
+import pytest
+
+from job_queue import JobQueue
+
+
+async def wait_for(queue, job_id, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        job = queue.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_and_result(tmp_path):
+    """Test a job moves through its stages and stores its result"""
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=1)
+    await queue.start()
+    seen = []
+
+    async def run(progress):
+        progress.update(stage="embedding", chunks_total=10)
+        for done in (4, 10):
+            progress.update(chunks_done=done)
+            seen.append(queue.get(progress.job_id)["chunks_done"])
+        return {"ingested": 10}
+
+    try:
+        job = queue.submit("file", run, params={"filename": "a.txt"})
+        assert job["status"] == "queued"
+
+        job = await wait_for(queue, job["id"])
+    finally:
+        await queue.stop()
+
+    assert seen == [4, 10]
+    assert job["status"] == "succeeded"
+    assert job["chunks_total"] == 10
+    assert job["result"] == {"ingested": 10}
+    assert job["params"] == {"filename": "a.txt"}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_submission_returns_active_job(tmp_path):
+    """Test a retried request reuses the active job instead of redoing the work"""
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=1)
+    await queue.start()
+    release = asyncio.Event()
+    runs = []
+
+    async def run(progress):
+        runs.append(progress.job_id)
+        await release.wait()
+        return {}
+
+    try:
+        first = queue.submit("github", run, dedupe_key="github:repo@main")
+        second = queue.submit("github", run, dedupe_key="github:repo@main")
+        assert second["id"] == first["id"]
+        assert second["deduplicated"] is True
+
+        release.set()
+        await wait_for(queue, first["id"])
+        third = queue.submit("github", run, dedupe_key="github:repo@main")
+        assert third["id"] != first["id"]
+        await wait_for(queue, third["id"])
+    finally:
+        await queue.stop()
+
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error(tmp_path):
+    """Test exceptions mark the job failed with the message"""
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=2)
+    await queue.start()
+
+    async def run(progress):
+        raise ValueError("No supported files found in repository")
+
+    try:
+        job = await wait_for(queue, queue.submit("github", run)["id"])
+    finally:
+        await queue.stop()
+
+    assert job["status"] == "failed"
+    assert "No supported files" in job["error"]
+
+
+def test_interrupted_jobs_fail_on_startup(tmp_path):
+    """Test jobs left running by a dead process are marked failed"""
+    db_path = str(tmp_path / "jobs.db")
+    JobQueue(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO jobs (id, kind, status, stage, owner, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ("old", "file", "running", "ingesting", f"{socket.gethostname()}:999999", "2026-01-01T00:00:00")
+    )
+    conn.commit()
+    conn.close()
+
+    job = JobQueue(db_path).get("old")
+
+    assert job["status"] == "failed"
+    assert "restart" in job["error"]
@@ -0,0 +1,131 @@
+"""
+Tests for BM25 keyword index and hybrid search
+"""
+import pytest
+from langchain_core.documents import Document
+
+from keyword_index import KeywordIndex, tokenize
+from vector_store import VectorStore
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keyword_index.db"))
+    index.add(
+        ["a", "b", "c"],
+        [
+            Document(page_content="def getUserById(user_id): raise ERR_404", metadata={"source": "users.py"}),
+            Document(page_content="Potholes must be repaired within 7 days", metadata={"source": "roads.txt", "ward": "Ward 1"}),
+            Document(page_content="Potholes on main roads are repaired within 48 hours", metadata={"source": "roads.txt", "ward": "Ward 2"}),
+        ]
+    )
+    return index
+
+
+def test_tokenize_splits_identifiers():
+    """Test identifiers are indexed whole and by their parts"""
+    assert tokenize("getUserById") == ["getuserbyid", "get", "user", "by", "id"]
+    assert tokenize("MAX_RETRIES") == ["max_retries", "max", "retries"]
+
+
+def test_bm25_exact_identifier_lookup(index):
+    """Test exact identifiers and error codes rank their chunk first"""
+    results = index.search("getUserById", k=2)
+    assert results[0][0].metadata["source"] == "users.py"
+    assert 0 < results[0][1] <= 1
+
+    assert index.search("ERR_404", k=1)[0][0].metadata["source"] == "users.py"
+    assert index.search("nonexistent_symbol") == []
+
+
+def test_bm25_filter_and_delete(index):
+    """Test metadata filters and deletions"""
+    results = index.search("potholes repaired", k=5, filter={"ward": "Ward 2"})
+    assert [doc.metadata["ward"] for doc, _ in results] == ["Ward 2"]
+
+    index.delete(["c"])
+    assert index.count() == 2
+    assert all(doc.metadata.get("ward") != "Ward 2" for doc, _ in index.search("potholes", k=5))
+
+
+def test_generation_moves_on_every_write(index):
+    """Test adds, deletes and resets bump the generation and searches do not"""
+    start = index.generation()
+    index.search("potholes")
+    assert index.generation() == start
+
+    index.add(["d"], [Document(page_content="Streetlights are checked weekly")])
+    index.delete(["a"])
+    index.reset()
+    assert index.generation() == start + 3
+    assert KeywordIndex(index.db_path).generation() == start + 3
+
+
+def test_hybrid_search_fuses_rankings(tmp_path):
+    """Test hybrid mode returns chunks found by either retriever"""
+    store = VectorStore(persist_directory=str(tmp_path), backend="flat")
+    store.add_documents([
+        Document(page_content="def parse_config(path): load the yaml settings", metadata={"source": "config.py"}),
+        Document(page_content="Water quality testing schedule", metadata={"source": "water.txt"}),
+    ])
+
+    keyword = store.keyword_search_with_score("parse_config", k=2)
+    hybrid = store.hybrid_search_with_score("parse_config", k=2)
+
+    assert keyword[0][0].metadata["source"] == "config.py"
+    assert hybrid[0][0].metadata["source"] == "config.py"
+    assert hybrid[0][1] == pytest.approx(1.0)
+
+
+def test_running_totals_track_writes(index):
+    """Test the BM25 statistics kept in the totals row match the docs table"""
+    def scanned():
+        conn = index._connect()
+        try:
+            return conn.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs').fetchone()
+        finally:
+            conn.close()
+
+    def totals():
+        conn = index._connect()
+        try:
+            return conn.execute('SELECT doc_count, total_length FROM totals WHERE id = 0').fetchone()
+        finally:
+            conn.close()
+
+    assert totals() == scanned()
+    index.add(["b", "d"], [Document(page_content="Potholes patched"), Document(page_content="Streetlights checked weekly")])
+    index.delete(["a", "missing"])
+    assert totals() == scanned() and index.count() == 3
+    index.reset()
+    assert totals() == (0, 0)
+
+
+def test_bm25_operator_filters(index):
+    """Test $in/$ne/$nin and $and/$or filters select the same documents as the metadata index would"""
+    def ids(filter):
+        return sorted(doc.page_content[:3] for doc, _ in index.search("potholes getuserbyid", k=5, filter=filter))
+
+    assert ids({"ward": {"$in": ["Ward 1", "Ward 2"]}}) == ["Pot", "Pot"]
+    assert ids({"ward": ["Ward 2"]}) == ["Pot"]
+    # Documents without the field match negations
+    assert ids({"ward": {"$ne": "Ward 2"}}) == ["Pot", "def"]
+    assert ids({"ward": {"$nin": ["Ward 1", "Ward 2"]}}) == ["def"]
+    assert ids({"$or": [{"ward": "Ward 1"}, {"source": "users.py"}]}) == ["Pot", "def"]
+    assert ids({"$and": [{"source": "roads.txt"}, {"ward": {"$ne": "Ward 1"}}]}) == ["Pot"]
+
+
+def test_tag_filter_matches_wildcards_literally(tmp_path):
+    """Test % and _ in a tag filter are not LIKE wildcards"""
+    index = KeywordIndex(str(tmp_path / "keyword_index.db"))
+    index.add(
+        ["a", "b"],
+        [
+            Document(page_content="Storm drain survey", metadata={"source": "a.txt", "tags": "axb,roads"}),
+            Document(page_content="Storm drain survey", metadata={"source": "b.txt", "tags": "a_b"}),
+        ]
+    )
+
+    assert index.ids_matching({"tags": "a_b"}) == {"b"}
+    assert index.ids_matching({"tags": "a%"}) == set()
+    assert index.ids_matching({"tags": "roads"}) == {"a"}
@@ -0,0 +1,71 @@
+"""
+Tests for the bitmap metadata index
+"""
+import sqlite3
+
+import numpy as np
+from langchain_core.documents import Document
+
+from flat_index import FlatVectorIndex
+from metadata_index import Bitmap
+
+
+def test_bitmap_set_algebra_and_serialization():
+    """Test AND/OR/ANDNOT across containers and a bytes round trip"""
+    a = Bitmap.from_ordinals([1, 5, 70000, 200000])
+    b = Bitmap.from_ordinals([5, 70000, 90000])
+
+    assert (a & b).to_array().tolist() == [5, 70000]
+    assert (a | b).to_array().tolist() == [1, 5, 70000, 90000, 200000]
+    assert (a - b).to_array().tolist() == [1, 200000]
+    assert len(a) == 4
+    assert Bitmap.from_bytes(a.to_bytes()).to_array().tolist() == a.to_array().tolist()
+
+
+def make_index(path):
+    index = FlatVectorIndex(str(path))
+    metadatas = [
+        {"source": "a.py", "ward": "Ward 1", "tags": "roads,water", "file_type": ".py"},
+        {"source": "b.py", "ward": "Ward 1", "tags": "water", "file_type": ".py"},
+        {"source": "c.md", "ward": "Ward 2", "tags": "roads", "file_type": ".md"},
+        {"source": "d.md", "ward": "Ward 3", "file_type": ".md", "page": 4},
+    ]
+    docs = [Document(page_content=m["source"], metadata=m) for m in metadatas]
+    index.add([m["source"] for m in metadatas], np.eye(4).tolist(), docs)
+    return index
+
+
+def sources(results):
+    return sorted(doc.page_content for doc, _ in results)
+
+
+def test_flat_index_filters_with_bitmaps(tmp_path):
+    """Test individual tags, operators and boolean combinations"""
+    index = make_index(tmp_path / "flat")
+    query = [1.0, 1.0, 1.0, 1.0]
+
+    assert sources(index.search(query, k=10, filter={"tags": "roads"})) == ["a.py", "c.md"]
+    assert sources(index.search(query, k=10, filter={"tags": "water", "ward": "Ward 1"})) == ["a.py", "b.py"]
+    assert sources(index.search(query, k=10, filter={"ward": {"$in": ["Ward 2", "Ward 3"]}})) == ["c.md", "d.md"]
+    assert sources(index.search(query, k=10, filter={"file_type": {"$ne": ".py"}})) == ["c.md", "d.md"]
+    assert sources(index.search(query, k=10, filter={
+        "$or": [{"ward": "Ward 3"}, {"tags": "water"}]
+    })) == ["a.py", "b.py", "d.md"]
+    # Unindexed fields fall back to the sidecar
+    assert sources(index.search(query, k=10, filter={"page": 4})) == ["d.md"]
+
+    index.delete(["a.py"])
+    assert sources(index.search(query, k=10, filter={"tags": "roads"})) == ["c.md"]
+
+
+def test_flat_index_backfills_bitmaps_for_existing_rows(tmp_path):
+    """Test an index written before bitmaps existed is indexed on open"""
+    make_index(tmp_path / "flat")
+    conn = sqlite3.connect(str(tmp_path / "flat" / "metadata.db"))
+    conn.execute("DELETE FROM bitmaps")
+    conn.execute("DELETE FROM state WHERE key = 'metadata_index'")
+    conn.commit()
+    conn.close()
+
+    index = FlatVectorIndex(str(tmp_path / "flat"))
+    assert sources(index.search([1.0, 0, 0, 0], k=10, filter={"ward": "Ward 1"})) == ["a.py", "b.py"]
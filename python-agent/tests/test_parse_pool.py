@@ -0,0 +1,68 @@
+"""
+Tests for process-pool document parsing
+"""
+import os
+import time
+from io import BytesIO
+
+import pytest
+
+import document_parsers
+from parse_pool import ParsePool
+
+
+def crash():
+    os._exit(1)
+
+
+def sleep_forever():
+    time.sleep(60)
+
+
+@pytest.fixture
+def pool():
+    pool = ParsePool(workers=2, timeout=30, page_window=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_pdf_pages_match_inline_parsing(pool, make_pdf):
+    """Test windows parsed in workers come back complete and in page order"""
+    pdf = make_pdf([f"page {n} text" for n in range(1, 8)])
+
+    pooled = list(pool.iter_pdf_pages(BytesIO(pdf), "seven.pdf"))
+
+    assert pooled == list(document_parsers.iter_pdf_pages(BytesIO(pdf)))
+    assert [page for page, _ in pooled] == list(range(1, 8))
+
+
+def test_worker_crash_is_isolated(pool, make_pdf):
+    """Test a crashing task fails its file and the pool recovers"""
+    with pytest.raises(ValueError, match="Parser crashed"):
+        list(pool._ordered(crash, [()], "bad.pdf", [30.0]))
+
+    assert len(list(pool.iter_pdf_pages(BytesIO(make_pdf(["ok"]))))) == 1
+
+
+def test_parse_timeout_restarts_pool(make_pdf):
+    """Test a hung parse times out without blocking later files"""
+    pool = ParsePool(workers=1, timeout=1)
+    try:
+        with pytest.raises(TimeoutError):
+            list(pool._ordered(sleep_forever, [()], "hung.pdf", [pool.timeout]))
+
+        assert len(list(pool.iter_pdf_pages(BytesIO(make_pdf(["ok"]))))) == 1
+    finally:
+        pool.shutdown()
+
+
+def test_parallel_split_preserves_order(pool):
+    """Test texts split in worker batches come back aligned with their input"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=20)
+    texts = [f"file {n} " + "word " * (n * 30) for n in range(12)]
+
+    pooled = list(pool.iter_split(splitter, iter(texts), batch_chars=500))
+
+    assert pooled == [splitter.split_text(text) for text in texts]
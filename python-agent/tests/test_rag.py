@@ -85,3 +85,80 @@ def test_calculate_confidence(rag_pipeline):
     # High scores (low distance) = high confidence
     confidence = rag_pipeline._calculate_confidence([0.1, 0.2])
     assert confidence > 0.8
+
+
+@pytest.mark.asyncio
+async def test_keyword_mode_skips_vector_search(rag_pipeline, mock_vector_store):
+    """Test keyword search mode answers from the BM25 index only"""
+    from langchain.schema import Document
+    
+    mock_vector_store.keyword_search_with_score.return_value = [
+        (Document(page_content="ERR_404 raised when user is missing",
+                  metadata={"source": "users.py", "doc_id": "doc1"}), 0.8)
+    ]
+    
+    response = await rag_pipeline.query("ERR_404", search_mode="keyword")
+    
+    mock_vector_store.similarity_search_with_score.assert_not_called()
+    assert response.sources[0].title == "users.py"
+    assert response.confidence == 0.8
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_until_index_changes(rag_pipeline, mock_vector_store):
+    """Test repeated questions skip retrieval until the index generation moves"""
+    from langchain.schema import Document
+    
+    mock_vector_store.index_generation.return_value = 7
+    mock_vector_store.similarity_search_with_score.return_value = [
+        (Document(page_content="Potholes are repaired within 7 days.",
+                  metadata={"source": "roads.pdf", "doc_id": "doc1"}), 0.1)
+    ]
+    
+    first = await rag_pipeline.query("Pothole repair timeline?")
+    again = await rag_pipeline.query("  pothole REPAIR timeline ")
+    assert again == first
+    assert mock_vector_store.similarity_search_with_score.call_count == 1
+    
+    await rag_pipeline.query("Pothole repair timeline?", top_k=2)
+    assert mock_vector_store.similarity_search_with_score.call_count == 2
+    
+    mock_vector_store.index_generation.return_value = 8
+    await rag_pipeline.query("Pothole repair timeline?")
+    assert mock_vector_store.similarity_search_with_score.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_mock_llm_streams_the_generated_answer():
+    """Test the mock LLM's tokens reassemble its answer"""
+    llm = MockLLM()
+    
+    tokens = [token async for token in llm.astream("How to fix potholes?", "")]
+    assert len(tokens) > 10
+    assert "".join(tokens) == llm.generate("How to fix potholes?", "")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streaming", [True, False])
+async def test_stream_query_sends_sources_then_tokens(rag_pipeline, mock_vector_store, monkeypatch, streaming):
+    """Test streamed answers match query() and LLMSettings.streaming controls token granularity"""
+    from langchain.schema import Document
+    from llm_config import get_llm_settings
+    
+    monkeypatch.setattr(get_llm_settings(), "streaming", streaming)
+    rag_pipeline.answer_cache = None
+    mock_vector_store.similarity_search_with_score.return_value = [
+        (Document(page_content="Potholes are repaired within 7 days.",
+                  metadata={"source": "roads.pdf", "doc_id": "doc1"}), 0.1)
+    ]
+    
+    events = [event async for event in rag_pipeline.stream_query("Pothole repair timeline?")]
+    response = await rag_pipeline.query("Pothole repair timeline?")
+    
+    names = [name for name, _ in events]
+    assert names[0] == "sources" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    assert (len(names) > 3) == streaming
+    assert events[0][1]["sources"][0]["title"] == "roads.pdf"
+    assert "".join(data["text"] for name, data in events if name == "token") == response.answer
+    assert events[-1][1]["confidence"] == response.confidence
@@ -0,0 +1,75 @@
+"""
+Tests for the repository walker
+"""
+import pytest
+
+from github_loader import GitHubLoader
+from repo_walker import parse_gitignore, RepoWalker
+
+
+@pytest.fixture
+def repo(tmp_path):
+    files = {
+        ".gitignore": "*.log.txt\nsecrets/\n/generated.py\n!keep.log.txt\n",
+        ".gitattributes": "api/client.ts linguist-generated\nassets/** binary\n",
+        "main.py": "print('main')\n",
+        "generated.py": "# ignored at the root only\n",
+        "pkg/generated.py": "# kept: the pattern is anchored\n",
+        "pkg/.gitignore": "local.py\n",
+        "pkg/local.py": "# ignored by the nested .gitignore\n",
+        "debug.log.txt": "ignored\n",
+        "keep.log.txt": "re-included by negation\n",
+        "secrets/token.txt": "ignored directory\n",
+        "api/client.ts": "// generated client\n",
+        "assets/data.json": "{}\n",
+        "package-lock.json": "{}\n",
+        "vendor.min.js": "minified\n",
+        "blob.txt": "text\0with a NUL byte",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def test_walker_honours_ignore_rules_and_attributes(repo):
+    """Test .gitignore, .gitattributes and default patterns decide what is indexed"""
+    loader = GitHubLoader()
+    walked = sorted(str(path.relative_to(repo)) for path, _ in loader.iter_files(str(repo)))
+
+    assert walked == ["blob.txt", "keep.log.txt", "main.py", "pkg/generated.py"]
+
+    # Binary content is sniffed at read time
+    read = sorted(str(path.relative_to(repo)) for path, _, _ in loader.read_files(loader.iter_files(str(repo))))
+    assert read == ["keep.log.txt", "main.py", "pkg/generated.py"]
+
+
+def test_filter_paths_matches_walk(repo):
+    """Test explicit paths (as from git diff) are filtered by the same rules as a walk"""
+    loader = GitHubLoader()
+    paths = [
+        "main.py", "generated.py", "pkg/generated.py", "pkg/local.py", "secrets/token.txt",
+        "api/client.ts", "package-lock.json", "keep.log.txt", "missing.py",
+    ]
+
+    kept = sorted(str(path.relative_to(repo)) for path, _ in loader.iter_paths(str(repo), paths))
+
+    assert kept == ["keep.log.txt", "main.py", "pkg/generated.py"]
+
+
+def test_gitignore_patterns():
+    """Test gitignore glob semantics"""
+    def ignored(patterns, path, is_dir=False):
+        rules = RepoWalker._merge(parse_gitignore(patterns.splitlines()))
+        return RepoWalker._ignored(rules, path, is_dir)
+
+    assert ignored("*.txt", "a/b/c.txt")
+    assert ignored("docs/**/*.md", "docs/a/b/c.md")
+    assert ignored("docs/**/*.md", "docs/c.md")
+    assert not ignored("/top.py", "sub/top.py")
+    assert not ignored("build/", "build", is_dir=False)
+    assert ignored("build/", "src/build", is_dir=True)
+    assert not ignored("*.py\n!keep.py", "keep.py")
+    assert ignored("file[0-9].py", "file7.py")
+    assert not ignored("*.min.js\nfoo.py", "app.min.jsx")
@@ -0,0 +1,68 @@
+"""
+Tests for the sharded vector backend
+"""
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from flat_index import FlatVectorIndex
+from sharded_backend import ShardedBackend
+
+
+def make_backend(tmp_path):
+    return ShardedBackend(
+        lambda name: FlatVectorIndex(str(tmp_path / "shards" / name)),
+        str(tmp_path / "routes.db")
+    )
+
+
+def add_repo(backend, repo, vectors):
+    ids = [f"{repo}-{i}" for i in range(len(vectors))]
+    docs = [Document(page_content=doc_id, metadata={"repo_url": repo}) for doc_id in ids]
+    backend.add(ids, vectors, docs)
+
+
+def test_fan_out_merges_global_top_k(tmp_path):
+    """Test merged results match a single-index ranking across shards"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(60, 16)).astype(np.float32)
+    backend = make_backend(tmp_path)
+    for r, repo in enumerate(["repo-a", "repo-b", "repo-c"]):
+        add_repo(backend, repo, vectors[r * 20:(r + 1) * 20].tolist())
+
+    single = FlatVectorIndex(str(tmp_path / "single"))
+    single.add([str(i) for i in range(60)], vectors.tolist(),
+               [Document(page_content=str(i)) for i in range(60)])
+
+    query = rng.normal(size=16).tolist()
+    merged = [dist for _, dist in backend.search(query, k=7)]
+    expected = [dist for _, dist in single.search(query, k=7)]
+
+    assert len(backend.list_shards()) == 3
+    assert np.allclose(merged, expected, atol=1e-5)
+
+
+def test_filter_routes_to_one_shard_and_drop(tmp_path):
+    """Test shard-key filters prune shards and a dropped repo disappears"""
+    backend = make_backend(tmp_path)
+    add_repo(backend, "repo-a", np.eye(4).tolist())
+    add_repo(backend, "repo-b", np.eye(4).tolist())
+
+    results = backend.search([1.0, 0, 0, 0], k=8, filter={"repo_url": "repo-b"})
+    assert {doc.metadata["repo_url"] for doc, _ in results} == {"repo-b"}
+
+    dropped = backend.drop_shard("repo-a")
+    assert sorted(dropped) == [f"repo-a-{i}" for i in range(4)]
+    assert backend.count() == 4
+    assert not Path(tmp_path / "shards" / backend.shard_name("repo-a")).exists()
+
+
+def test_readded_id_moves_between_shards(tmp_path):
+    """Test an ID re-added under another repo leaves its old shard"""
+    backend = make_backend(tmp_path)
+    add_repo(backend, "repo-a", [[1.0, 0.0]])
+    backend.add(["repo-a-0"], [[1.0, 0.0]], [Document(page_content="moved", metadata={"repo_url": "repo-b"})])
+
+    assert backend.count() == 1
+    assert backend.search([1.0, 0.0], k=1, filter={"repo_url": "repo-a"}) == []
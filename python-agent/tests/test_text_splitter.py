@@ -0,0 +1,70 @@
+"""
+Tests for the streaming text splitter
+"""
+import random
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from codemind_text import StreamingTextSplitter
+
+
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+def random_text(rnd, length):
+    parts = ["word", "longerword", " ", "\n", "\n\n", ". ", "  ", "\t", "x" * 30]
+    return "".join(rnd.choice(parts) for _ in range(length))
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap,separators", [
+    (100, 20, SEPARATORS),
+    (40, 0, SEPARATORS),
+    (60, 60, ["\n\n", "\n", " ", ""]),
+    (50, 10, ["\n\n", "\n"]),
+])
+def test_matches_recursive_splitter(chunk_size, chunk_overlap, separators):
+    """Test chunks are identical to RecursiveCharacterTextSplitter, whole or streamed"""
+    recursive = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len, separators=separators
+    )
+    streaming = StreamingTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=separators)
+    rnd = random.Random(chunk_size)
+
+    for _ in range(50):
+        text = random_text(rnd, rnd.randint(0, 400))
+        expected = recursive.split_text(text)
+        cuts = sorted(rnd.sample(range(len(text) + 1), min(len(text) + 1, 12)))
+        pieces = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+        assert streaming.split_text(text) == expected
+        assert [chunk for chunk, _, _ in streaming.split_stream(pieces)] == expected
+
+
+def test_offsets_point_into_the_text():
+    """Test offsets locate each chunk, and overlap repeats text between chunks"""
+    text = "\n\n".join(f"Paragraph {n}. " + "Sentence about water quality. " * 12 for n in range(20))
+    splitter = StreamingTextSplitter(chunk_size=200, chunk_overlap=50, separators=SEPARATORS)
+
+    offsets = splitter.split_offsets(text)
+
+    assert [text[start:end] for start, end in offsets] == splitter.split_text(text)
+    assert all(end - start <= 200 for start, end in offsets)
+    assert any(start < previous_end for (_, previous_end), (start, _) in zip(offsets, offsets[1:]))
+
+
+def test_stream_emits_chunks_before_input_ends():
+    """Test chunks of a long stream are yielded while later input is still unread"""
+    read = []
+
+    def lines():
+        for n in range(10_000):
+            read.append(n)
+            yield f"2024-05-01 INFO request {n} handled in {n % 97} ms\n"
+
+    chunks = StreamingTextSplitter(chunk_size=500, chunk_overlap=100).split_stream(lines())
+    first, start, _ = next(chunks)
+
+    assert start == 0 and first.startswith("2024-05-01 INFO request 0 ")
+    assert len(read) < 20
+    assert sum(1 for _ in chunks) > 100
@@ -0,0 +1,167 @@
+"""
+Tests for vector store components
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from flat_index import FlatVectorIndex
+from vector_store import MockEmbeddings, VectorStore
+
+
+def test_mock_embeddings_are_normalized_and_non_degenerate():
+    """Test mock vectors are unit length and not a repeated constant"""
+    matrix = MockEmbeddings().embed_documents_array(["water supply SOP", "road repair"])
+
+    assert matrix.shape == (2, 1536)
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+    assert len(np.unique(matrix[0])) > 2
+
+
+def test_mock_embeddings_similarity_structure():
+    """Test texts sharing vocabulary are closer than unrelated texts"""
+    embeddings = MockEmbeddings()
+    query = np.array(embeddings.embed_query("pothole repair timeline"))
+    related, unrelated = np.array(embeddings.embed_documents([
+        "Pothole repair must follow the timeline in the SOP",
+        "Water quality testing for chlorine levels"
+    ]))
+
+    assert query @ related > query @ unrelated
+
+
+def test_mock_embeddings_stable_across_processes():
+    """Test vectors do not depend on Python's salted hash()"""
+    script = (
+        "from vector_store import MockEmbeddings;"
+        "print(sum(i * v for i, v in enumerate(MockEmbeddings().embed_query('ward 12 complaints'))))"
+    )
+    agent_dir = str(Path(__file__).parent.parent)
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=agent_dir, capture_output=True, text=True,
+            env={"PYTHONHASHSEED": seed, "PATH": ""}
+        ).stdout
+        for seed in ["1", "2"]
+    }
+
+    assert len(outputs) == 1
+    assert outputs.pop().strip() != ""
+
+
+def make_docs(n, **metadata):
+    return [
+        Document(page_content=f"doc {i}", metadata={"source": f"file{i % 3}.txt", **metadata})
+        for i in range(n)
+    ]
+
+
+def test_flat_index_exact_top_k(tmp_path):
+    """Test flat index search matches brute-force cosine ranking"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    index = FlatVectorIndex(str(tmp_path / "flat"))
+    index.add([f"id{i}" for i in range(200)], vectors.tolist(), make_docs(200))
+
+    query = rng.normal(size=32).astype(np.float32)
+    results = index.search(query.tolist(), k=5)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    assert [doc.page_content for doc, _ in results] == [f"doc {i}" for i in expected]
+    assert [score for _, score in results] == sorted(score for _, score in results)
+
+
+def test_flat_index_delete_upsert_and_filter(tmp_path):
+    """Test tombstones, ID replacement and metadata filters"""
+    index = FlatVectorIndex(str(tmp_path / "flat"), dtype="float16")
+    vectors = np.eye(6, dtype=np.float32).tolist()
+    index.add([f"id{i}" for i in range(6)], vectors, make_docs(6, ward="Ward 1"))
+
+    index.delete(["id0"])
+    assert index.count() == 5
+    assert index.search(vectors[0], k=1)[0][0].page_content != "doc 0"
+
+    index.add(["id1"], [vectors[2]], [Document(page_content="replaced", metadata={"ward": "Ward 2"})])
+    assert index.count() == 5
+
+    results = index.search(vectors[2], k=3, filter={"ward": "Ward 2"})
+    assert [doc.page_content for doc, _ in results] == ["replaced"]
+    assert results[0][1] < 1e-3
+
+
+def test_flat_index_shared_between_instances(tmp_path):
+    """Test a second worker sees rows appended by the first"""
+    reader = FlatVectorIndex(str(tmp_path / "flat"))
+    writer = FlatVectorIndex(str(tmp_path / "flat"))
+    assert reader.search([1.0, 0.0], k=1) == []
+
+    writer.add(["a"], [[1.0, 0.0]], [Document(page_content="alpha", metadata={"source": "a"})])
+
+    assert reader.search([1.0, 0.0], k=1)[0][0].page_content == "alpha"
+
+
+def test_vector_store_flat_backend(tmp_path):
+    """Test VectorStore routes storage and search through the flat backend"""
+    store = VectorStore(persist_directory=str(tmp_path), backend="flat")
+    store.add_documents([
+        Document(page_content="pothole repair timeline", metadata={"source": "roads.txt"}),
+        Document(page_content="water quality testing", metadata={"source": "water.txt"})
+    ])
+
+    results = store.similarity_search_with_score("pothole repair", k=1)
+
+    assert results[0][0].metadata["source"] == "roads.txt"
+    assert store.get_collection_stats()["total_documents"] == 2
+
+
+def test_ivfpq_search_matches_exact_and_covers_new_rows(tmp_path):
+    """Test IVF-PQ with full probing and re-scoring agrees with exact search"""
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(8, 32))
+    vectors = (centers[rng.integers(0, 8, 1000)] + 0.3 * rng.normal(size=(1000, 32))).astype(np.float32)
+    docs = [Document(page_content=f"doc {i}", metadata={"source": "s"}) for i in range(1000)]
+
+    index = FlatVectorIndex(str(tmp_path / "flat"), nprobe=16, rerank=10)
+    index.add([f"id{i}" for i in range(1000)], vectors.tolist(), docs)
+    exact = [doc.page_content for doc, _ in index.search(vectors[7].tolist(), k=10)]
+
+    index.build_ann(nlist=16, m=8)
+    approximate = [doc.page_content for doc, _ in index.search(vectors[7].tolist(), k=10)]
+    assert approximate == exact
+
+    # Rows appended after the build are found through the exact tail scan
+    index.add(["late"], [vectors[7].tolist()], [Document(page_content="late", metadata={"source": "s"})])
+    results = index.search(vectors[7].tolist(), k=2)
+    assert {doc.page_content for doc, _ in results} == {"doc 7", "late"}
+
+
+def test_tag_filters_agree_across_backends(tmp_path):
+    """Test comma-joined tags filter the same way on the Chroma and flat backends"""
+    documents = [
+        Document(page_content=f"ward maintenance report {i}", metadata={"source": f"r{i}.txt", "tags": tags})
+        for i, tags in enumerate(["water,roads", "roads", "water", "parks"])
+    ] + [Document(page_content="ward maintenance report 4", metadata={"source": "r4.txt"})]
+    stores = [VectorStore(persist_directory=str(tmp_path / name), backend=name) for name in ("chroma", "flat")]
+    for store in stores:
+        store.add_documents(documents)
+
+    for filter in (
+        {"tags": "water"},
+        {"tags": {"$in": ["roads", "parks"]}},
+        {"tags": {"$ne": "water"}},
+        {"$or": [{"tags": "parks"}, {"source": "r1.txt"}]},
+        {"source": {"$in": ["r0.txt", "r2.txt"]}, "tags": "roads"},
+    ):
+        chroma, flat = (
+            sorted(doc.metadata["source"] for doc, _ in store.similarity_search_with_score("ward report", k=5, filter=filter))
+            for store in stores
+        )
+        assert chroma == flat, filter
+    assert sorted(
+        doc.metadata["source"] for doc, _ in stores[0].similarity_search_with_score("ward report", k=5, filter={"tags": "water"})
+    ) == ["r0.txt", "r2.txt"]
@@ -0,0 +1,135 @@
+"""
+Tests for the web crawler and URL ingestion
+"""
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from web_crawler import WebCrawler, extract_html
+
+
+def page(title, body, links=()):
+    anchors = "".join(f'<a href="{href}">{href}</a> ' for href in links)
+    return (
+        f"<html><head><title>{title}</title><style>body {{ color: red }}</style></head>"
+        f"<body><nav>Home | Docs | Blog</nav><main><h1>{title}</h1><p>{body}</p>{anchors}</main>"
+        f"<footer>Copyright</footer><script>track()</script></body></html>"
+    )
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A static site served by a local HTTP server (with Last-Modified / 304 support)"""
+    root = tmp_path / "site"
+    files = {
+        "docs/index.html": page("Runbooks", "Start here.", ["a.html", "a.html#setup", "../outside.html",
+                                                             "https://other.example/", "mailto:ops@example.com"]),
+        "docs/a.html": page("Deploys", "Deploys run from the release branch every weekday.", ["b.html", "sub/c.html"]),
+        "docs/b.html": page("Rollbacks", "Roll back with the previous image tag.", ["index.html"]),
+        "docs/sub/c.html": page("Paging", "Page the on-call engineer for sev1 incidents."),
+        "outside.html": page("Outside", "Not part of the docs."),
+    }
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    handler = partial(SimpleHTTPRequestHandler, directory=str(root))
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield root, f"http://127.0.0.1:{server.server_address[1]}/docs/index.html"
+    server.shutdown()
+    server.server_close()
+
+
+async def crawl(crawler, url):
+    return {page["url"]: page async for page in crawler.crawl(url)}
+
+
+def test_extract_html_keeps_main_content():
+    """Test page chrome is dropped and headings, paragraphs and links are kept"""
+    title, text, links = extract_html(
+        "<html><head><title> Deploy  guide </title></head><body>"
+        "<header>Site header</header><nav><a href='/'>Home</a></nav>"
+        "<article><h2>Steps</h2><p>Build the   image.</p><ul><li>Tag it</li><li>Push it</li></ul>"
+        "<pre>make deploy\n  --env prod</pre><a href='next.html'>Next</a></article>"
+        "<script>var x = 1;</script><footer>Footer</footer></body></html>"
+    )
+
+    assert title == "Deploy guide"
+    assert text.startswith("## Steps\n\nBuild the image.")
+    assert "- Tag it\n- Push it" in text
+    assert "make deploy\n  --env prod" in text
+    for chrome in ("Site header", "Home", "var x", "Footer"):
+        assert chrome not in text
+    assert links == ["/", "next.html"]
+
+
+@pytest.mark.asyncio
+async def test_crawl_stays_in_scope_and_revalidates(tmp_path, site):
+    """Test the crawl follows in-scope links once and re-crawls answer 304"""
+    _, start = site
+    crawler = WebCrawler(concurrency=4, per_host=2, cache_path=str(tmp_path / "crawl.db"))
+
+    pages = await crawl(crawler, start)
+
+    base = start.rsplit("/", 1)[0]
+    assert sorted(pages) == sorted(f"{base}/{name}" for name in ("index.html", "a.html", "b.html", "sub/c.html"))
+    assert {page["status"] for page in pages.values()} == {"new"}
+    deploys = pages[f"{base}/a.html"]
+    assert deploys["title"] == "Deploys"
+    assert "release branch" in deploys["text"] and "Copyright" not in deploys["text"]
+    assert deploys["last_modified"]
+
+    crawler.cache.record([{**page, "chunk_ids": []} for page in pages.values()])
+    again = await crawl(WebCrawler(concurrency=4, cache_path=str(tmp_path / "crawl.db")), start)
+
+    # Pages below a 304 are still reached through the cached links
+    assert sorted(again) == sorted(pages)
+    assert {page["status"] for page in again.values()} == {"not_modified"}
+
+
+@pytest.mark.asyncio
+async def test_crawl_respects_limits(tmp_path, site):
+    """Test max_depth and max_pages bound the crawl"""
+    _, start = site
+
+    shallow = await crawl(WebCrawler(max_depth=1, cache_path=str(tmp_path / "a.db")), start)
+    assert len(shallow) == 2
+
+    capped = await crawl(WebCrawler(max_pages=3, cache_path=str(tmp_path / "b.db")), start)
+    assert len(capped) == 3
+
+
+@pytest.mark.asyncio
+async def test_ingest_url_reembeds_only_changed_pages(tmp_path, site, monkeypatch):
+    """Test a re-crawl re-embeds the edited page and deletes its old chunks"""
+    from ingest import DocumentIngester
+
+    root, start = site
+    monkeypatch.setenv("CRAWL_CACHE_DB_PATH", str(tmp_path / "crawl.db"))
+    ingester = DocumentIngester()
+    deleted = []
+    delete = ingester.vector_store.delete
+    monkeypatch.setattr(ingester.vector_store, "delete", lambda ids: (deleted.extend(ids), delete(ids)))
+
+    first = await ingester.ingest_url(start)
+    assert first.metadata["pages"]["new"] == 4
+    assert first.ingested >= 4
+
+    rollbacks = root / "docs" / "b.html"
+    rollbacks.write_text(page("Rollbacks", "Roll back by redeploying the last green build.", ["index.html"]))
+    mtime = os.stat(rollbacks).st_mtime + 10
+    os.utime(rollbacks, (mtime, mtime))
+
+    second = await ingester.ingest_url(start)
+
+    assert second.metadata["pages"] == {"new": 0, "changed": 1, "unchanged": 0, "not_modified": 3, "failed": 0}
+    assert second.ingested == 1
+    assert second.metadata["chunks_deleted"] == 1
+    assert len(deleted) == 1 and deleted[0] in first.ids
@@ -1,6 +1,10 @@
 import os
+import re
+import hashlib
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from langchain_community.vectorstores import Chroma
@@ -8,16 +12,177 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 import logging
 
+from embedding_cache import CachedEmbeddings, QueryEmbeddingCache
+from flat_index import FlatVectorIndex
+from keyword_index import KeywordIndex
+from dedup_index import DedupIndex, SCOPE_FIELDS
+from embedding_pipeline import chunk_id
+from sharded_backend import ShardedBackend
+
 logger = logging.getLogger(__name__)
 
 
+class ChromaBackend:
+    """Vector backend storing embeddings in a persistent Chroma collection"""
+    
+    # Tags are stored comma-joined and Chroma can only compare the whole
+    # string, so tag conditions are checked on the results; each retry
+    # fetches this many times more candidates
+    TAGS_OVERSAMPLE = 4
+    
+    def __init__(self, persist_directory: str, embeddings, collection_name: str = "smart_city_docs"):
+        self.collection_name = collection_name
+        self.vectorstore = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embeddings,
+            collection_name=collection_name
+        )
+    
+    def add(self, ids: List[str], embeddings: List[List[float]], documents: List[Document]):
+        self.vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=[doc.metadata or None for doc in documents],
+            documents=[doc.page_content for doc in documents]
+        )
+    
+    def search(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        if not self._mentions_tags(filter):
+            return self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                embedding,
+                k=k,
+                filter=self._where(filter)
+            )
+        
+        # Push down the conditions that do not involve tags, post-filter the rest
+        pushed = {key: value for key, value in filter.items() if not self._mentions_tags({key: value})}
+        total = self.count()
+        fetch = k * self.TAGS_OVERSAMPLE
+        while total:
+            results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                embedding,
+                k=min(fetch, total),
+                filter=self._where(pushed)
+            )
+            matched = [(doc, score) for doc, score in results if self._matches(doc.metadata or {}, filter)]
+            if len(matched) >= k or fetch >= total:
+                return matched[:k]
+            fetch *= self.TAGS_OVERSAMPLE
+        return []
+    
+    @classmethod
+    def _mentions_tags(cls, filter: Optional[Dict[str, Any]]) -> bool:
+        for key, condition in (filter or {}).items():
+            if key in ("$and", "$or"):
+                if any(cls._mentions_tags(clause) for clause in condition):
+                    return True
+            elif key == "tags":
+                return True
+        return False
+    
+    @classmethod
+    def _matches(cls, metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        """Evaluate a filter against one document's metadata, with MetadataIndex semantics"""
+        for key, condition in filter.items():
+            if key == "$and":
+                if not all(cls._matches(metadata, clause) for clause in condition):
+                    return False
+            elif key == "$or":
+                if not any(cls._matches(metadata, clause) for clause in condition):
+                    return False
+            elif not cls._field_matches(metadata, key, condition):
+                return False
+        return True
+    
+    @staticmethod
+    def _field_matches(metadata: Dict[str, Any], field: str, condition: Any) -> bool:
+        if not isinstance(condition, dict):
+            condition = {"$in": condition} if isinstance(condition, list) else {"$eq": condition}
+        
+        value = metadata.get(field)
+        if value is None:
+            values = set()
+        elif field == "tags" and isinstance(value, str):
+            values = {tag.strip() for tag in value.split(",") if tag.strip()}
+        else:
+            values = {value}
+        
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                matched = operand in values
+            elif operator == "$in":
+                matched = any(item in values for item in operand)
+            elif operator == "$ne":
+                matched = operand not in values
+            elif operator == "$nin":
+                matched = not any(item in values for item in operand)
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if not matched:
+                return False
+        return True
+    
+    @staticmethod
+    def _where(filter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Chroma accepts one top-level key per where-clause; AND the rest explicitly"""
+        if not filter or len(filter) == 1:
+            return filter or None
+        return {"$and": [{key: value} for key, value in filter.items()]}
+    
+    def delete(self, ids: List[str]):
+        if ids:
+            self.vectorstore._collection.delete(ids=ids)
+    
+    def count(self) -> int:
+        return self.vectorstore._collection.count()
+    
+    def reset(self):
+        self.vectorstore._client.delete_collection(self.collection_name)
+    
+    def drop(self):
+        self.reset()
+
+
 class VectorStore:
-    """Manages vector storage and retrieval using Chroma"""
+    """Manages vector storage and retrieval (Chroma or memory-mapped flat index)"""
+    
+    BACKENDS = ("chroma", "flat")
+    
+    # Reciprocal-rank fusion constant (Cormack et al. use 60)
+    RRF_K = 60
     
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(
+        self,
+        persist_directory: str = "./chroma_db",
+        backend: Optional[str] = None,
+        shard_by: Optional[str] = None
+    ):
         self.persist_directory = persist_directory
+        self.backend_name = (backend or os.getenv("VECTOR_BACKEND", "chroma")).lower()
+        self.shard_by = shard_by if shard_by is not None else os.getenv("VECTOR_SHARD_BY", "")
         self.embeddings = self._initialize_embeddings()
-        self.vectorstore = self._initialize_vectorstore()
+        self.query_cache = QueryEmbeddingCache(
+            ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+            max_bytes=int(float(os.getenv("QUERY_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        )
+        self.backend = self._initialize_vectorstore()
+        self.keyword_index = KeywordIndex(str(Path(self.persist_directory) / "keyword_index.db"))
+        # Near-duplicate chunks are linked to a stored one instead of being embedded again;
+        # links never cross shards
+        self.dedup_index = None
+        if os.getenv("DEDUP_ENABLED", "true").lower() == "true":
+            scope_fields = SCOPE_FIELDS
+            if self.shard_by and self.shard_by not in scope_fields:
+                scope_fields += (self.shard_by,)
+            self.dedup_index = DedupIndex(
+                str(Path(self.persist_directory) / "dedup_index.db"),
+                scope_fields=scope_fields
+            )
         
     def _initialize_embeddings(self):
         """Initialize embeddings model"""
@@ -33,23 +198,59 @@ class VectorStore:
             return MockEmbeddings()
             
         model = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
-        return OpenAIEmbeddings(
+        embeddings = OpenAIEmbeddings(
             openai_api_key=api_key,
             model=model
         )
+        
+        # Re-ingesting unchanged content should not pay for embeddings again
+        if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true":
+            cache_path = os.getenv(
+                "EMBEDDING_CACHE_PATH",
+                str(Path(self.persist_directory) / "embedding_cache.db")
+            )
+            max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+            logger.info(f"Using persistent embedding cache at {cache_path}")
+            return CachedEmbeddings(embeddings, model, cache_path, max_entries=max_entries)
+        
+        return embeddings
     
     def _initialize_vectorstore(self):
-        """Initialize or load existing Chroma vectorstore"""
+        """Initialize or load the configured vector backend"""
+        if self.backend_name not in self.BACKENDS:
+            raise ValueError(f"Unsupported vector backend: {self.backend_name}")
+        
         Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
         
+        flat_dir = Path(os.getenv("FLAT_INDEX_DIR", str(Path(self.persist_directory) / "flat_index")))
+        
+        def create(shard: Optional[str] = None):
+            if self.backend_name == "flat":
+                return FlatVectorIndex(
+                    str(flat_dir / "shards" / shard if shard else flat_dir),
+                    dtype=os.getenv("FLAT_INDEX_DTYPE", "float32"),
+                    nprobe=int(os.getenv("ANN_NPROBE", "8")),
+                    rerank=int(os.getenv("ANN_RERANK", "10"))
+                )
+            collection_name = f"smart_city_docs_{shard}" if shard else "smart_city_docs"
+            return ChromaBackend(self.persist_directory, self.embeddings, collection_name)
+        
         try:
-            vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings,
-                collection_name="smart_city_docs"
+            if self.shard_by:
+                backend = ShardedBackend(
+                    create,
+                    str(Path(self.persist_directory) / "shard_routes.db"),
+                    shard_by=self.shard_by,
+                    max_workers=int(os.getenv("SHARD_SEARCH_WORKERS", "8"))
+                )
+            else:
+                backend = create()
+            
+            logger.info(
+                f"Initialized {self.backend_name} vector store at {self.persist_directory}"
+                + (f" sharded by {self.shard_by}" if self.shard_by else "")
             )
-            logger.info(f"Initialized vector store at {self.persist_directory}")
-            return vectorstore
+            return backend
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
@@ -74,13 +275,80 @@ class VectorStore:
                 for doc, meta in zip(documents, metadatas):
                     doc.metadata.update(meta)
             
-            ids = self.vectorstore.add_documents(documents)
+            embeddings = self.embed_documents([doc.page_content for doc in documents])
+            return self.add_embeddings(documents, embeddings)
+        except Exception as e:
+            logger.error(f"Error adding documents: {e}")
+            raise
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts with the configured embeddings model"""
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing cached vectors for repeated questions"""
+        return self.query_cache.get_or_embed(query, self.embeddings.embed_query)
+
+    def add_embeddings(
+        self,
+        documents: List[Document],
+        embeddings: List[List[float]],
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Add documents with precomputed embeddings to the vector store
+
+        Args:
+            documents: List of LangChain Document objects
+            embeddings: One embedding per document
+            ids: Optional document IDs (chunk_id of each document if omitted)
+
+        Returns:
+            List of document IDs
+        """
+        try:
+            if ids is None:
+                ids = [chunk_id(doc) for doc in documents]
+
+            self.backend.add(ids, embeddings, documents)
+            self.keyword_index.add(ids, documents)
             logger.info(f"Added {len(ids)} documents to vector store")
             return ids
         except Exception as e:
-            logger.error(f"Error adding documents: {e}")
+            logger.error(f"Error adding embeddings: {e}")
             raise
-    
+
+    def existing_ids(self, ids: List[str], documents: Optional[List[Document]] = None) -> set:
+        """
+        The subset of ids already stored, so re-ingested chunks can be skipped
+        
+        Args:
+            ids: Chunk IDs
+            documents: Optional chunks; an ID only counts when it is stored
+                with the same metadata, so changed metadata is written again
+        """
+        try:
+            metadatas = [doc.metadata for doc in documents] if documents is not None else None
+            return self.keyword_index.existing(ids, metadatas)
+        except Exception as e:
+            logger.error(f"Error checking existing documents: {e}")
+            raise
+
+    def ids_for_document(self, doc_id: str) -> set:
+        """IDs of the chunks of one uploaded document, stored or linked as duplicates"""
+        try:
+            ids = self.keyword_index.ids_matching({"doc_id": doc_id})
+            if self.dedup_index is not None:
+                ids |= self.dedup_index.linked_ids("doc_id", doc_id)
+            return ids
+        except Exception as e:
+            logger.error(f"Error looking up chunks of document {doc_id}: {e}")
+            raise
+
+    def index_generation(self) -> int:
+        """Counter that changes whenever documents are added or deleted"""
+        return self.keyword_index.generation()
+
     def similarity_search(
         self,
         query: str,
@@ -99,13 +367,13 @@ class VectorStore:
             List of matching documents
         """
         try:
-            results = self.vectorstore.similarity_search(
-                query,
+            results = self.backend.search(
+                self.embed_query(query),
                 k=k,
                 filter=filter
             )
             logger.info(f"Retrieved {len(results)} documents for query")
-            return results
+            return [doc for doc, _ in results]
         except Exception as e:
             logger.error(f"Error in similarity search: {e}")
             return []
@@ -123,8 +391,8 @@ class VectorStore:
             List of (document, score) tuples
         """
         try:
-            results = self.vectorstore.similarity_search_with_score(
-                query,
+            results = self.backend.search(
+                self.embed_query(query),
                 k=k,
                 filter=filter
             )
@@ -133,39 +401,183 @@ class VectorStore:
             logger.error(f"Error in similarity search with score: {e}")
             return []
     
+    def keyword_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[tuple[Document, float]]:
+        """
+        BM25 keyword search, no embedding call
+        
+        Returns:
+            List of (document, score) tuples, score in [0, 1] (higher is better)
+        """
+        try:
+            return self.keyword_index.search(query, k=k, filter=filter)
+        except Exception as e:
+            logger.error(f"Error in keyword search: {e}")
+            return []
+    
+    def hybrid_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[tuple[Document, float]]:
+        """
+        Fuse semantic and keyword rankings with reciprocal-rank fusion
+        
+        Returns:
+            List of (document, score) tuples, score in [0, 1] where 1 means
+            ranked first by both retrievers
+        """
+        candidates = max(k * 4, 20)
+        semantic = self.similarity_search_with_score(query, k=candidates, filter=filter)
+        keyword = self.keyword_search_with_score(query, k=candidates, filter=filter)
+        
+        fused: Dict[tuple, float] = {}
+        docs: Dict[tuple, Document] = {}
+        for results in (semantic, keyword):
+            for rank, (doc, _) in enumerate(results, 1):
+                key = (doc.metadata.get("source"), doc.page_content)
+                docs.setdefault(key, doc)
+                fused[key] = fused.get(key, 0.0) + 1.0 / (self.RRF_K + rank)
+        
+        best = 2.0 / (self.RRF_K + 1)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(docs[key], score / best) for key, score in ranked]
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
         try:
-            collection = self.vectorstore._collection
-            count = collection.count()
-            return {
-                "total_documents": count,
+            stats = {
+                "total_documents": self.backend.count(),
+                "backend": self.backend_name,
+                "shard_by": self.shard_by or None,
+                "keyword_documents": self.keyword_index.count(),
                 "persist_directory": self.persist_directory
             }
+            stats["query_cache"] = self.query_cache.get_stats()
+            if isinstance(self.embeddings, CachedEmbeddings):
+                stats["embedding_cache"] = self.embeddings.get_stats()
+            if self.dedup_index is not None:
+                stats["dedup_fingerprints"] = self.dedup_index.count()
+            return stats
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             return {"total_documents": 0, "error": str(e)}
     
+    def delete(self, ids: List[str]):
+        """
+        Delete documents by ID
+        
+        IDs of linked near-duplicates are accepted too. A duplicate linked to
+        a deleted chunk is embedded and stored in its place, so it stays
+        searchable.
+        """
+        try:
+            self.backend.delete(ids)
+            self.keyword_index.delete(ids)
+            if self.dedup_index is not None:
+                promoted_ids, promoted = self.dedup_index.release(ids)
+                if promoted:
+                    embeddings = self.embed_documents([doc.page_content for doc in promoted])
+                    self.add_embeddings(promoted, embeddings, promoted_ids)
+            logger.info(f"Deleted {len(ids)} documents from vector store")
+        except Exception as e:
+            logger.error(f"Error deleting documents: {e}")
+            raise
+    
+    def drop_shard(self, key: str) -> int:
+        """
+        Drop every document of one shard, e.g. a removed repo
+        
+        Args:
+            key: Shard key (the repo URL or source, per VECTOR_SHARD_BY)
+            
+        Returns:
+            Number of documents removed
+        """
+        if not isinstance(self.backend, ShardedBackend):
+            raise ValueError("Vector store is not sharded (set VECTOR_SHARD_BY)")
+        
+        try:
+            ids = self.backend.drop_shard(key)
+            self.keyword_index.delete(ids)
+            if self.dedup_index is not None:
+                # Duplicates are only linked within a shard, so they go with it
+                self.dedup_index.release(ids, promote=False)
+            return len(ids)
+        except Exception as e:
+            logger.error(f"Error dropping shard {key}: {e}")
+            raise
+    
     def delete_collection(self):
         """Delete the entire collection (use with caution!)"""
         try:
-            self.vectorstore._client.delete_collection("smart_city_docs")
+            self.backend.reset()
+            self.keyword_index.reset()
+            if self.dedup_index is not None:
+                self.dedup_index.reset()
             logger.info("Deleted collection")
         except Exception as e:
             logger.error(f"Error deleting collection: {e}")
 
 
 class MockEmbeddings:
-    """Mock embeddings for development without API key"""
+    """
+    Deterministic mock embeddings for development and offline benchmarks
+    
+    Token unigrams and bigrams are feature-hashed with a seeded blake2b into a
+    fixed number of signed buckets, so vectors are stable across processes and
+    texts sharing vocabulary get proportionally similar embeddings.
+    """
+    
+    TOKEN_PATTERN = re.compile(r"\w+")
+    
+    def __init__(self, dimensions: int = 1536, seed: int = 0):
+        self.dimensions = dimensions
+        self._hash_key = seed.to_bytes(8, "little")
+        self._bucket = lru_cache(maxsize=1 << 18)(self._hash_feature)
+    
+    def _hash_feature(self, feature: str) -> Tuple[int, float]:
+        """Map a feature to (bucket index, sign)"""
+        digest = hashlib.blake2b(
+            feature.encode("utf-8"), digest_size=8, key=self._hash_key
+        ).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimensions, 1.0 if value >> 63 else -1.0
+    
+    def _features(self, text: str) -> List[str]:
+        tokens = self.TOKEN_PATTERN.findall(text.lower())
+        bigrams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return tokens + bigrams
+    
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Return an L2-normalized (len(texts), dimensions) float32 matrix"""
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                col, sign = self._bucket(feature)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+        
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), signs)
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Return mock embeddings for documents"""
-        # Return simple hash-based embeddings
-        return [[float(hash(text) % 100) / 100 for _ in range(1536)] for text in texts]
+        return self.embed_documents_array(texts).tolist()
     
     def embed_query(self, text: str) -> List[float]:
         """Return mock embedding for query"""
-        return [float(hash(text) % 100) / 100 for _ in range(1536)]
+        return self.embed_documents_array([text])[0].tolist()
 
 
 # Singleton instance
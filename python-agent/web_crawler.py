@@ -0,0 +1,381 @@
+"""
+Web Crawler for CodeMind
+Crawls wikis and documentation sites over a pooled HTTP client, revalidating pages with conditional GET
+"""
+
+import os
+import re
+import json
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urldefrag, urlsplit
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Subtrees that are page chrome rather than content
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer',
+    'aside', 'form', 'iframe', 'button', 'select'
+}
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'table', 'tr',
+    'pre', 'blockquote', 'dd', 'dt', 'dl', 'figure', 'figcaption', 'hr', 'br'
+}
+HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+CONTENT_TAGS = ('main', 'article')
+VOID_TAGS = {'br', 'hr', 'img', 'input', 'meta', 'link', 'area', 'base', 'col', 'embed', 'source', 'wbr'}
+
+TEXT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain', 'text/markdown')
+
+WHITESPACE = re.compile(r'[ \t\r\n\f\v]+')
+BLANK_LINES = re.compile(r'\n{3,}')
+
+
+class _ContentExtractor(HTMLParser):
+    """Collects the title, readable text and links of an HTML page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.links: List[str] = []
+        self.parts: List[str] = []
+        # Text inside <main>/<article>, preferred over the whole body when present
+        self.content_parts: List[str] = []
+        self._skip = 0
+        self._content = 0
+        self._pre = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag: str, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+        if tag in VOID_TAGS:
+            self.handle_startendtag(tag, attrs)
+            return
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag == 'title':
+            self._in_title = True
+        elif tag in CONTENT_TAGS:
+            self._content += 1
+        elif tag == 'pre':
+            self._pre += 1
+
+        if tag in HEADINGS:
+            self._write("\n\n" + "#" * HEADINGS[tag] + " ")
+        elif tag in BLOCK_TAGS:
+            self._write("\n- " if tag == 'li' else "\n")
+
+    def handle_startendtag(self, tag: str, attrs):
+        if tag in ('br', 'hr'):
+            self._write("\n")
+
+    def handle_endtag(self, tag: str):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == 'title':
+            self._in_title = False
+        elif tag in CONTENT_TAGS:
+            self._content = max(0, self._content - 1)
+        elif tag == 'pre':
+            self._pre = max(0, self._pre - 1)
+
+        if tag in HEADINGS or tag in ('p', 'pre', 'table', 'blockquote'):
+            self._write("\n\n")
+        elif tag in BLOCK_TAGS and tag != 'li':
+            self._write("\n")
+
+    def handle_data(self, data: str):
+        if self._in_title:
+            self.title += data
+            return
+        if self._pre:
+            self._write(data)
+        else:
+            self._write(WHITESPACE.sub(" ", data))
+
+    def _write(self, text: str):
+        if self._skip:
+            return
+        self.parts.append(text)
+        if self._content:
+            self.content_parts.append(text)
+
+    def text(self) -> str:
+        content = _normalize("".join(self.content_parts))
+        return content if content else _normalize("".join(self.parts))
+
+
+def _normalize(text: str) -> str:
+    lines = [line.rstrip() for line in text.split("\n")]
+    return BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def extract_html(html: str) -> Tuple[str, str, List[str]]:
+    """
+    Extract the main content of an HTML page
+
+    Scripts, styles, navigation, headers, footers and sidebars are dropped;
+    when the page has a <main> or <article> element only its text is kept.
+    Headings become Markdown headings so the splitter and the LLM see the
+    page structure.
+
+    Returns:
+        (title, text, hrefs as written in the page)
+    """
+    parser = _ContentExtractor()
+    parser.feed(html)
+    parser.close()
+    return WHITESPACE.sub(" ", parser.title).strip(), parser.text(), parser.links
+
+
+class CrawlCache:
+    """Validators, links and chunk IDs of crawled pages, persisted in SQLite"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Path to the SQLite cache file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite database with schema"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT NOT NULL,
+                    links TEXT NOT NULL,
+                    chunk_ids TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Cached entry of a page, or None if it was never indexed"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT etag, last_modified, content_hash, links, chunk_ids FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "content_hash": row[2],
+            "links": json.loads(row[3]),
+            "chunk_ids": json.loads(row[4]),
+        }
+
+    def record(self, pages: List[Dict[str, Any]]):
+        """Insert or replace entries (url, etag, last_modified, content_hash, links, chunk_ids)"""
+        if not pages:
+            return
+
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    '''
+                    INSERT OR REPLACE INTO pages
+                        (url, etag, last_modified, content_hash, links, chunk_ids, fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''',
+                    [
+                        (page["url"], page.get("etag"), page.get("last_modified"), page["content_hash"],
+                         json.dumps(page["links"]), json.dumps(page["chunk_ids"]), now)
+                        for page in pages
+                    ]
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+
+class WebCrawler:
+    """
+    Breadth-first crawler for a documentation site
+
+    All requests share one httpx connection pool, and each host gets its
+    own semaphore, so a crawl keeps a bounded number of requests in flight
+    per server. Pages already indexed are requested with If-None-Match /
+    If-Modified-Since; a 304 costs no body, and its links come from the
+    cache so the crawl still reaches the pages below it. Pages are yielded
+    as they are fetched, and fetch workers wait while the consumer is busy.
+    """
+
+    def __init__(
+        self,
+        max_pages: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        per_host: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache_path: Optional[str] = None
+    ):
+        """
+        Args:
+            max_pages: Most pages fetched per crawl (CRAWL_MAX_PAGES)
+            max_depth: Most links followed from the start page (CRAWL_MAX_DEPTH)
+            concurrency: Requests in flight across all hosts (CRAWL_CONCURRENCY)
+            per_host: Requests in flight per host (CRAWL_PER_HOST)
+            timeout: Seconds per request (CRAWL_TIMEOUT)
+            cache_path: SQLite cache of validators and chunk IDs (CRAWL_CACHE_DB_PATH)
+        """
+        self.max_pages = max_pages or int(os.getenv("CRAWL_MAX_PAGES", "500"))
+        self.max_depth = max_depth if max_depth is not None else int(os.getenv("CRAWL_MAX_DEPTH", "5"))
+        self.concurrency = concurrency or int(os.getenv("CRAWL_CONCURRENCY", "16"))
+        self.per_host = per_host or int(os.getenv("CRAWL_PER_HOST", "4"))
+        self.timeout = timeout or float(os.getenv("CRAWL_TIMEOUT", "30"))
+        self.cache = CrawlCache(cache_path or os.getenv("CRAWL_CACHE_DB_PATH", "./crawl_cache.db"))
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def crawl(self, start_url: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Crawl pages reachable from start_url within its directory
+
+        Yields:
+            One dict per page with url, status ("new", "changed", "unchanged",
+            "not_modified" or "failed"), and for new and changed pages title,
+            text, content_hash, etag, last_modified, links and the chunk_ids
+            the cache holds for the page
+        """
+        start_url = urldefrag(start_url)[0]
+        scope = _scope_prefix(start_url)
+        frontier: asyncio.Queue = asyncio.Queue()
+        # Small, so fetching runs at most a few pages ahead of chunking and embedding
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        seen = {start_url}
+        frontier.put_nowait((start_url, 0))
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": "CodeMind-Crawler/1.0"}
+        ) as client:
+            async def worker():
+                while True:
+                    url, depth = await frontier.get()
+                    try:
+                        page = await self._fetch(client, url)
+                        if depth < self.max_depth:
+                            for link in page.pop("links_to_follow", []):
+                                if link not in seen and link.startswith(scope) and len(seen) < self.max_pages:
+                                    seen.add(link)
+                                    frontier.put_nowait((link, depth + 1))
+                        page.pop("links_to_follow", None)
+                        await results.put(page)
+                    finally:
+                        frontier.task_done()
+
+            async def finish():
+                await frontier.join()
+                await results.put(None)
+
+            tasks = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            tasks.append(asyncio.create_task(finish()))
+            try:
+                while True:
+                    page = await results.get()
+                    if page is None:
+                        return
+                    yield page
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+        """Fetch one page, revalidating it when it is cached"""
+        cached = await asyncio.to_thread(self.cache.get, url)
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with self._host_limit(url):
+                response = await client.get(url, headers=headers)
+
+            if response.status_code == 304 and cached:
+                return {"url": url, "status": "not_modified", "links_to_follow": cached["links"]}
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in TEXT_TYPES:
+                raise ValueError(f"Unsupported content type {content_type}")
+
+            body = response.text
+            if content_type in ('text/html', 'application/xhtml+xml') or (not content_type and '<html' in body[:1000].lower()):
+                title, text, hrefs = await asyncio.to_thread(extract_html, body)
+            else:
+                title, text, hrefs = url.rsplit("/", 1)[-1], body, []
+        except Exception as e:
+            logger.warning(f"Failed to fetch {url}: {e}")
+            return {"url": url, "status": "failed", "error": str(e)}
+
+        # Links resolve against the final URL after redirects
+        base = str(response.url)
+        links = sorted({
+            urldefrag(urljoin(base, href))[0] for href in hrefs
+            if urlsplit(urljoin(base, href)).scheme in ("http", "https")
+        })
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return {
+            "url": url,
+            "status": "new" if cached is None else ("unchanged" if cached["content_hash"] == content_hash else "changed"),
+            "title": title or url,
+            "text": text,
+            "content_hash": content_hash,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "links": links,
+            "links_to_follow": links,
+            "chunk_ids": cached["chunk_ids"] if cached else [],
+        }
+
+
+def _scope_prefix(url: str) -> str:
+    """The directory of a URL: https://wiki/team/index.html -> https://wiki/team/"""
+    parts = urlsplit(url)
+    path = parts.path if parts.path.endswith("/") else parts.path.rsplit("/", 1)[0] + "/"
+    return f"{parts.scheme}://{parts.netloc}{path or '/'}"
@@ -0,0 +1,8 @@
+"""
+Chunking shared by the CodeMind agent (python-agent) and the Ai-Product backend
+"""
+
+from codemind_text.code_chunker import CodeChunker
+from codemind_text.text_splitter import StreamingTextSplitter
+
+__all__ = ["CodeChunker", "StreamingTextSplitter"]
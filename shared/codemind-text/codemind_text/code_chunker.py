@@ -0,0 +1,276 @@
+"""
+Code Chunker for CodeMind
+Splits source files on definition boundaries and records the line range of every chunk
+"""
+
+import os
+import re
+import ast
+from typing import Callable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A chunk: (text, first line, last line), 1-based and inclusive
+Chunk = Tuple[str, int, int]
+
+# Segment tree node: (first line, last line, children), children built on demand
+Segment = Tuple[int, int, Optional[Callable[[], list]]]
+
+BRACE_LANGUAGES = {
+    '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h', '.hpp',
+    '.go', '.rs', '.php', '.cs', '.swift', '.kt', '.scala', '.json'
+}
+PARAGRAPH_LANGUAGES = {'.md', '.txt', '.toml'}
+
+# String literals and comments, blanked out before counting braces
+BRACE_NOISE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`|//.*|/\*.*?\*/')
+
+COMMENT_PREFIXES = ('#', '//', '/*', '*', '--', '<!--')
+
+# Lines end at "\n" only, as ast counts them; str.splitlines also breaks on
+# form feeds, \x1c-\x1e, \x85 and \u2028/\u2029
+LINE_END = re.compile(r'(?<=\n)')
+
+
+class CodeChunker:
+    """
+    Definition-aware splitter for source files
+
+    Files are turned into a tree of line segments: top-level statements and
+    definitions, then the members of a class or the statements of a
+    function. Python uses ast; brace languages use brace depth (with strings
+    and comments blanked out); Ruby, YAML and XML use indentation; Markdown
+    and text use blank-line paragraphs and headings. Adjacent segments are
+    packed into chunks of up to chunk_size characters, a segment is only
+    broken into its children when it does not fit on its own, and comments
+    stay with the definition below them. Chunks do not overlap.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        """
+        Args:
+            chunk_size: Maximum characters per chunk (CODE_CHUNK_SIZE)
+        """
+        self.chunk_size = chunk_size or int(os.getenv("CODE_CHUNK_SIZE", "1500"))
+
+    def split_text(self, text: str, file_type: str = "") -> List[Chunk]:
+        """
+        Split a source file into chunks
+
+        Args:
+            text: File content
+            file_type: File suffix such as ".py"
+
+        Returns:
+            List of (chunk text, start_line, end_line)
+        """
+        lines = LINE_END.split(text)
+        if not lines[-1]:
+            lines.pop()
+        if not lines:
+            return []
+
+        # offsets[i] is the character offset of line i + 1
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line))
+
+        segments = self._segments(lines, file_type.lower())
+        chunks: List[Chunk] = []
+        self._pack(segments, lines, offsets, chunks)
+        return chunks
+
+    def _segments(self, lines: List[str], file_type: str) -> List[Segment]:
+        if file_type == '.py':
+            try:
+                tree = ast.parse("".join(lines))
+                return self._python_segments(tree.body, 1, len(lines), lines)
+            except (SyntaxError, ValueError):
+                return self._indent_segments(lines, 1, len(lines))
+        if file_type in BRACE_LANGUAGES:
+            return self._brace_segments(lines, 1, len(lines), 0, _brace_depths(lines))
+        if file_type in PARAGRAPH_LANGUAGES:
+            return self._paragraph_segments(lines)
+        # Ruby, YAML, XML and anything unknown
+        return self._indent_segments(lines, 1, len(lines))
+
+    def _python_segments(self, nodes: List[ast.stmt], start: int, end: int, lines: List[str]) -> List[Segment]:
+        """Segments for a statement list spanning lines start..end"""
+        starts = []
+        for node in nodes:
+            first = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+            starts.append(_attach_comments(lines, first, start))
+
+        segments = []
+        if starts and starts[0] > start:
+            segments.append((start, starts[0] - 1, None))
+        for i, node in enumerate(nodes):
+            seg_start = starts[i]
+            seg_end = starts[i + 1] - 1 if i + 1 < len(nodes) else end
+            if seg_start > seg_end:
+                continue
+
+            children = None
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and node.body:
+                # The signature (and docstring) comes first, then the body statements
+                children = (lambda body=node.body, s=seg_start, e=seg_end:
+                            self._python_segments(body, s, e, lines))
+            segments.append((seg_start, seg_end, children))
+        return segments or [(start, end, None)]
+
+    def _brace_segments(self, lines: List[str], start: int, end: int, depth: int, depths: List[int]) -> List[Segment]:
+        """Segments starting at lines whose brace depth before them is depth"""
+        starts = _merge_comment_starts(lines, [
+            line_no for line_no in range(start, end + 1)
+            if depths[line_no - 1] == depth and lines[line_no - 1].strip()
+        ])
+        if not starts or starts[0] != start:
+            starts.insert(0, start)
+
+        segments = []
+        for i, seg_start in enumerate(starts):
+            seg_end = starts[i + 1] - 1 if i + 1 < len(starts) else end
+            children = None
+            if seg_end > seg_start and depth < 32:
+                # Members of a class or statements of a function body, one level deeper
+                children = (lambda s=seg_start, e=seg_end:
+                            self._brace_segments(lines, s, e, depth + 1, depths))
+            segments.append((seg_start, seg_end, children))
+        return segments
+
+    def _indent_segments(self, lines: List[str], start: int, end: int) -> List[Segment]:
+        """Segments starting at the least-indented non-blank lines of a range"""
+        indents = {
+            line_no: len(lines[line_no - 1]) - len(lines[line_no - 1].lstrip())
+            for line_no in range(start, end + 1)
+            if lines[line_no - 1].strip()
+        }
+        if not indents:
+            return [(start, end, None)]
+
+        level = min(indents.values())
+        starts = _merge_comment_starts(lines, [n for n, indent in indents.items() if indent == level])
+        if starts[0] != start:
+            starts.insert(0, start)
+
+        segments = []
+        for i, seg_start in enumerate(starts):
+            seg_end = starts[i + 1] - 1 if i + 1 < len(starts) else end
+            children = None
+            if seg_end > seg_start:
+                # The block's opening line, then its more-indented body
+                children = (lambda s=seg_start, e=seg_end:
+                            [(s, s, None)] + self._indent_segments(lines, s + 1, e))
+            segments.append((seg_start, seg_end, children))
+        return segments
+
+    def _paragraph_segments(self, lines: List[str]) -> List[Segment]:
+        """Segments at headings and at the first line after a blank line"""
+        starts = [1]
+        for line_no in range(2, len(lines) + 1):
+            line = lines[line_no - 1]
+            previous_blank = not lines[line_no - 2].strip()
+            if line.strip() and (previous_blank or line.startswith('#') or line.startswith('[')):
+                starts.append(line_no)
+
+        return [
+            (seg_start, (starts[i + 1] - 1 if i + 1 < len(starts) else len(lines)), None)
+            for i, seg_start in enumerate(starts)
+        ]
+
+    def _pack(self, segments: List[Segment], lines: List[str], offsets: List[int], chunks: List[Chunk]):
+        """Greedily pack adjacent segments into chunks, descending into segments that are too big"""
+        current_start = current_end = None
+
+        def flush():
+            if current_start is not None:
+                self._emit(current_start, current_end, lines, offsets, chunks)
+
+        for seg_start, seg_end, children in segments:
+            size = offsets[seg_end] - offsets[seg_start - 1]
+            if size > self.chunk_size:
+                flush()
+                current_start = current_end = None
+                inner = children() if children else []
+                if len(inner) > 1:
+                    self._pack(inner, lines, offsets, chunks)
+                else:
+                    self._split_lines(seg_start, seg_end, lines, offsets, chunks)
+                continue
+
+            if current_start is not None and offsets[seg_end] - offsets[current_start - 1] > self.chunk_size:
+                flush()
+                current_start = None
+            if current_start is None:
+                current_start = seg_start
+            current_end = seg_end
+        flush()
+
+    def _split_lines(self, start: int, end: int, lines: List[str], offsets: List[int], chunks: List[Chunk]):
+        """Last resort for a segment without usable children: pack whole lines"""
+        chunk_start = start
+        for line_no in range(start, end + 1):
+            if line_no > chunk_start and offsets[line_no] - offsets[chunk_start - 1] > self.chunk_size:
+                self._emit(chunk_start, line_no - 1, lines, offsets, chunks)
+                chunk_start = line_no
+        self._emit(chunk_start, end, lines, offsets, chunks)
+
+    def _emit(self, start: int, end: int, lines: List[str], offsets: List[int], chunks: List[Chunk]):
+        # Leading and trailing blank lines are not part of the chunk
+        while start <= end and not lines[start - 1].strip():
+            start += 1
+        while end >= start and not lines[end - 1].strip():
+            end -= 1
+        if start > end:
+            return
+
+        text = "".join(lines[start - 1:end]).rstrip("\n")
+        if len(text) <= self.chunk_size:
+            chunks.append((text, start, end))
+            return
+
+        # A single line longer than a chunk (minified code, data)
+        for i in range(0, len(text), self.chunk_size):
+            chunks.append((text[i:i + self.chunk_size], start, end))
+
+
+def _brace_depths(lines: List[str]) -> List[int]:
+    """Brace depth before each line, ignoring braces in strings and comments"""
+    depths = []
+    depth = 0
+    in_block_comment = False
+    for line in lines:
+        depths.append(depth)
+        code = line
+        if in_block_comment:
+            if "*/" not in code:
+                continue
+            code = code.split("*/", 1)[1]
+            in_block_comment = False
+        code = BRACE_NOISE.sub("", code)
+        if "/*" in code:
+            code, in_block_comment = code.split("/*", 1)[0], True
+        depth = max(0, depth + code.count("{") + code.count("[") - code.count("}") - code.count("]"))
+    return depths
+
+
+def _attach_comments(lines: List[str], first: int, floor: int) -> int:
+    """Move a definition's first line up over the comments directly above it"""
+    while first - 1 > floor and lines[first - 2].strip().startswith(COMMENT_PREFIXES):
+        first -= 1
+    return first
+
+
+def _merge_comment_starts(lines: List[str], starts: List[int]) -> List[int]:
+    """Drop start lines directly below a comment block, so the comment stays with its code"""
+    merged = []
+    for line_no in starts:
+        previous = merged[-1] if merged else None
+        if previous and lines[previous - 1].strip().startswith(COMMENT_PREFIXES) and all(
+            not lines[n - 1].strip() or lines[n - 1].strip().startswith(COMMENT_PREFIXES)
+            for n in range(previous, line_no)
+        ):
+            continue
+        merged.append(line_no)
+    return merged
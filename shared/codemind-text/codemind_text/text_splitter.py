@@ -0,0 +1,254 @@
+"""
+Text Splitter for CodeMind
+Single-pass streaming splitter with the chunk boundaries of RecursiveCharacterTextSplitter
+"""
+
+import copy
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A chunk as character offsets into the input: [start, end)
+Span = Tuple[int, int]
+
+# Consumed text is dropped from the buffer once at least this much can go
+TRIM_CHARS = 1 << 16
+
+
+class StreamingTextSplitter:
+    """
+    Drop-in replacement for RecursiveCharacterTextSplitter (keep_separator=True)
+
+    The recursive splitter splits the whole text on the first separator it
+    contains, re-splits every piece of chunk_size or more on the next
+    separator, and merges runs of smaller pieces into overlapping chunks,
+    copying substrings at every level. This splitter produces the same
+    chunks in one left-to-right pass: each separator level is a scanner
+    that hands a piece to the next level as soon as the piece is known to
+    be too big, and the merge works on (start, end) offsets. Every chunk is
+    a contiguous, whitespace-stripped span of the input, so chunks are
+    returned as offsets and text is only copied when a chunk is emitted.
+
+    Input can arrive incrementally (split_stream); only the text the open
+    chunks still need is buffered, about chunk_size characters per level.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 4000,
+        chunk_overlap: int = 200,
+        separators: Optional[List[str]] = None
+    ):
+        """
+        Args:
+            chunk_size: Maximum characters per chunk
+            chunk_overlap: Characters shared by consecutive chunks of a run
+            separators: Separators from coarsest to finest; "" splits characters
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or ["\n\n", "\n", " ", ""]
+
+    def split_offsets(self, text: str) -> List[Span]:
+        """Chunk boundaries of a text as (start, end) offsets"""
+        return [(start, end) for _, start, end in self._run([text], copy=False)]
+
+    def split_text(self, text: str) -> List[str]:
+        """Split a text into chunks (same result as RecursiveCharacterTextSplitter.split_text)"""
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def split_stream(self, pieces: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+        """
+        Split text arriving in pieces, as if the pieces were concatenated
+
+        Args:
+            pieces: Consecutive parts of the text, of any size
+
+        Yields:
+            (chunk text, start, end) with offsets into the concatenated text,
+            as soon as each chunk is final
+        """
+        return self._run(pieces, copy=True)
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Split Documents, copying each one's metadata onto its chunks"""
+        return [
+            Document(page_content=chunk, metadata=copy.deepcopy(doc.metadata or {}))
+            for doc in documents
+            for chunk in self.split_text(doc.page_content)
+        ]
+
+    def _run(self, pieces: Iterable[str], copy: bool) -> Iterator[Tuple[Optional[str], int, int]]:
+        buffer = _Buffer()
+        out: List[Span] = []
+        top = _Level(self, buffer, out, 0, 0)
+
+        def drain():
+            for start, end in out:
+                yield (buffer.slice(start, end) if copy else None), start, end
+            out.clear()
+
+        for piece in pieces:
+            if not piece:
+                continue
+            buffer.append(piece)
+            top.advance(buffer.end, final=False)
+            yield from drain()
+            buffer.trim(top.needed())
+
+        top.advance(buffer.end, final=True)
+        yield from drain()
+
+
+class _Buffer:
+    """The unconsumed tail of the input, addressed by absolute offsets"""
+
+    __slots__ = ("text", "base")
+
+    def __init__(self):
+        self.text = ""
+        self.base = 0
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.text)
+
+    def append(self, piece: str):
+        self.text += piece
+
+    def find(self, sub: str, start: int, end: int) -> int:
+        found = self.text.find(sub, start - self.base, end - self.base)
+        return found + self.base if found >= 0 else -1
+
+    def slice(self, start: int, end: int) -> str:
+        return self.text[start - self.base:end - self.base]
+
+    def trim(self, keep: int):
+        if keep - self.base >= max(TRIM_CHARS, len(self.text) // 2):
+            self.text = self.text[keep - self.base:]
+            self.base = keep
+
+
+class _Level:
+    """
+    Scanner for one separator level over a region of the input
+
+    The region is the whole input (level 0) or one oversized piece of the
+    level above. Pieces start at each separator occurrence (the separator
+    is kept at the start of its piece). Pieces under chunk_size are merged
+    into chunks; a piece that reaches chunk_size ends the current run and is
+    scanned by a child level with the next separator.
+    """
+
+    __slots__ = ("splitter", "buffer", "out", "depth", "separator", "pos", "piece_start",
+                 "child", "raw", "run", "run_size")
+
+    def __init__(self, splitter: StreamingTextSplitter, buffer: _Buffer, out: List[Span], depth: int, start: int):
+        self.splitter = splitter
+        self.buffer = buffer
+        self.out = out
+        self.depth = depth
+        self.separator = splitter.separators[depth]
+        self.pos = start            # Where the next separator search begins
+        self.piece_start = start
+        self.child: Optional[_Level] = None
+        self.raw = False            # Oversized piece with no finer separator left
+        self.run: Deque[Span] = deque()
+        self.run_size = 0
+
+    def advance(self, available: int, final: bool):
+        """Scan up to offset available; final means the region ends there"""
+        chunk_size = self.splitter.chunk_size
+        separator = self.separator
+        width = len(separator)
+        # The buffer does not change while scanning
+        text, base = self.buffer.text, self.buffer.base
+
+        while True:
+            if width:
+                boundary = text.find(separator, self.pos - base, available - base)
+                found = boundary != -1
+                if found:
+                    boundary += base
+                # A separator may start in the last width - 1 characters and finish in the next piece
+                limit = boundary if found else (available if final else max(self.pos, available - width + 1))
+            else:
+                # Every character is its own piece
+                boundary = self.piece_start + 1
+                found = boundary <= available
+                limit = boundary if found else available
+
+            if self.child is None and not self.raw and limit - self.piece_start >= chunk_size:
+                # Too big to be merged: chunk its content one level down
+                self._flush()
+                if self.depth + 1 < len(self.splitter.separators):
+                    self.child = _Level(self.splitter, self.buffer, self.out, self.depth + 1, self.piece_start)
+                else:
+                    self.raw = True
+            if self.child is not None:
+                self.child.advance(limit, final=found or final)
+
+            if not found:
+                self.pos = limit
+                if final:
+                    self._close(available)
+                    self._flush()
+                return
+
+            self._close(boundary)
+            self.piece_start = boundary
+            self.pos = boundary + width
+
+    def _close(self, end: int):
+        """End the open piece at offset end"""
+        if self.child is not None:
+            self.child = None
+        elif self.raw:
+            self.out.append((self.piece_start, end))
+            self.raw = False
+        elif end > self.piece_start:
+            self._merge((self.piece_start, end))
+
+    def _merge(self, span: Span):
+        """Add a small piece to the current run (TextSplitter._merge_splits)"""
+        size = span[1] - span[0]
+        run, run_size = self.run, self.run_size
+        chunk_size, chunk_overlap = self.splitter.chunk_size, self.splitter.chunk_overlap
+        if run_size + size > chunk_size and run:
+            self._emit()
+            while run_size > chunk_overlap or (run_size + size > chunk_size and run_size > 0):
+                first = run.popleft()
+                run_size -= first[1] - first[0]
+        run.append(span)
+        self.run_size = run_size + size
+
+    def _flush(self):
+        if self.run:
+            self._emit()
+            self.run.clear()
+            self.run_size = 0
+
+    def _emit(self):
+        text, base = self.buffer.text, self.buffer.base
+        start, end = self.run[0][0] - base, self.run[-1][1] - base
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            self.out.append((start + base, end + base))
+
+    def needed(self) -> int:
+        """Earliest offset this level (or a child) may still read"""
+        if self.run:
+            return self.run[0][0]
+        if self.child is not None:
+            return self.child.needed()
+        return self.piece_start